@@ -15,9 +15,7 @@ import sys
 import isolation
 import game_agent
 
-from collections import Counter
-from copy import deepcopy
-from copy import copy
+from timing import VirtualClock
 from functools import wraps
 from queue import Queue
 from threading import Thread
@@ -171,38 +169,24 @@ def makeBranchEval(first_branch):
 
 
 class CounterBoard(isolation.Board):
-    """Subclass of the isolation board that maintains counters for the number
-    of unique nodes and total nodes visited during depth first search.
-
-    Some functions from the base class must be overridden to maintain the
-    counters during search.
+    """Subclass of the isolation board that counts the total nodes and the
+    unique cells visited during depth first search with the node counter of
+    the board engine (see `isolation.Board.count_nodes()`), and remembers the
+    root move of the branch each node belongs to.
     """
 
     def __init__(self, *args, **kwargs):
         super(CounterBoard, self).__init__(*args, **kwargs)
-        self.counter = Counter()
-        self.visited = set()
+        self.count_nodes()
         self.root = None
 
     def copy(self):
-        new_board = CounterBoard(self.__player_1__, self.__player_2__,
-                                 width=self.width, height=self.height)
-        new_board.move_count = self.move_count
-        new_board.__active_player__ = self.__active_player__
-        new_board.__inactive_player__ = self.__inactive_player__
-        new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
-        new_board.counter = self.counter
-        new_board.visited = self.visited
+        new_board = super(CounterBoard, self).copy()
         new_board.root = self.root
         return new_board
 
     def forecast_move(self, move):
-        self.counter[move] += 1
-        self.visited.add(move)
-        new_board = self.copy()
-        new_board.apply_move(move)
+        new_board = super(CounterBoard, self).forecast_move(move)
         if new_board.root is None:
             new_board.root = move
         return new_board
@@ -210,7 +194,7 @@ class CounterBoard(isolation.Board):
     @property
     def counts(self):
         """ Return counts of (total, unique) nodes visited """
-        return sum(self.counter.values()), len(self.visited)
+        return self.node_counter.total, self.node_counter.cells
 
 
 class Project1Test(unittest.TestCase):
@@ -495,12 +479,13 @@ class Project1Test(unittest.TestCase):
             when an event occurs, regardless of the clock time required until
             the event happens.
             """
-            def __init__(self, time_limit):
+            def __init__(self, time_limit, clock=curr_time_millis):
                 self.time_limit = time_limit
-                self.start_time = curr_time_millis()
+                self.clock = clock
+                self.start_time = clock()
 
             def time_left(self):
-                return self.time_limit - (curr_time_millis() - self.start_time)
+                return self.time_limit - (self.clock() - self.start_time)
 
         w, h = 11, 11  # board size
         adversary_location = (0, 0)
@@ -517,9 +502,11 @@ class Project1Test(unittest.TestCase):
 
             # set the initial timer high enough that the search will not
             # timeout before triggering the dynamic timer to halt by visiting
-            # the expected number of nodes
+            # the expected number of nodes; the virtual clock has no tick, so
+            # it never moves and the search only stops when makeEvalStop sets
+            # the time limit to 0, whatever the speed of the host
             time_limit = 1e4
-            timer = DynamicTimer(time_limit)
+            timer = DynamicTimer(time_limit, VirtualClock())
             eval_fn = makeEvalStop(exact_counts[idx][0], timer, time_limit)
             agentUT, board = self.initAUT(-1, eval_fn, True, method,
                                           origins[idx], adversary_location,
@@ -0,0 +1,156 @@
+'''
+Registry of named agent specifications.
+
+An agent spec is a small JSON-compatible dictionary that describes how to
+construct a player, so tournaments can send the spec to a worker process and
+build the player there instead of pickling it:
+
+    {"name": "AB_Improved", "method": "alphabeta", "search_depth": 5,
+     "iterative": false, "score_fn": "sample_players:improved_score"}
+
+The keys of a spec are:
+
+    name        the name of the agent in the results
+    player      `module:name` of the player class - default is
+                `game_agent:CustomPlayer`
+    score_fn    `module:name` of a score function
+    weights     the weights of a `ParameterizedEvaluationFunction` score
+    evaluator   a JSON file written by `learned_eval.save_evaluator` whose
+                `eval_func` is the score
+    cache       the size of an `EvaluationCache` around the score - default
+                is no cache
+    tablebase   a tablebase file written by `solver.build_tablebase`
+
+and every other key is passed to the player as a keyword argument (e.g.,
+method, search_depth, iterative, feature_board, late_move_reduction).
+
+A spec may also describe a sweep over several agents: "grid" maps keys to
+lists of values (every combination is an agent), and "weight_grid" lists the
+candidate values of each weight (every combination of weights is an agent).
+`expand()` turns a sweep into plain specs, named after the swept values.
+`load_specs()` reads a JSON list of specs (and sweeps) from a file.
+
+`REGISTRY` holds the agents of the standard tournament by name.
+'''
+import importlib
+import itertools
+import json
+
+from collections import namedtuple
+
+Agent = namedtuple("Agent", ["player", "name"])
+
+DEFAULT_PLAYER = "game_agent:CustomPlayer"
+
+HEURISTICS = [("Null", "sample_players:null_score"),
+              ("Open", "sample_players:open_move_score"),
+              ("Improved", "sample_players:improved_score")]
+AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
+MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
+CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+
+# The agent names encode the search method (MM=minimax, AB=alpha-beta) and the
+# heuristic function (Null=null_score, Open=open_move_score,
+# Improved=improved_score). For example, MM_Open is an agent using minimax
+# search with the open moves heuristic.
+OPPONENT_SPECS = ([{"name": "Random", "player": "sample_players:RandomPlayer"}] +
+                  [dict(MM_ARGS, name="MM_" + name, score_fn=h) for name, h in HEURISTICS] +
+                  [dict(AB_ARGS, name="AB_" + name, score_fn=h) for name, h in HEURISTICS])
+
+# ID_Improved calibrates the results of the student agent across systems
+TEST_SPECS = [dict(CUSTOM_ARGS, name="ID_Improved", score_fn="sample_players:improved_score"),
+              dict(CUSTOM_ARGS, name="Student", score_fn="game_agent:custom_score")]
+
+# The default weight sweep of the parameterized evaluation function
+STUDENT_SWEEP = dict(CUSTOM_ARGS, name="Student",
+                     weight_grid=[[1, 2], [0, 1, 2], [-1, 0, 1], [1, 2], [0, 1, 2], [0]])
+
+REGISTRY = {spec["name"]: spec for spec in OPPONENT_SPECS + TEST_SPECS}
+
+_SPEC_KEYS = ("name", "player", "score_fn", "weights", "evaluator", "cache", "tablebase")
+
+
+def resolve(name):
+    """ Return the object named by a `module:name` string. """
+    module, attr = name.split(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def register(spec, registry=REGISTRY):
+    """ Add a spec to a registry under its name, and return it. """
+    registry[spec["name"]] = spec
+    return spec
+
+
+def get_spec(name, registry=REGISTRY):
+    """ Return the registered spec of an agent name. """
+    try:
+        return registry[name]
+    except KeyError:
+        raise KeyError("No agent named %r is registered." % name)
+
+
+def expand(spec):
+    """ Return the plain specs of a spec or of a sweep. """
+    spec = dict(spec)
+    grid = spec.pop("grid", {})
+    weight_grid = spec.pop("weight_grid", None)
+    specs = []
+    keys = sorted(grid)
+    for values in itertools.product(*[grid[key] for key in keys]):
+        base = dict(spec, **dict(zip(keys, values)))
+        if keys:
+            base["name"] = "%s (%s)" % (spec["name"], ", ".join(
+                "%s=%s" % item for item in zip(keys, values)))
+        if weight_grid is None:
+            specs.append(base)
+            continue
+        for weights in itertools.product(*weight_grid):
+            specs.append(dict(base, weights=list(weights),
+                              name="%s %s" % (base["name"], str(weights))))
+    return specs
+
+
+def load_specs(path):
+    """ Return the plain specs of a JSON file holding a list of specs. """
+    with open(path) as ifile:
+        return [plain for spec in json.load(ifile) for plain in expand(spec)]
+
+
+def build_player(spec):
+    """ Construct the player described by a (plain) spec. """
+    kwargs = {key: value for key, value in spec.items() if key not in _SPEC_KEYS}
+    for key, value in kwargs.items():
+        if isinstance(value, str) and ":" in value:
+            kwargs[key] = resolve(value)
+
+    score_fn = None
+    if "score_fn" in spec:
+        score_fn = resolve(spec["score_fn"])
+    if "weights" in spec:
+        from game_agent import ParameterizedEvaluationFunction
+        score_fn = ParameterizedEvaluationFunction(tuple(spec["weights"])).eval_func
+    if "evaluator" in spec:
+        from learned_eval import load_evaluator
+        score_fn = load_evaluator(spec["evaluator"]).eval_func
+    if score_fn is not None and spec.get("cache"):
+        from eval_cache import EvaluationCache
+        score_fn = EvaluationCache(score_fn, spec["cache"])
+    if score_fn is not None:
+        kwargs["score_fn"] = score_fn
+    if "tablebase" in spec:
+        from solver import Tablebase
+        kwargs["tablebase"] = Tablebase(spec["tablebase"])
+    return resolve(spec.get("player", DEFAULT_PLAYER))(**kwargs)
+
+
+def build_agent(spec):
+    """
+    Return the `Agent` of a spec (or of a registered name); an `Agent` is
+    returned unchanged.
+    """
+    if isinstance(spec, Agent):
+        return spec
+    if isinstance(spec, str):
+        spec = get_spec(spec)
+    return Agent(build_player(spec), spec["name"])
@@ -0,0 +1,67 @@
+"""
+Test cases for the agent spec registry.
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from multiprocessing import Pool
+
+from agents import (DEFAULT_PLAYER, REGISTRY, STUDENT_SWEEP, build_agent, build_player,
+                    expand, load_specs, resolve)
+from eval_cache import EvaluationCache
+from sample_players import RandomPlayer, improved_score
+from tournament_mp import play_round
+
+
+class AgentsTest(unittest.TestCase):
+
+    def test_registry(self):
+        """ Registered specs build the agents of the standard tournament """
+        agent = build_agent("AB_Improved")
+        self.assertEqual(agent.name, "AB_Improved")
+        # resolved now: agent_test reloads game_agent
+        self.assertIsInstance(agent.player, resolve(DEFAULT_PLAYER))
+        self.assertEqual((agent.player.method, agent.player.search_depth), ("alphabeta", 5))
+        self.assertIs(agent.player.score, improved_score)
+        self.assertIsInstance(build_agent("Random").player, RandomPlayer)
+        self.assertIs(build_agent(agent), agent)
+        self.assertEqual(len(REGISTRY), 9)
+
+    def test_sweeps(self):
+        """ Sweeps expand to one named spec per combination """
+        specs = expand(STUDENT_SWEEP)
+        self.assertEqual(len(specs), 2 * 3 * 3 * 2 * 3)
+        self.assertEqual(specs[0]["name"], "Student (1, 0, -1, 1, 0, 0)")
+        player = build_player(dict(specs[0], cache=16))
+        self.assertIsInstance(player.score, EvaluationCache)
+        self.assertEqual(player.score.score_fn.__self__.weights, (1, 0, -1, 1, 0, 0))
+
+        handle, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as ofile:
+            json.dump([{"name": "AB", "method": "alphabeta", "iterative": False,
+                        "score_fn": "sample_players:improved_score",
+                        "grid": {"search_depth": [1, 2], "feature_board": [False, True]}}], ofile)
+        try:
+            specs = load_specs(path)
+        finally:
+            os.remove(path)
+        self.assertEqual([spec["name"] for spec in specs][:2],
+                         ["AB (feature_board=False, search_depth=1)",
+                          "AB (feature_board=False, search_depth=2)"])
+        self.assertEqual(build_player(specs[-1]).feature_board, True)
+
+    def test_workers_build_agents(self):
+        """ tournament_mp workers build the agents of the specs they get """
+        spec = {"name": "AB_1", "method": "alphabeta", "search_depth": 1, "iterative": False,
+                "score_fn": "sample_players:improved_score"}
+        with Pool(processes=1) as pool:
+            name, score, stats, _ = pool.apply(play_round, ([REGISTRY["Random"]], spec, 1))
+        self.assertEqual(name, "AB_1")
+        self.assertGreaterEqual(score, 0.)
+        self.assertGreater(stats["moves"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,292 @@
+'''
+Batch simulator for fast playouts between simple policies.
+
+`Board.play` pays for a board copy, a timer and the move history on every ply
+of every game, which dominates the cost of games between cheap policies.
+`simulate` instead plays a whole batch of games in lockstep on NumPy arrays:
+
+    - the state of game `b` is a row of a (games, cells + 1) boolean array of
+      blank cells (the extra column is an always blocked sentinel) and the
+      cell indices of both players;
+    - the knight-move table of the board is a (cells, 8) array padded with the
+      sentinel, so the legal moves of every game are one fancy-indexing
+      lookup, and each policy picks a move for every game at once.
+
+Policies:
+
+    - "random": a uniformly random legal move (like `RandomPlayer`);
+    - "greedy": the move that leaves the mover the most legal moves, a win
+      first, ties going to the largest (row, col), which is exactly
+      `GreedyPlayer` with `open_move_score`;
+    - "greedy_shuffle": the same, with ties broken at random.
+
+Games start from openings (the first move of each player), random pairs of
+cells by default.  The result holds the winner and length of every game, and
+optionally every move, for opening balance analysis, playout priors and
+training data:
+
+    result = simulate(7, 7, 10000, "greedy_shuffle", "random")
+    print(format_stats(outcome_stats(result)))
+
+usage: batch_sim.py [-s <board size>] [-n <games>] [-1 <policy>] [-2 <policy>] [-S <seed>] [-b]
+'''
+import getopt
+import sys
+import timeit
+
+from collections import namedtuple
+
+import numpy as np
+
+from isolation.isolation import cell_coordinates, cell_index, knight_move_table
+
+POLICIES = ("random", "greedy", "greedy_shuffle")
+NUM_GAMES = 10000  # default number of games in a batch
+WIN_SCORE = 9  # greedy score of a winning move, above any number of moves
+
+BatchResult = namedtuple("BatchResult", ["width", "height", "openings", "winners",
+                                         "lengths", "moves"])
+BatchResult.__doc__ = """
+Outcome of a batch of games: the (games, 2) cell indices of the openings of
+player 1 and player 2, the index (0 or 1) of the winner of every game, the
+number of plies of every game (including the openings) and, when recorded, the
+(games, plies) cell indices of every move (-1 after the end of a game).  Cell
+indices are `isolation.isolation.cell_index()` values.
+"""
+
+
+def neighbor_array(width, height):
+    """
+    Return the knight-move table of a board size as a (cells, 8) array of
+    cell indices, padded with the sentinel index (the number of cells).
+    """
+    num_cells = width * height
+    table = np.full((num_cells + 1, 8), num_cells, dtype=np.intp)
+    for idx, moves in enumerate(knight_move_table(width, height)):
+        table[idx, :len(moves)] = [n for n, _ in moves]
+    return table
+
+
+def random_openings(width, height, num_games, rng):
+    """ Return (games, 2) cell indices of random openings on distinct cells. """
+    num_cells = width * height
+    first = rng.integers(num_cells, size=num_games)
+    second = (first + rng.integers(1, num_cells, size=num_games)) % num_cells
+    return np.stack([first, second], axis=1).astype(np.intp)
+
+
+def choose_moves(policy, blank, locations, opponents, table, move_rank, rng):
+    """
+    Return the cell index chosen by a policy for every game (the sentinel for
+    games without a legal move).
+
+    Parameters
+    ----------
+    blank : numpy.ndarray
+        The (games, cells + 1) blank cells of the games.
+
+    locations, opponents : numpy.ndarray
+        The cell indices of the players to move and of their opponents.
+
+    move_rank : numpy.ndarray
+        The rank of every cell in (row, col) order, for the tie-breaking of
+        "greedy".
+    """
+    rows = np.arange(len(locations))[:, None]
+    candidates = table[locations]  # (games, 8)
+    legal = blank[rows, candidates]
+    if policy == "random":
+        keys = rng.random(candidates.shape)
+    else:
+        # legal moves of the mover from each candidate (the candidate itself
+        # is not its own neighbour, so blocking it changes nothing)
+        mobility = blank[rows[:, :, None], table[candidates]].sum(axis=2)
+        # a move that leaves the opponent without a legal move wins
+        opponent_cells = table[opponents][:, None, :]
+        opponent_moves = (blank[rows[:, :, None], opponent_cells] &
+                          (opponent_cells != candidates[:, :, None])).sum(axis=2)
+        scores = np.where(opponent_moves == 0, WIN_SCORE, mobility)
+        if policy == "greedy":
+            keys = scores * len(move_rank) + move_rank[candidates]
+        else:
+            keys = scores + rng.random(candidates.shape)
+    keys = np.where(legal, keys, -1)
+    best = keys.argmax(axis=1)
+    return np.where(legal.any(axis=1), candidates[np.arange(len(best)), best], table.shape[0] - 1)
+
+
+def simulate(width, height, num_games, policy_1="random", policy_2="random",
+             openings=None, seed=0, record=False):
+    """
+    Play a batch of games between two policies and return a `BatchResult`.
+
+    Parameters
+    ----------
+    width, height : int
+        The board size.
+
+    num_games : int
+        The number of games (ignored if openings are given).
+
+    policy_1, policy_2 : str
+        The policies of player 1 and player 2 (see `POLICIES`).
+
+    openings : iterable<((int, int), (int, int))> (optional)
+        The first move of each player in every game (e.g., positions of an
+        `OpeningBook`) - default is random openings.
+
+    seed : int (optional)
+        The seed of the random generator of the openings and the policies.
+
+    record : bool (optional)
+        Record every move of every game in the result.
+    """
+    for policy in (policy_1, policy_2):
+        if policy not in POLICIES:
+            raise ValueError("Unknown policy %r, expected one of %s." % (policy, POLICIES))
+    rng = np.random.default_rng(seed)
+    num_cells = width * height
+    table = neighbor_array(width, height)
+    move_rank = np.zeros(num_cells + 1, dtype=np.int64)
+    for idx, (r, c) in enumerate(cell_coordinates(width, height)):
+        move_rank[idx] = r * width + c
+    if openings is None:
+        openings = random_openings(width, height, num_games, rng)
+    else:
+        openings = np.array([[cell_index(move, height) for move in opening]
+                             for opening in openings], dtype=np.intp).reshape(-1, 2)
+    num_games = len(openings)
+    games = np.arange(num_games)
+
+    blank = np.ones((num_games, num_cells + 1), dtype=bool)
+    blank[:, num_cells] = False
+    blank[games, openings[:, 0]] = False
+    blank[games, openings[:, 1]] = False
+    locations = openings.copy()
+    winners = np.zeros(num_games, dtype=np.int8)
+    lengths = np.zeros(num_games, dtype=np.int32)
+    moves = [openings[:, 0], openings[:, 1]] if record else None
+
+    # games still in progress, as indices into the batch
+    live = games
+    ply = 2
+    while len(live):
+        mover = ply & 1
+        chosen = choose_moves((policy_1, policy_2)[mover], blank[live],
+                              locations[live, mover], locations[live, 1 - mover],
+                              table, move_rank, rng)
+        finished = chosen == num_cells
+        winners[live[finished]] = 1 - mover
+        lengths[live[finished]] = ply
+        if record:
+            column = np.full(num_games, -1, dtype=np.intp)
+            column[live[~finished]] = chosen[~finished]
+            moves.append(column)
+        live, chosen = live[~finished], chosen[~finished]
+        blank[live, chosen] = False
+        locations[live, mover] = chosen
+        ply += 1
+
+    if record:
+        moves = np.stack(moves[:-1], axis=1)
+    return BatchResult(width, height, openings, winners, lengths, moves)
+
+
+def outcome_stats(result):
+    """
+    Return summary statistics of a batch: the number of games, the win ratio
+    of player 1, and the mean, minimum and maximum game length in plies.
+    """
+    if not len(result.winners):
+        return {"games": 0, "p1_wins": 0., "mean_length": 0., "min_length": 0, "max_length": 0}
+    return {"games": len(result.winners),
+            "p1_wins": float(np.mean(result.winners == 0)),
+            "mean_length": float(np.mean(result.lengths)),
+            "min_length": int(result.lengths.min()),
+            "max_length": int(result.lengths.max())}
+
+
+def opening_balance(result):
+    """
+    Return two (height, width) arrays: the win ratio of player 1 by the cell
+    of its opening move (NaN for cells without games), and the number of
+    games per cell.
+    """
+    num_cells = result.width * result.height
+    counts = np.bincount(result.openings[:, 0], minlength=num_cells)
+    wins = np.bincount(result.openings[:, 0], weights=(result.winners == 0), minlength=num_cells)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = wins / counts
+    # cells are stored column by column
+    return (ratio.reshape(result.width, result.height).T,
+            counts.reshape(result.width, result.height).T)
+
+
+def format_stats(stats):
+    """ Return a one line report of the outcome statistics of a batch. """
+    return ("{games} games  player 1 wins {p1}%  length {mean_length:.1f} plies "
+            "(min {min_length}, max {max_length})").format(
+                p1="%.1f" % (100. * stats["p1_wins"]), **stats)
+
+
+def format_balance(ratio):
+    """ Return a text grid of the win ratios of `opening_balance()`. """
+    lines = ["      " + "".join("{:>6}".format(j) for j in range(ratio.shape[1]))]
+    for i, row in enumerate(ratio):
+        lines.append("{:>4}  ".format(i) + "".join(
+            "{:>6}".format("-" if np.isnan(value) else "%.2f" % value) for value in row))
+    return "\n".join(lines)
+
+
+def main(argv):
+
+    USAGE = """usage: batch_sim.py [-s <board size>] [-n <games>] [-1 <policy>] [-2 <policy>] [-S <seed>] [-b]
+            -s board size: optional board size - default is 7
+            -n games: optional number of games - default is 10000
+            -1 policy: optional policy of player 1 (random, greedy or greedy_shuffle) - default is random
+            -2 policy: optional policy of player 2 - default is random
+            -S seed: optional seed of the openings and the policies - default is 0
+            -b balance: also print the win ratio of player 1 by opening cell"""
+
+    size = 7
+    num_games = NUM_GAMES
+    policies = ["random", "random"]
+    seed = 0
+    balance = False
+    try:
+        opts, args = getopt.getopt(argv, "hs:n:1:2:S:b",
+                                   ["size=", "games=", "player1=", "player2=", "seed=", "balance"])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-s", "--size"):
+            size = int(arg)
+        elif opt in ("-n", "--games"):
+            num_games = int(arg)
+        elif opt in ("-1", "--player1"):
+            policies[0] = arg
+        elif opt in ("-2", "--player2"):
+            policies[1] = arg
+        elif opt in ("-S", "--seed"):
+            seed = int(arg)
+        elif opt in ("-b", "--balance"):
+            balance = True
+
+    start = timeit.default_timer()
+    result = simulate(size, size, num_games, policies[0], policies[1], seed=seed)
+    elapsed = timeit.default_timer() - start
+    print("{} vs. {} on {}x{}: {} ({:.0f} games/s)".format(
+        policies[0], policies[1], size, size, format_stats(outcome_stats(result)),
+        len(result.winners) / elapsed))
+    if balance:
+        print("\nPlayer 1 win ratio by opening cell:")
+        print(format_balance(opening_balance(result)[0]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,54 @@
+"""
+Test cases for the batch game simulator.
+"""
+import unittest
+
+import numpy as np
+
+import isolation
+from batch_sim import opening_balance, outcome_stats, simulate
+from isolation.isolation import cell_coordinates
+from sample_players import GreedyPlayer
+
+
+class BatchSimTest(unittest.TestCase):
+
+    def test_greedy_matches_greedy_player(self):
+        """ The greedy policy plays the same games as GreedyPlayer """
+        openings = [((0, 0), (6, 6)), ((3, 3), (2, 1)), ((1, 5), (4, 0)), ((6, 2), (0, 3))]
+        result = simulate(7, 7, 0, "greedy", "greedy", openings=openings, record=True)
+        coords = cell_coordinates(7, 7)
+        for opening, winner, moves, length in zip(openings, result.winners, result.moves,
+                                                  result.lengths):
+            players = (GreedyPlayer(), GreedyPlayer())
+            game = isolation.Board(players[0], players[1])
+            for move in opening:
+                game.apply_move(move)
+            board_winner, history, _ = game.play(time_limit=float("inf"))
+            self.assertEqual(players[winner], board_winner)
+            # the history starts after the opening and ends with (-1, -1)
+            played = [move for turn in history for move in turn][:-1]
+            self.assertEqual([coords[idx] for idx in moves[2:length]], played)
+
+    def test_recorded_games_are_legal(self):
+        """ Recorded random games replay legally to their recorded end """
+        result = simulate(5, 6, 200, "random", "greedy_shuffle", seed=3, record=True)
+        coords = cell_coordinates(5, 6)
+        for moves, winner, length in zip(result.moves, result.winners, result.lengths):
+            game = isolation.Board("p1", "p2", 5, 6)
+            for idx in moves[:length]:
+                self.assertIn(coords[idx], game.get_legal_moves())
+                game.apply_move(coords[idx])
+            self.assertTrue((moves[length:] == -1).all())
+            self.assertFalse(game.get_legal_moves())
+            self.assertEqual(game.inactive_player, ("p1", "p2")[winner])
+        stats = outcome_stats(result)
+        self.assertEqual(stats["games"], 200)
+        ratio, counts = opening_balance(result)
+        self.assertEqual(ratio.shape, (6, 5))
+        self.assertEqual(counts.sum(), 200)
+        self.assertTrue(np.isnan(ratio[counts == 0]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
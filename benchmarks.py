@@ -0,0 +1,167 @@
+'''
+Micro-benchmarks for the isolation board engine.
+
+Each benchmark plays random positions on boards of several sizes and reports
+the cost per operation in microseconds.
+
+usage: benchmarks.py [-s <board sizes>] [-n <positions>] [-S]
+        -s board sizes: optional comma separated list of board sizes - default is 7,9,11
+        -n positions: optional number of positions per board size - default is 200
+        -S search: also benchmark a fixed-depth alpha-beta search
+
+Larger boards (e.g., -s 9,11,13,15) exercise the engine where branching and
+game length grow.
+'''
+import getopt
+import random
+import sys
+import timeit
+import tracemalloc
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+BOARD_SIZES = (7, 9, 11)
+NUM_POSITIONS = 200
+SEARCH_DEPTH = 3
+
+
+def random_positions(size, num_positions, seed=0, players=("player_1", "player_2")):
+    """
+    Return positions reached by random play on a square board, spread evenly
+    over the course of the game.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        game = Board(players[0], players[1], size, size)
+        for _ in range(rng.randint(2, size * size // 2)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        if game.get_legal_moves():
+            positions.append(game)
+    return positions
+
+
+def time_per_call(fn, items, repeat=5):
+    """ Return the best time (in microseconds) to call fn on each item. """
+    best = min(timeit.repeat(lambda: [fn(item) for item in items],
+                             number=1, repeat=repeat))
+    return 1e6 * best / len(items)
+
+
+def bytes_per_board(positions):
+    """
+    Return the memory allocated per copy of a board (its own state; the
+    tables shared by every board of a size are not counted), as traced by
+    `tracemalloc` while copying every position.
+    """
+    copies = [None] * len(positions)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for idx, game in enumerate(positions):
+        copies[idx] = game.copy()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated / float(len(copies))
+
+
+def bench_board(size, num_positions):
+    """
+    Return the cost per call of the hot board operations on a board size.
+
+    Returns
+    ----------
+    list<(str, float, str)>
+        The name of each measurement, its value and its unit.
+    """
+    positions = random_positions(size, num_positions)
+    empty = [Board("player_1", "player_2", size, size) for _ in range(10)]
+    moves = [(game, game.get_legal_moves()[0]) for game in positions]
+    copy_usec = time_per_call(lambda g: g.copy(), positions)
+    return [("opening moves", time_per_call(lambda g: g.get_legal_moves(), empty), "us"),
+            ("get_legal_moves", time_per_call(lambda g: g.get_legal_moves(), positions), "us"),
+            ("copy", copy_usec, "us"),
+            ("forecast_move", time_per_call(lambda gm: gm[0].forecast_move(gm[1]), moves), "us"),
+            ("copies per second", 1e6 / copy_usec, ""),
+            ("bytes per board", bytes_per_board(positions), "")]
+
+
+def bench_search(size, num_positions, depth=SEARCH_DEPTH):
+    """
+    Return the cost of a fixed-depth alpha-beta search with the improved
+    heuristic on a board size, and the share of the nodes it generates that
+    are distinct positions (the rest are transpositions).
+
+    Returns
+    ----------
+    list<(str, float, str)>
+        The name of each measurement, its value and its unit.
+    """
+    leaves = [0]
+
+    def counting_score(game, player):
+        leaves[0] += 1
+        return improved_score(game, player)
+
+    player = CustomPlayer(search_depth=depth, score_fn=counting_score,
+                          iterative=False, method='alphabeta')
+    player.time_left = lambda: float("inf")
+    positions = random_positions(size, num_positions, players=(player, "opponent"))
+
+    counters = [game.count_nodes() for game in positions]
+
+    start = timeit.default_timer()
+    for game in positions:
+        player.alphabeta(game, depth, maximizing_player=game.active_player == player)
+    elapsed = timeit.default_timer() - start
+    total = sum(counter.total for counter in counters)
+    unique = sum(counter.unique for counter in counters)
+    return [("alphabeta depth %d" % depth, 1e3 * elapsed / len(positions), "ms"),
+            ("leaves per second", leaves[0] / elapsed, ""),
+            ("nodes per second", total / elapsed, ""),
+            ("unique positions", 100. * unique / max(1, total), "%")]
+
+
+def main(argv):
+
+    USAGE = """usage: benchmarks.py [-s <board sizes>] [-n <positions>] [-S]
+            -s board sizes: optional comma separated list of board sizes - default is 7,9,11
+            -n positions: optional number of positions per board size - default is 200
+            -S search: also benchmark a fixed-depth alpha-beta search"""
+
+    sizes = BOARD_SIZES
+    num_positions = NUM_POSITIONS
+    search = False
+    try:
+        opts, args = getopt.getopt(argv, "hs:n:S", ["sizes=", "positions=", "search"])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-s", "--sizes"):
+            sizes = [int(s) for s in arg.split(",")]
+        elif opt in ("-n", "--positions"):
+            num_positions = int(arg)
+        elif opt in ("-S", "--search"):
+            search = True
+
+    for size in sizes:
+        print("\n%dx%d board" % (size, size))
+        print("----------")
+        results = bench_board(size, num_positions)
+        if search:
+            results += bench_search(size, max(1, num_positions // 10))
+        for name, value, unit in results:
+            print("{!s:<20}{:>12.2f} {}".format(name, value, unit))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
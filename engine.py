@@ -0,0 +1,399 @@
+'''
+Line-based engine protocol for running isolation agents as long-lived
+processes.
+
+An engine wraps any player with a `get_move(game, legal_moves, time_left)`
+method (e.g., `CustomPlayer`) and talks over stdin/stdout, one command per
+line, in the spirit of the UCI protocol for chess engines:
+
+    client                              engine
+    ------                              ------
+    isolation                           id name <name>
+                                        isolationok
+    isready                             readyok
+    newgame                             (no reply)
+    position <w> <h> <p1> <p2> <cells>  (no reply)
+    go movetime <ms>                    info depth <d> score <s> pv <moves>
+                                        info time <ms>
+                                        bestmove <move>
+    quit                                (engine exits)
+
+Locations and moves are written `row,col` (`-` for a player that has not
+moved, `none` for no move), and `<cells>` is the list of blocked cells.  The
+player to move follows from the number of blocked cells.  `info time` is the
+time the engine spent on the move by its own clock, which lets a client tell
+the agent's time apart from the transport overhead.  Because the engine
+process lives across games, anything the agent keeps between moves
+(evaluation caches, tables) stays warm for the whole tournament.
+
+`EnginePlayer` is the client side: it starts an engine subprocess and
+implements `get_move`, so engines can play through `Board.play` and
+`tournament.play_match` like any other player.  An engine that crashes,
+hangs or answers garbage loses the game on time or by an illegal move and is
+restarted for the next game, without stopping the tournament.
+
+usage: engine.py [-a <agent>] [-k <json kwargs>]
+       engine.py -1 <agent> -2 <agent> [-m <number of matches>]
+'''
+import getopt
+import json
+import logging
+import subprocess
+import sys
+import timeit
+
+from queue import Queue, Empty
+from threading import Thread
+
+from isolation import Board
+from agents import resolve
+
+logging.basicConfig(level=logging.ERROR)
+
+DEFAULT_AGENT = "game_agent:CustomPlayer"
+RESPONSE_GRACE_MILLIS = 50  # extra time to wait for a reply before giving up
+STARTUP_TIMEOUT = 30.  # seconds to wait for a new engine to become ready
+
+
+def format_move(move):
+    """ Return the protocol form of a move or location. """
+    if move is Board.NOT_MOVED:
+        return "-"
+    if move == (-1, -1):
+        return "none"
+    return "%d,%d" % move
+
+
+def parse_move(token):
+    """ Return the move or location for a protocol token. """
+    if token == "none":
+        return (-1, -1)
+    if token == "-":
+        return Board.NOT_MOVED
+    row, col = token.split(",")
+    return (int(row), int(col))
+
+
+def encode_position(game):
+    """
+    Return the arguments of a `position` command for a game state.
+    """
+    locations = [game.get_player_location(game.active_player),
+                 game.get_player_location(game.inactive_player)]
+    if game.move_count % 2:
+        locations.reverse()
+    blank = set(game.get_blank_spaces())
+    blocked = [(r, c) for r in range(game.height) for c in range(game.width)
+               if (r, c) not in blank]
+    return " ".join([str(game.width), str(game.height)] +
+                    [format_move(loc) for loc in locations] +
+                    [format_move(cell) for cell in blocked])
+
+
+def decode_position(args, player_1, player_2):
+    """
+    Rebuild a game state from the arguments of a `position` command.
+
+    The blocked cells are replayed as moves (each player finishing on its
+    location), which reproduces the cells, locations, player to move and
+    position hash of the encoded state.
+    """
+    width, height = int(args[0]), int(args[1])
+    p1_loc, p2_loc = parse_move(args[2]), parse_move(args[3])
+    blocked = [parse_move(token) for token in args[4:]]
+    others = [cell for cell in blocked if cell not in (p1_loc, p2_loc)]
+    num_p1_moves = (len(blocked) + 1) // 2
+    p1_moves = others[:num_p1_moves - 1] + [p1_loc] if p1_loc else []
+    p2_moves = others[num_p1_moves - 1:] + [p2_loc] if p2_loc else []
+    game = Board(player_1, player_2, width, height)
+    for idx in range(len(blocked)):
+        game.apply_move(p2_moves[idx // 2] if idx % 2 else p1_moves[idx // 2])
+    return game
+
+
+def load_agent(agent, kwargs=None):
+    """
+    Construct a player from a `module:factory` string. String values of the
+    form `module:name` in the keyword arguments (e.g., a score_fn) are
+    resolved to the named objects.
+    """
+    kwargs = {key: resolve(value) if isinstance(value, str) and ":" in value else value
+              for key, value in (kwargs or {}).items()}
+    return resolve(agent)(**kwargs)
+
+
+def serve(player, name, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Run the engine side of the protocol for a player until `quit` or the end
+    of the input.
+    """
+    def send(line):
+        stdout.write(line + "\n")
+        stdout.flush()
+
+    opponent = object()
+    game = None
+    for line in stdin:
+        start = timeit.default_timer()
+        tokens = line.split()
+        if not tokens:
+            continue
+        command, args = tokens[0], tokens[1:]
+        if command == "isolation":
+            send("id name %s" % name)
+            send("isolationok")
+        elif command == "isready":
+            send("readyok")
+        elif command == "newgame":
+            game = None
+        elif command == "position":
+            blocked = len(args) - 4
+            if blocked % 2:
+                game = decode_position(args, opponent, player)
+            else:
+                game = decode_position(args, player, opponent)
+        elif command == "go":
+            if game is None:
+                logging.error("go before position: no game to move in")
+                send("bestmove none")
+                continue
+            movetime = float(args[args.index("movetime") + 1])
+            time_left = lambda: movetime - 1000 * (timeit.default_timer() - start)
+            move = player.get_move(game, game.get_legal_moves(), time_left)
+            for iteration in getattr(player, "iterations", [])[-1:]:
+                send("info depth %d score %s pv %s" %
+                     (iteration.depth, iteration.score,
+                      " ".join(format_move(m) for m in iteration.pv)))
+            send("info time %.3f" % (movetime - time_left()))
+            send("bestmove %s" % format_move(move))
+        elif command == "quit":
+            break
+        else:
+            logging.error("Unknown engine command: %s", line.strip())
+
+
+def engine_command(agent=DEFAULT_AGENT, kwargs=None):
+    """ Return the command line that starts an engine for an agent. """
+    command = [sys.executable, __file__, "-a", agent]
+    if kwargs:
+        command += ["-k", json.dumps(kwargs)]
+    return command
+
+
+class EngineProcess:
+    """
+    A running engine subprocess with line-based, timeout-aware I/O.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command line that starts the engine.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.name = None
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        universal_newlines=True, bufsize=1)
+        self.lines = Queue()
+        reader = Thread(target=self.__read__, daemon=True)
+        reader.start()
+        self.send("isolation")
+        for line in self.expect("isolationok", STARTUP_TIMEOUT):
+            if line.startswith("id name "):
+                self.name = line[len("id name "):]
+
+    def __read__(self):
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip("\n"))
+        self.lines.put(None)
+
+    def send(self, line):
+        """ Send a command line to the engine. """
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def expect(self, prefix, timeout):
+        """
+        Return the lines the engine sends up to and including the first line
+        starting with prefix. Raises TimeoutError if it does not arrive in
+        time, and EOFError if the engine exits.
+        """
+        deadline = timeit.default_timer() + timeout
+        lines = []
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0., deadline - timeit.default_timer()))
+            except Empty:
+                raise TimeoutError("Engine did not send %r in time." % prefix)
+            if line is None:
+                raise EOFError("Engine exited.")
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    @property
+    def alive(self):
+        """ True while the engine process is running. """
+        return self.process.poll() is None
+
+    def close(self):
+        """ Ask the engine to quit and kill it if it does not. """
+        try:
+            if self.alive:
+                self.send("quit")
+            self.process.wait(timeout=1.)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class EnginePlayer:
+    """
+    Player that asks an engine subprocess for its moves.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command line that starts the engine (see `engine_command`).
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.engine = None
+        self.info = []
+        self.last_position = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["engine"] = None
+        return state
+
+    def get_move(self, game, legal_moves, time_left):
+        """Ask the engine for a move in the current game state.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        ----------
+        (int, int)
+            The move chosen by the engine; None if the engine failed to answer
+            in time (the engine is then restarted for the next move).
+        """
+        try:
+            if self.engine is None or not self.engine.alive:
+                self.engine = EngineProcess(self.command)
+            position = encode_position(game)
+            if self.__is_new_game__(game, position):
+                self.engine.send("newgame")
+            self.engine.send("position " + position)
+            self.engine.send("go movetime %d" % max(0, int(time_left())))
+            timeout = (time_left() + RESPONSE_GRACE_MILLIS) / 1000.
+            lines = self.engine.expect("bestmove", max(0., timeout))
+        except (TimeoutError, EOFError, OSError) as err:
+            logging.error("Engine %s failed: %s", self.command, err)
+            self.close()
+            return None
+        self.info = [line for line in lines if line.startswith("info")]
+        return parse_move(lines[-1].split()[1])
+
+    def __is_new_game__(self, game, position):
+        """
+        Return True if a position does not follow the last position this
+        player moved in: the board size changed, the move count did not grow,
+        or a cell blocked then is blank now.  Games from an opening (or any
+        position) are new games, not only games from the empty board.
+        """
+        tokens = position.split()
+        current = (tuple(tokens[:2]), game.move_count, frozenset(tokens[4:]))
+        last, self.last_position = self.last_position, current
+        return (last is None or last[0] != current[0] or last[1] >= current[1] or
+                not last[2] <= current[2])
+
+    def close(self):
+        """ Stop the engine subprocess (a new one starts on the next move). """
+        self.last_position = None
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+
+def play_engine_match(player_1, player_2, num_matches, book=None):
+    """
+    Play fair matches (see `tournament.play_match`) between two engine
+    players and return the number of games won by each.
+    """
+    from tournament import play_match
+
+    wins = [0, 0]
+    for match_idx in range(num_matches):
+        opening = book.position(match_idx) if book is not None else None
+        score_1, score_2 = play_match(player_1, player_2, opening)
+        wins[0] += score_1
+        wins[1] += score_2
+    return wins
+
+
+def main(argv):
+
+    USAGE = """usage: engine.py [-a <agent>] [-k <json kwargs>]
+       engine.py -1 <agent> -2 <agent> [-m <number of matches>]
+            -a agent: optional module:factory of the agent to serve - default is game_agent:CustomPlayer
+            -k kwargs: optional JSON object of keyword arguments for the agent factory
+            -1, -2 agents: play matches between engines for two agents instead of serving
+            -m number of matches: optional number of matches (each match has 2 games) - default is 5"""
+
+    agent = DEFAULT_AGENT
+    kwargs = {}
+    match_agents = [None, None]
+    num_matches = 5
+    try:
+        opts, args = getopt.getopt(argv, "ha:k:1:2:m:", ["agent=", "kwargs=", "matches="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-a", "--agent"):
+            agent = arg
+        elif opt in ("-k", "--kwargs"):
+            kwargs = json.loads(arg)
+        elif opt == "-1":
+            match_agents[0] = arg
+        elif opt == "-2":
+            match_agents[1] = arg
+        elif opt in ("-m", "--matches"):
+            num_matches = int(arg)
+
+    if any(match_agents):
+        from openings import OpeningBook
+        players = [EnginePlayer(engine_command(a or DEFAULT_AGENT)) for a in match_agents]
+        try:
+            wins = play_engine_match(players[0], players[1], num_matches, OpeningBook())
+        finally:
+            for player in players:
+                player.close()
+        print("%s %d - %d %s" % (match_agents[0], wins[0], wins[1], match_agents[1]))
+    else:
+        serve(load_agent(agent, kwargs), agent)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+"""
+Test cases for the engine protocol.
+"""
+import io
+import sys
+import unittest
+
+import isolation
+from engine import (EnginePlayer, decode_position, encode_position,
+                    engine_command, serve)
+from game_agent import CustomPlayer
+from sample_players import improved_score, RandomPlayer
+
+
+class PositionTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        """ Decoding an encoded position reproduces the game state """
+        game = isolation.Board("p1", "p2", 7, 5)
+        for move in [(2, 3), (0, 0), (4, 4), (1, 2), (2, 6)]:
+            game.apply_move(move)
+            copy = decode_position(encode_position(game).split(), "p1", "p2")
+            self.assertEqual(copy.position_hash, game.position_hash)
+            self.assertEqual(copy.active_player, game.active_player)
+            self.assertEqual(copy.to_string(), game.to_string())
+            self.assertEqual(sorted(copy.get_legal_moves()),
+                             sorted(game.get_legal_moves()))
+
+
+class ServeTest(unittest.TestCase):
+
+    def test_session(self):
+        """ The engine answers a scripted session with a legal move """
+        player = CustomPlayer(score_fn=improved_score, method='alphabeta')
+        game = isolation.Board("p1", "p2")
+        game.apply_move((3, 3))
+        commands = io.StringIO("isolation\nisready\nnewgame\n"
+                               "position %s\ngo movetime 100\nquit\n"
+                               % encode_position(game))
+        replies = io.StringIO()
+        serve(player, "test", commands, replies)
+        lines = replies.getvalue().splitlines()
+        self.assertEqual(lines[:3], ["id name test", "isolationok", "readyok"])
+        self.assertTrue(lines[3].startswith("info depth "))
+        row, col = map(int, lines[-1].split()[1].split(","))
+        self.assertIn((row, col), game.get_legal_moves())
+
+    def test_go_without_position(self):
+        """ A go before any position is answered with no move """
+        commands = io.StringIO("isolation\nnewgame\ngo movetime 100\nisready\nquit\n")
+        replies = io.StringIO()
+        serve(RandomPlayer(), "test", commands, replies)
+        self.assertEqual(replies.getvalue().splitlines()[2:], ["bestmove none", "readyok"])
+
+
+class EnginePlayerTest(unittest.TestCase):
+
+    def test_new_game_detection(self):
+        """ Every game starts with newgame, including games from an opening """
+        engine = EnginePlayer(engine_command("sample_players:RandomPlayer"))
+        starts = []
+        for _ in range(2):
+            game = isolation.Board("p1", "p2")
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            for _ in range(3):
+                starts.append(engine.__is_new_game__(game, encode_position(game)))
+                game.apply_move(game.get_legal_moves()[0])
+                game.apply_move(game.get_legal_moves()[0])
+        self.assertEqual(starts, [True, False, False] * 2)
+
+    def test_game(self):
+        """ An engine subprocess plays a full game through Board.play """
+        engine = EnginePlayer(engine_command("sample_players:RandomPlayer"))
+        try:
+            for _ in range(2):
+                game = isolation.Board(engine, RandomPlayer())
+                winner, history, termination = game.play(time_limit=1000)
+                self.assertEqual(termination, "illegal move")
+                self.assertEqual(history[-1][-1], (-1, -1))
+        finally:
+            engine.close()
+
+    def test_broken_engine(self):
+        """ An engine that dies forfeits the move instead of raising """
+        engine = EnginePlayer([sys.executable, "-c", "pass"])
+        game = isolation.Board(engine, RandomPlayer())
+        self.assertIsNone(engine.get_move(game, game.get_legal_moves(), lambda: 100.))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Bounded cache of heuristic evaluations keyed by position hash.
+
+Iterative deepening evaluates the same leaf positions again on every
+iteration, and transpositions reach the same position through different move
+orders.  `EvaluationCache` wraps any score function with the signature
+`score_fn(game, player)` (e.g., `custom_score`, `improved_score` or
+`ParameterizedEvaluationFunction.eval_func`) and returns the cached value
+whenever the position has already been evaluated for the same player.
+
+    eval_obj = ParameterizedEvaluationFunction(weights)
+    player = CustomPlayer(score_fn=EvaluationCache(eval_obj.eval_func))
+
+The cache evicts the least recently used entry once it holds `maxsize`
+entries.  Pickling a cache (e.g., when an agent is sent to a `Pool` worker)
+drops its entries and statistics, so every process fills its own cache.
+"""
+
+from collections import OrderedDict
+
+
+class EvaluationCache:
+    """
+    LRU cache wrapper for a score function.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to cache; it must only depend on the position and
+        the seat of the player (i.e., not on the search state).
+
+    maxsize : int (optional)
+        The maximum number of cached evaluations.
+    """
+
+    def __init__(self, score_fn, maxsize=2 ** 16):
+        self.score_fn = score_fn
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __call__(self, game, player):
+        key = (game.position_hash << 1) | (player == game.active_player)
+        entries = self._entries
+        try:
+            value = entries[key]
+        except KeyError:
+            self.misses += 1
+            value = entries[key] = self.score_fn(game, player)
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+            return value
+        self.hits += 1
+        entries.move_to_end(key)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, _entries=OrderedDict())
+        return state
+
+    @property
+    def hit_rate(self):
+        """ The fraction of calls answered from the cache. """
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.
+
+    def stats(self):
+        """ Return a dict with the size, hits, misses and hit rate. """
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def clear(self):
+        """ Remove all entries and reset the statistics. """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,64 @@
+"""
+Test cases for the Zobrist position hash and the evaluation cache.
+"""
+import pickle
+import unittest
+
+import isolation
+from eval_cache import EvaluationCache
+from sample_players import improved_score
+
+
+class EvaluationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = isolation.Board("p1", "p2")
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+    def test_position_hash(self):
+        """ Equal positions hash equally and different positions differ """
+        replay = isolation.Board("p1", "p2")
+        replay.apply_move((3, 3))
+        replay.apply_move((0, 0))
+        self.assertEqual(replay.position_hash, self.game.position_hash)
+        self.assertEqual(self.game.copy().position_hash, self.game.position_hash)
+        hashes = {self.game.forecast_move(m).position_hash
+                  for m in self.game.get_legal_moves()}
+        self.assertEqual(len(hashes), len(self.game.get_legal_moves()))
+        self.assertNotIn(self.game.position_hash, hashes)
+
+    def test_hits_and_seats(self):
+        """ Repeated evaluations hit the cache separately for each seat """
+        cache = EvaluationCache(improved_score)
+        for _ in range(3):
+            self.assertEqual(cache(self.game, "p1"), improved_score(self.game, "p1"))
+            self.assertEqual(cache(self.game, "p2"), improved_score(self.game, "p2"))
+        self.assertEqual((cache.hits, cache.misses), (4, 2))
+        self.assertAlmostEqual(cache.hit_rate, 4 / 6)
+
+    def test_eviction(self):
+        """ The least recently used entry is evicted when the cache is full """
+        cache = EvaluationCache(improved_score, maxsize=2)
+        children = [self.game.forecast_move(m) for m in self.game.get_legal_moves()[:3]]
+        cache(children[0], "p1")
+        cache(children[1], "p1")
+        cache(children[0], "p1")
+        cache(children[2], "p1")
+        self.assertEqual(len(cache), 2)
+        cache(children[0], "p1")
+        self.assertEqual(cache.hits, 2)
+        cache(children[1], "p1")
+        self.assertEqual(cache.misses, 4)
+
+    def test_pickle_drops_entries(self):
+        """ Pickled caches start empty in the receiving process """
+        cache = EvaluationCache(improved_score)
+        cache(self.game, "p1")
+        clone = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(clone), clone.hits, clone.misses), (0, 0, 0))
+        self.assertEqual(clone.maxsize, cache.maxsize)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+"""
+Position features used by the learned evaluation functions.
+
+Every feature is computed from the point of view of the given player, in the
+same way as the heuristics in `game_agent.py`.  The module level functions
+compute the features from scratch using the public `isolation.Board` API and
+serve as the reference implementation.
+
+`FeatureBoard` is a `Board` that keeps the features up to date as moves are
+applied and undone, so a score function can read them at near-constant cost
+per node.  Boards derived from a `FeatureBoard` (copies, forecast moves) are
+feature boards as well, so converting the root of a search is enough:
+
+    game = FeatureBoard.from_board(game)
+
+`extract_features` uses the incremental values whenever it is given a
+`FeatureBoard`.
+"""
+
+from collections import deque
+from math import sqrt
+
+from isolation import Board
+from isolation.isolation import cell_index, knight_move_table
+
+FEATURE_NAMES = ("own_moves", "opp_moves",
+                 "own_moves_2", "opp_moves_2",
+                 "own_area", "opp_area",
+                 "own_center", "opp_center",
+                 "opp_distance",
+                 "move_count")
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_KNIGHT_DISTANCES = {}
+
+
+def _neighbors(game, cell):
+    """ Return the blank cells one knight move away from a cell. """
+    r, c = cell
+    return [(r + dr, c + dc) for dr, dc in DIRECTIONS
+            if game.move_is_legal((r + dr, c + dc))]
+
+
+def second_order_mobility(game, player):
+    """
+    Return the number of onward moves summed over every legal move of the
+    player, i.e., the number of two-move paths open to the player.
+    """
+    return sum(len(_neighbors(game, move))
+               for move in game.get_legal_moves(player))
+
+
+def reachable_area(game, player):
+    """
+    Return the number of blank cells the player could reach by a sequence of
+    knight moves if the opponent did not move (flood fill).
+    """
+    location = game.get_player_location(player)
+    if location is None:
+        return len(game.get_blank_spaces())
+    seen = {location}
+    frontier = [location]
+    while frontier:
+        cell = frontier.pop()
+        for move in _neighbors(game, cell):
+            if move not in seen:
+                seen.add(move)
+                frontier.append(move)
+    return len(seen) - 1
+
+
+def center_distance(game, player):
+    """
+    Return the Euclidean distance between the player and the center of the
+    board (zero before the player has moved).
+    """
+    location = game.get_player_location(player)
+    if location is None:
+        return 0.
+    row, col = location
+    return sqrt((row - (game.height - 1) / 2) ** 2 +
+                (col - (game.width - 1) / 2) ** 2)
+
+
+def opponent_distance(game, player):
+    """
+    Return the number of knight moves between the players on an empty board
+    of the same size (zero before both players have moved, -1 if the cells
+    are not connected on a very small board).
+    """
+    location = game.get_player_location(player)
+    target = game.get_player_location(game.get_opponent(player))
+    if location is None or target is None:
+        return 0
+    seen = {location: 0}
+    frontier = deque([location])
+    while frontier:
+        cell = frontier.popleft()
+        if cell == target:
+            return seen[cell]
+        r, c = cell
+        for dr, dc in DIRECTIONS:
+            move = (r + dr, c + dc)
+            if 0 <= move[0] < game.height and 0 <= move[1] < game.width \
+                    and move not in seen:
+                seen[move] = seen[cell] + 1
+                frontier.append(move)
+    return -1
+
+
+def extract_features(game, player):
+    """
+    Return the feature vector of a game state from the point of view of the
+    given player, in the order of `FEATURE_NAMES`.
+
+    Returns
+    ----------
+    list<float>
+        The feature values.
+    """
+    if isinstance(game, FeatureBoard):
+        return game.features(player)
+    opponent = game.get_opponent(player)
+    return [float(len(game.get_legal_moves(player))),
+            float(len(game.get_legal_moves(opponent))),
+            float(second_order_mobility(game, player)),
+            float(second_order_mobility(game, opponent)),
+            float(reachable_area(game, player)),
+            float(reachable_area(game, opponent)),
+            center_distance(game, player),
+            center_distance(game, opponent),
+            float(opponent_distance(game, player)),
+            game.move_count / float(game.width * game.height)]
+
+
+def knight_distances(width, height, source):
+    """
+    Return the (shared) knight-move distances on an empty board from a cell
+    index to every cell index, building them on first use (255 marks cells
+    that cannot be reached).
+    """
+    table = _KNIGHT_DISTANCES.setdefault((width, height), {})
+    distances = table.get(source)
+    if distances is None:
+        neighbors = knight_move_table(width, height)
+        distances = bytearray([255]) * (width * height)
+        distances[source] = 0
+        frontier = deque([source])
+        while frontier:
+            idx = frontier.popleft()
+            for n, _ in neighbors[idx]:
+                if distances[n] == 255:
+                    distances[n] = distances[idx] + 1
+                    frontier.append(n)
+        table[source] = distances
+    return distances
+
+
+class FeatureBoard(Board):
+    """
+    A `Board` that maintains, for every cell, the number of blank cells one
+    knight move away ("degree").  Blocking a cell updates the degree of its
+    (at most eight) neighbours, and `undo_move()` reverses it, so:
+
+        - mobility is the degree of the player's cell: O(1)
+        - two-step mobility is the sum of the degrees of the legal moves: O(8)
+        - the knight distance between the players is a table lookup: O(1)
+        - the reachable area is a flood fill over the degree table; it is the
+          only feature that costs time proportional to the player's region.
+
+    Parameters are the same as for `isolation.Board`.
+    """
+
+    __slots__ = ('__degree__', '__undo_stack__')
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        super(FeatureBoard, self).__init__(player_1, player_2, width, height)
+        self.__degree__ = bytearray(len(moves) for moves in self.__geometry__[1])
+        self.__undo_stack__ = []
+
+    @classmethod
+    def from_board(cls, game):
+        """ Return a feature board with the same state as a `Board`. """
+        new_board = object.__new__(cls)
+        for slot in Board.__slots__:
+            setattr(new_board, slot, getattr(game, slot))
+        new_board.__cells__ = game.__cells__[:]
+        table = game.__geometry__[1]
+        cells = new_board.__cells__
+        new_board.__degree__ = bytearray(
+            sum(1 for n, _ in moves if not cells[n]) for moves in table)
+        new_board.__undo_stack__ = []
+        return new_board
+
+    def __sizeof__(self):
+        return super(FeatureBoard, self).__sizeof__() + self.__degree__.__sizeof__()
+
+    def copy(self):
+        """ Return a deep copy of the current board (without undo history). """
+        new_board = super(FeatureBoard, self).copy()
+        new_board.__degree__ = self.__degree__[:]
+        new_board.__undo_stack__ = []
+        return new_board
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location and update the degree
+        of the neighbouring cells. See `isolation.Board.apply_move()`.
+        """
+        idx = cell_index(move, self.height)
+        last_idx = self.__p2_location__ if self.move_count & 1 else self.__p1_location__
+        self.__undo_stack__.append((idx, last_idx, self.__position_hash__))
+        super(FeatureBoard, self).apply_move(move)
+        degree = self.__degree__
+        for n, _ in self.__geometry__[1][idx]:
+            degree[n] -= 1
+
+    def undo_move(self):
+        """
+        Reverse the most recent apply_move() on this board (moves applied
+        before the board was copied cannot be undone on the copy).
+        """
+        idx, last_idx, position_hash = self.__undo_stack__.pop()
+        degree = self.__degree__
+        for n, _ in self.__geometry__[1][idx]:
+            degree[n] += 1
+        self.__cells__[idx] = Board.BLANK
+        self.__position_hash__ = position_hash
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count -= 1
+        if self.move_count & 1:
+            self.__p2_location__ = last_idx
+        else:
+            self.__p1_location__ = last_idx
+
+    def mobility(self, player):
+        """ Return the number of legal moves of the player. """
+        idx = self.__location_index__(player)
+        if idx is Board.NOT_MOVED:
+            return len(self.__cells__) - self.move_count
+        return self.__degree__[idx]
+
+    def second_order_mobility(self, player):
+        """ Return the number of two-move paths open to the player. """
+        idx = self.__location_index__(player)
+        if idx is Board.NOT_MOVED:
+            return second_order_mobility(self, player)
+        cells, degree = self.__cells__, self.__degree__
+        return sum(degree[n] for n, _ in self.__geometry__[1][idx] if not cells[n])
+
+    def reachable_area(self, player):
+        """ Return the number of blank cells the player could reach. """
+        idx = self.__location_index__(player)
+        if idx is Board.NOT_MOVED:
+            return len(self.__cells__) - self.move_count
+        cells, table = self.__cells__, self.__geometry__[1]
+        seen = {idx}
+        frontier = [idx]
+        while frontier:
+            for n, _ in table[frontier.pop()]:
+                if not cells[n] and n not in seen:
+                    seen.add(n)
+                    frontier.append(n)
+        return len(seen) - 1
+
+    def opponent_distance(self, player):
+        """ Return the knight distance between the players on an empty board. """
+        idx = self.__location_index__(player)
+        target = self.__location_index__(self.get_opponent(player))
+        if idx is Board.NOT_MOVED or target is Board.NOT_MOVED:
+            return 0
+        distance = knight_distances(self.width, self.height, idx)[target]
+        return -1 if distance == 255 else distance
+
+    def features(self, player):
+        """ Return the feature vector in the order of `FEATURE_NAMES`. """
+        opponent = self.get_opponent(player)
+        return [float(self.mobility(player)),
+                float(self.mobility(opponent)),
+                float(self.second_order_mobility(player)),
+                float(self.second_order_mobility(opponent)),
+                float(self.reachable_area(player)),
+                float(self.reachable_area(opponent)),
+                center_distance(self, player),
+                center_distance(self, opponent),
+                float(self.opponent_distance(player)),
+                self.move_count / float(self.width * self.height)]
@@ -0,0 +1,66 @@
+"""
+Test cases comparing the incremental features of `FeatureBoard` against
+brute-force recomputation.
+"""
+import random
+import unittest
+
+import isolation
+import features
+
+
+def brute_force(game, player):
+    """ Features recomputed from scratch on a plain copy of the board. """
+    plain = isolation.Board("p1", "p2", game.width, game.height)
+    for slot in isolation.Board.__slots__:
+        setattr(plain, slot, getattr(game, slot))
+    return features.extract_features(plain, player)
+
+
+class FeatureBoardTest(unittest.TestCase):
+
+    def assertFeaturesMatch(self, game):
+        for player in ("p1", "p2"):
+            self.assertEqual(game.features(player), brute_force(game, player))
+            self.assertEqual(game.mobility(player),
+                             len(game.get_legal_moves(player)))
+
+    def test_apply_and_undo_match_brute_force(self):
+        """ Features stay exact through random sequences of moves and undos """
+        for width, height in [(7, 7), (5, 6), (9, 9)]:
+            for seed in range(4):
+                rng = random.Random(seed)
+                game = features.FeatureBoard("p1", "p2", width, height)
+                history = []
+                for _ in range(3 * width * height):
+                    moves = game.get_legal_moves()
+                    if moves and (len(history) < 2 or rng.random() < 0.7):
+                        game.apply_move(rng.choice(moves))
+                        history.append((game.position_hash, game.to_string()))
+                    elif history:
+                        history.pop()
+                        game.undo_move()
+                        if history:
+                            self.assertEqual((game.position_hash, game.to_string()),
+                                             history[-1])
+                    else:
+                        break
+                    self.assertFeaturesMatch(game)
+
+    def test_copies_and_conversion(self):
+        """ Copies and converted boards carry exact features """
+        game = isolation.Board("p1", "p2")
+        for move in [(3, 3), (0, 0), (1, 4), (2, 2)]:
+            game.apply_move(move)
+        feature_game = features.FeatureBoard.from_board(game)
+        self.assertFeaturesMatch(feature_game)
+        for move in feature_game.get_legal_moves():
+            child = feature_game.forecast_move(move)
+            self.assertIsInstance(child, features.FeatureBoard)
+            self.assertFeaturesMatch(child)
+        self.assertEqual(features.extract_features(feature_game, "p1"),
+                         features.extract_features(game, "p1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
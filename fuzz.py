@@ -0,0 +1,261 @@
+'''
+Differential fuzzing of the optimized board engines and searches against the
+reference implementations.
+
+`isolation.Board` is the reference board engine and `CustomPlayer.minimax`
+the reference search.  The fuzzer plays seeded random games on boards of
+several sizes and, at every position of every game, checks that each
+alternative engine in `ENGINES` agrees with the reference on:
+
+    - the legal moves of both players and their locations;
+    - the winner, the loser and the utility for both players;
+    - the position hash and the move count;
+    - the same after copying the board, after converting a reference board
+      (`from_board()`), and after applying and undoing a move (`undo_move()`),
+      for the engines that support them;
+    - the incremental mobility (`mobility()`) and the number of legal moves.
+
+At a sample of the positions, every search in `SEARCHES` must return the same
+fixed-depth value as `CustomPlayer.minimax`.  Only value-preserving searches
+belong there: search extensions, late move reductions and futility pruning
+change the value of a fixed-depth search by design.
+
+Games are split into chunks that run on a pool of processes and are rebuilt
+from their seed in the worker, so a run scales with the number of cores.  A
+failure is reported with the seed and the index of its game, and
+`-S <seed> -g <game>` checks that single game again.
+
+usage: fuzz.py [-n <games>] [-s <board sizes>] [-d <depth>] [-r <search rate>] [-S <seed>] [-g <game>] [-p <processes>]
+'''
+import getopt
+import random
+import sys
+import timeit
+
+from multiprocessing import Pool
+
+from isolation import Board
+from features import FeatureBoard
+from eval_cache import EvaluationCache
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+BOARD_SIZES = (4, 5, 6, 7, 8, 9, 11, 13)
+NUM_GAMES = 2000  # default number of random games
+SEARCH_DEPTH = 3  # default depth of the search comparisons
+SEARCH_RATE = 0.02  # default fraction of positions searched
+UNDO_RATE = 0.5  # fraction of positions where a move is applied and undone
+CONVERT_RATE = 0.1  # fraction of positions where a reference board is converted
+CHUNK_SIZE = 50  # games per task
+
+# alternative board engines: name -> class with the `Board` constructor
+ENGINES = {"FeatureBoard": FeatureBoard}
+
+# alternative searches: name -> (CustomPlayer keyword arguments, use an
+# EvaluationCache shared by the searches of a task)
+SEARCHES = {"alphabeta": (dict(method='alphabeta'), False),
+            "alphabeta+FeatureBoard": (dict(method='alphabeta', feature_board=True), False),
+            "alphabeta+cache": (dict(method='alphabeta'), True),
+            "minimax+cache": (dict(method='minimax'), True)}
+
+
+def game_rng(seed, game_idx):
+    """ Return the random generator of one game of a run. """
+    return random.Random("%d:%d" % (seed, game_idx))
+
+
+def state(game):
+    """
+    Return everything the reference API says about a position, for the
+    comparison of two boards.
+    """
+    players = (game.active_player, game.inactive_player)
+    return (game.move_count, game.position_hash,
+            [game.get_player_location(p) for p in players],
+            [sorted(game.get_legal_moves(p)) for p in players],
+            [(game.is_winner(p), game.is_loser(p), game.utility(p)) for p in players])
+
+
+def check_engine(name, reference, board, label, convert=False):
+    """
+    Return the descriptions of the differences between two boards (and with
+    convert, the engine's conversion of the reference board).
+    """
+    expected = state(reference)
+    errors = []
+    variants = [("board", board), ("copy", board.copy())]
+    if convert and hasattr(type(board), "from_board"):
+        variants.append(("from_board", type(board).from_board(reference)))
+    for variant, other in variants:
+        actual = state(other)
+        if actual != expected:
+            errors.append("%s %s (%s): %s, expected %s" % (label, name, variant, actual, expected))
+        elif hasattr(other, "mobility"):
+            # incremental mobility counts of the engine against the legal moves
+            mobility = [other.mobility(p) for p in (other.active_player, other.inactive_player)]
+            if mobility != [len(moves) for moves in expected[3]]:
+                errors.append("%s %s (%s): mobility %s, expected %s" % (
+                    label, name, variant, mobility, [len(moves) for moves in expected[3]]))
+    return errors
+
+
+def check_search(name, options, cache, moves, width, height, depth, label):
+    """
+    Return the descriptions of the differences between the fixed-depth value
+    of an alternative search and of the reference minimax at a position.
+    """
+    def value(player, method):
+        players = (player, "opponent") if len(moves) % 2 == 0 else ("opponent", player)
+        game = Board(players[0], players[1], width, height)
+        for move in moves:
+            game.apply_move(move)
+        if getattr(player, "feature_board", False):
+            game = FeatureBoard.from_board(game)
+        player.time_left = lambda: float("inf")
+        return getattr(player, method)(game, depth)[0]
+
+    reference = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False)
+    player = CustomPlayer(search_depth=depth, score_fn=cache or improved_score,
+                          iterative=False, **options)
+    expected = value(reference, "minimax")
+    actual = value(player, player.method)
+    if actual != expected:
+        return ["%s %s: value %s, expected minimax %s" % (label, name, actual, expected)]
+    return []
+
+
+def fuzz_game(seed, game_idx, sizes=BOARD_SIZES, depth=SEARCH_DEPTH,
+              search_rate=SEARCH_RATE, caches=None):
+    """
+    Play one random game on the reference and the alternative engines and
+    return (the number of positions checked, the number of searches
+    compared, failure descriptions).
+    """
+    rng = game_rng(seed, game_idx)
+    size = rng.choice(sizes)
+    width, height = size, rng.choice((size, size + 1))
+    reference = Board("player_1", "player_2", width, height)
+    boards = {name: cls("player_1", "player_2", width, height) for name, cls in ENGINES.items()}
+    caches = caches if caches is not None else {}
+    moves = []
+    errors = []
+    num_positions = num_searches = 0
+    while not errors:
+        label = "seed %d game %d %dx%d moves %s:" % (seed, game_idx, width, height, moves)
+        num_positions += 1
+        legal_moves = reference.get_legal_moves()
+        for name, board in boards.items():
+            errors.extend(check_engine(name, reference, board, label,
+                                       rng.random() < CONVERT_RATE))
+            if legal_moves and hasattr(board, "undo_move") and rng.random() < UNDO_RATE:
+                board.apply_move(rng.choice(legal_moves))
+                board.undo_move()
+                errors.extend(check_engine(name + " (undo)", reference, board, label))
+        if legal_moves and reference.move_count >= 2 and rng.random() < search_rate:
+            num_searches += 1
+            for name, (options, cached) in SEARCHES.items():
+                cache = caches.setdefault(name, EvaluationCache(improved_score)) if cached else None
+                errors.extend(check_search(name, options, cache, moves, width, height, depth, label))
+        if not legal_moves:
+            break
+        moves.append(rng.choice(legal_moves))
+        reference.apply_move(moves[-1])
+        for board in boards.values():
+            board.apply_move(moves[-1])
+    return num_positions, num_searches, errors
+
+
+def fuzz_games(seed, game_indices, sizes=BOARD_SIZES, depth=SEARCH_DEPTH, search_rate=SEARCH_RATE):
+    """ Fuzz a chunk of games and return the totals of `fuzz_game()`. """
+    caches = {}
+    num_positions = num_searches = 0
+    errors = []
+    for game_idx in game_indices:
+        positions, searches, game_errors = fuzz_game(seed, game_idx, sizes, depth, search_rate, caches)
+        num_positions += positions
+        num_searches += searches
+        errors.extend(game_errors)
+    return num_positions, num_searches, errors
+
+
+def run(num_games=NUM_GAMES, sizes=BOARD_SIZES, depth=SEARCH_DEPTH, search_rate=SEARCH_RATE,
+        seed=0, games=None, processes=None):
+    """
+    Fuzz games (all of range(num_games) unless a list of game indices is
+    given) on a pool of processes. Returns (the number of positions checked,
+    the number of searches compared, failure descriptions).
+    """
+    games = list(range(num_games)) if games is None else games
+    chunks = [games[idx:idx + CHUNK_SIZE] for idx in range(0, len(games), CHUNK_SIZE)]
+    num_positions = num_searches = 0
+    errors = []
+    with Pool(processes=processes) as pool:
+        results = [pool.apply_async(fuzz_games, (seed, chunk, sizes, depth, search_rate))
+                   for chunk in chunks]
+        for result in results:
+            positions, searches, chunk_errors = result.get()
+            num_positions += positions
+            num_searches += searches
+            errors.extend(chunk_errors)
+    return num_positions, num_searches, errors
+
+
+def main(argv):
+
+    USAGE = """usage: fuzz.py [-n <games>] [-s <board sizes>] [-d <depth>] [-r <search rate>] [-S <seed>] [-g <game>] [-p <processes>]
+            -n games: optional number of random games - default is 2000
+            -s board sizes: optional comma separated list of board sizes - default is 4,5,6,7,8,9,11,13
+            -d depth: optional depth of the search comparisons - default is 3
+            -r search rate: optional fraction of positions searched - default is 0.02
+            -S seed: optional seed of the run - default is 0
+            -g game: optional index of a single game to check (e.g., to reproduce a failure)
+            -p processes: optional number of worker processes - default is the number of CPUs"""
+
+    num_games = NUM_GAMES
+    sizes = BOARD_SIZES
+    depth = SEARCH_DEPTH
+    search_rate = SEARCH_RATE
+    seed = 0
+    games = None
+    processes = None
+    try:
+        opts, args = getopt.getopt(argv, "hn:s:d:r:S:g:p:",
+                                   ["games=", "sizes=", "depth=", "rate=", "seed=", "game=", "processes="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-n", "--games"):
+            num_games = int(arg)
+        elif opt in ("-s", "--sizes"):
+            sizes = tuple(int(size) for size in arg.split(","))
+        elif opt in ("-d", "--depth"):
+            depth = int(arg)
+        elif opt in ("-r", "--rate"):
+            search_rate = float(arg)
+        elif opt in ("-S", "--seed"):
+            seed = int(arg)
+        elif opt in ("-g", "--game"):
+            games = [int(arg)]
+        elif opt in ("-p", "--processes"):
+            processes = int(arg)
+
+    start = timeit.default_timer()
+    num_positions, num_searches, errors = run(num_games, sizes, depth, search_rate,
+                                              seed, games, processes)
+    elapsed = timeit.default_timer() - start
+    for error in errors:
+        print("FAIL: " + error)
+    print("Checked {} positions ({:.0f}/s) on {} engine(s) and {} searches on {} search(es) "
+          "in {:.1f}s: {}".format(num_positions, num_positions / elapsed, len(ENGINES),
+                                  num_searches, len(SEARCHES), elapsed,
+                                  "FAILED ({} failures)".format(len(errors)) if errors else "OK"))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
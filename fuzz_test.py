@@ -0,0 +1,46 @@
+"""
+Test cases for the differential fuzz harness.
+"""
+import unittest
+
+import fuzz
+from features import FeatureBoard
+
+
+class BrokenBoard(FeatureBoard):
+    """ A feature board that forgets to block the corner cell. """
+
+    __slots__ = ()
+
+    def get_legal_moves(self, player=None):
+        moves = super(BrokenBoard, self).get_legal_moves(player)
+        if self.get_player_location(player or self.active_player) is None and \
+                (0, 0) not in moves:
+            moves.append((0, 0))
+        return moves
+
+
+class FuzzTest(unittest.TestCase):
+
+    def test_engines_and_searches_agree(self):
+        """ The optimized engines and searches match the references """
+        positions, searches, errors = fuzz.fuzz_games(0, range(10), sizes=(5, 7), search_rate=0.2)
+        self.assertEqual(errors, [])
+        self.assertGreater(positions, 100)
+        self.assertGreater(searches, 5)
+
+    def test_reports_differences(self):
+        """ A faulty engine is reported with the game that reproduces it """
+        engines = fuzz.ENGINES
+        fuzz.ENGINES = {"broken": BrokenBoard}
+        try:
+            errors = [error for game_idx in range(20)
+                      for error in fuzz.fuzz_game(3, game_idx, sizes=(4,), search_rate=0)[2]]
+        finally:
+            fuzz.ENGINES = engines
+        self.assertTrue(errors)
+        self.assertTrue(errors[0].startswith("seed 3 game "), errors[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,8 +8,12 @@ relative strength using tournament.py and include the results in your report.
 """
 
 import logging
+from collections import namedtuple
 from math import inf, sqrt
 
+from features import FeatureBoard
+from solver import exact_score
+
 logging.basicConfig(level=logging.ERROR)
 
 class Timeout(Exception):
@@ -17,6 +21,9 @@ class Timeout(Exception):
     pass
 
 
+Iteration = namedtuple("Iteration", ["depth", "score", "pv"])
+
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -76,10 +83,13 @@ def __heuristic3__(game, player):
         return float(own_moves - 2 * opp_moves)
 
 def __distance_from_center__(game, player):
-    """ Calculates the Euclidean distance from the center
+    """ Calculates the Euclidean distance from the center, scaled so that it
+    spans the same range on every board size as on a 7x7 board (where mobility
+    is comparable)
     """
-    x,y = game.get_player_location(player)
-    return sqrt( (x - game.width/2)**2 + (y - game.height/2)**2 )
+    row, col = game.get_player_location(player)
+    distance = sqrt( (row - game.height/2)**2 + (col - game.width/2)**2 )
+    return distance * 7. / max(game.width, game.height)
 
 
 class ParameterizedEvaluationFunction:
@@ -163,11 +173,64 @@ class CustomPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    feature_board : boolean (optional)
+        Flag indicating whether to search on a `features.FeatureBoard`, which
+        keeps mobility and reachability features up to date incrementally for
+        score functions that use `features.extract_features`.
+
+    extension_budget : int (optional)
+        The maximum number of plies alphabeta may search beyond the nominal
+        depth along a forcing line; zero disables the extension.
+
+    extension_mobility : int (optional)
+        A leaf is searched one ply deeper (while extension budget remains) if
+        either player has at most this many legal moves.
+
+    late_move_reduction : boolean (optional)
+        Flag indicating whether alphabeta searches late moves one ply
+        shallower, re-searching at full depth when the reduced search beats
+        the current bound.
+
+    lmr_full_depth_moves : int (optional)
+        The number of moves at each node that are never reduced.
+
+    lmr_min_depth : int (optional)
+        The minimum remaining depth at which moves are reduced.
+
+    futility_margin : float (optional)
+        If not None, alphabeta returns the static score at frontier nodes
+        (depth 1) when it is worse than the bound by more than this margin;
+        None disables futility pruning.
+
+    iteration_hook : callable (optional)
+        Called with an `Iteration` (depth, score, principal variation) after
+        every completed search iteration in get_move().
+
+    tablebase : `solver.Tablebase` (optional)
+        Solved positions probed at the leaves of the search; a leaf found in
+        the tablebase is scored exactly (see `solver.exact_score`) instead of
+        with the heuristic.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 feature_board=False, extension_budget=0, extension_mobility=2,
+                 late_move_reduction=False, lmr_full_depth_moves=3, lmr_min_depth=3,
+                 futility_margin=None, iteration_hook=None, tablebase=None):
         self.search_depth = search_depth
+        self.feature_board = feature_board
+        self.extension_budget = extension_budget
+        self.extension_mobility = extension_mobility
+        self.late_move_reduction = late_move_reduction
+        self.lmr_full_depth_moves = lmr_full_depth_moves
+        self.lmr_min_depth = lmr_min_depth
+        self.futility_margin = futility_margin
+        self.iteration_hook = iteration_hook
+        self.tablebase = tablebase
+        self.iterations = []
+        self.pv_table = [[]]
+        self.pv_order = {}
         self.iterative = iterative
         self.score = score_fn
         self.method = method
@@ -213,15 +276,20 @@ class CustomPlayer:
         logging.debug("get_move - legal moves: %s", str(legal_moves))
         
         self.time_left = time_left
+        self.iterations = []
 
 
         # Check if we have any legal moves
         if not legal_moves:
             return (-1, -1)
 
+        if self.feature_board:
+            game = FeatureBoard.from_board(game)
+
         # Let's set best move so far to be the first legal move so we always 
         # have something to return in case of timeout
         self.best_move_so_far = legal_moves[0]
+        self.pv_order = {}
         
          
         # Perform any required initializations, including selecting an initial
@@ -237,15 +305,17 @@ class CustomPlayer:
                 it = 1
                 while True:
                     if self.method == 'minimax':
-                        _, self.best_move_so_far = self.minimax(game, it)
+                        score, self.best_move_so_far = self.minimax(game, it)
                     else:
-                        _, self.best_move_so_far = self.alphabeta(game, it)
+                        score, self.best_move_so_far = self.alphabeta(game, it)
+                    self.__record_iteration__(game, it, score)
                     it += 1
             else:    
                 if self.method == 'minimax':
-                    _, self.best_move_so_far = self.minimax(game, self.search_depth)
+                    score, self.best_move_so_far = self.minimax(game, self.search_depth)
                 else:
-                    _, self.best_move_so_far = self.alphabeta(game, self.search_depth)
+                    score, self.best_move_so_far = self.alphabeta(game, self.search_depth)
+                self.__record_iteration__(game, self.search_depth, score)
 
         except Timeout:
             # Handle any actions required at timeout, if necessary
@@ -257,7 +327,7 @@ class CustomPlayer:
 
         return self.best_move_so_far
 
-    def minimax(self, game, depth, maximizing_player=True):
+    def minimax(self, game, depth, maximizing_player=True, ply=0):
         """Implement the minimax search algorithm as described in the lectures.
 
         Parameters
@@ -274,6 +344,10 @@ class CustomPlayer:
             Flag indicating whether the current search depth corresponds to a
             maximizing layer (True) or a minimizing layer (False)
 
+        ply : int
+            Distance from the root of the search; the principal variation
+            from this node is left in self.pv_table[ply]
+
         Returns
         -------
         float
@@ -294,9 +368,13 @@ class CustomPlayer:
         # If we are out of time then jump out
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()      
+
+        if ply == 0:
+            self.pv_table = [[] for _ in range(depth + 2)]
+        self.pv_table[ply] = []
         
         if depth <= 0:  # Last row to search so return score of this board
-            return self.score(game, self),(-1,-1)
+            return self.__leaf_score__(game),(-1,-1)
         
         # Otherwise search the next layer
         legal_moves = game.get_legal_moves()
@@ -306,17 +384,22 @@ class CustomPlayer:
             return self.score(game, self),(-1,-1)
 
         results = []
+        child_pvs = {}
         for m in legal_moves:
-            score, _ = self.minimax(game.forecast_move(m), depth-1, not maximizing_player)
+            score, _ = self.minimax(game.forecast_move(m), depth-1, not maximizing_player, ply+1)
             results.append((score,m))
+            child_pvs[m] = self.pv_table[ply+1]
                                        
         if maximizing_player:
-            return max(results)
+            best = max(results)
         else:
-            return min(results)
+            best = min(results)
+        self.pv_table[ply] = [best[1]] + child_pvs[best[1]]
+        return best
         
 
-    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
+    def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True,
+                  extensions=None, ply=0):
         """Implement minimax search with alpha-beta pruning as described in the
         lectures.
 
@@ -340,6 +423,14 @@ class CustomPlayer:
             Flag indicating whether the current search depth corresponds to a
             maximizing layer (True) or a minimizing layer (False)
 
+        extensions : int
+            The remaining number of plies this line may be extended beyond
+            depth; None starts with self.extension_budget
+
+        ply : int
+            Distance from the root of the search; the principal variation
+            from this node is left in self.pv_table[ply]
+
         Returns
         -------
         float
@@ -359,27 +450,58 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
-        if depth <= 0:  # last row to search so return score of this board
-            score = self.score(game, self)
+        if extensions is None:
+            extensions = self.extension_budget
+        if ply == 0:
+            self.pv_table = [[] for _ in range(depth + extensions + 2)]
+        self.pv_table[ply] = []
+
+        if depth <= 0 and not extensions:  # last row to search so return score of this board
+            score = self.__leaf_score__(game)
             return score,(-1,-1)
       
         # Otherwise search the next layer
         legal_moves = game.get_legal_moves()
 
+        # Keep searching forcing lines (very low mobility on either side)
+        # beyond the nominal depth while the extension budget lasts
+        if depth <= 0:
+            if len(legal_moves) > self.extension_mobility and \
+               len(game.get_legal_moves(game.inactive_player)) > self.extension_mobility:
+                return self.__leaf_score__(game),(-1,-1)
+            depth = 1
+            extensions -= 1
+
         # Check for some legal moves - if none return score of this board
         if len(legal_moves) == 0:
             return self.score(game, self),(-1,-1)
 
+        # Search the move of the previous iteration's principal variation first
+        pv_move = self.pv_order.get(game.position_hash)
+        if pv_move in legal_moves and legal_moves[0] != pv_move:
+            legal_moves.remove(pv_move)
+            legal_moves.insert(0, pv_move)
+
+        # Futility pruning: at frontier nodes give up on positions whose static
+        # score is hopelessly outside the window (never at the root)
+        if depth == 1 and self.futility_margin is not None:
+            static = self.score(game, self)
+            if maximizing_player and alpha > -inf and static + self.futility_margin <= alpha:
+                return static,(-1,-1)
+            if not maximizing_player and beta < inf and static - self.futility_margin >= beta:
+                return static,(-1,-1)
+
         # Perform max layer search       
         if maximizing_player:
             value = -inf
             best_move_so_far = (-1,-1)
-            for m in legal_moves:
+            for idx, m in enumerate(legal_moves):
                 logging.debug("  Max layer - trying this move: %s", str(m))
-                this_value, _ = self.alphabeta(game.forecast_move(m), depth-1, alpha, beta, not maximizing_player)
+                this_value = self.__search_child__(game.forecast_move(m), idx, depth, alpha, beta, maximizing_player, extensions, ply)
                 if this_value > value:
                     value = this_value
                     best_move_so_far = m
+                    self.pv_table[ply] = [m] + self.pv_table[ply+1]
                 if value >= beta:
                     return value,m
                 alpha = max(alpha, value)
@@ -389,19 +511,54 @@ class CustomPlayer:
         else:
             value = inf
             best_move_so_far = (-1,-1)
-            for m in legal_moves:
+            for idx, m in enumerate(legal_moves):
                 logging.debug("  Min layer - trying this move: %s", str(m))
-                this_value, _ = self.alphabeta(game.forecast_move(m), depth-1, alpha, beta, not maximizing_player)
+                this_value = self.__search_child__(game.forecast_move(m), idx, depth, alpha, beta, maximizing_player, extensions, ply)
                 if this_value < value:
                     value = this_value
                     best_move_so_far = m
+                    self.pv_table[ply] = [m] + self.pv_table[ply+1]
                 if value <= alpha:
                     return value,m
                 beta = min(beta, value)
             return value, m
 
-
-
-        
-        
-        
+    def __search_child__(self, child, idx, depth, alpha, beta, maximizing_player, extensions, ply):
+        """Search the child reached by the idx-th move of an alphabeta node and
+        return its score. With late move reductions enabled, late moves are
+        first searched one ply shallower and only re-searched at full depth if
+        the reduced score improves on the bound of the node.
+        """
+        if self.late_move_reduction and idx >= self.lmr_full_depth_moves and \
+           depth >= self.lmr_min_depth:
+            value, _ = self.alphabeta(child, depth-2, alpha, beta, not maximizing_player, extensions, ply+1)
+            if (maximizing_player and value <= alpha) or (not maximizing_player and value >= beta):
+                return value
+        value, _ = self.alphabeta(child, depth-1, alpha, beta, not maximizing_player, extensions, ply+1)
+        return value
+
+    def __leaf_score__(self, game):
+        """Return the exact score of a leaf found in the tablebase, and its
+        heuristic score otherwise.
+        """
+        if self.tablebase is not None:
+            value = self.tablebase.probe(game)
+            if value is not None:
+                return exact_score(value, game.active_player == self)
+        return self.score(game, self)
+
+    def __record_iteration__(self, game, depth, score):
+        """Log a completed search iteration with its principal variation, pass
+        it to the iteration hook, and remember the principal variation by
+        position hash so the next alphabeta iteration searches it first.
+        """
+        iteration = Iteration(depth, score, list(self.pv_table[0]))
+        self.iterations.append(iteration)
+        if self.method == 'alphabeta':
+            self.pv_order = {}
+            position = game.copy()
+            for move in iteration.pv:
+                self.pv_order[position.position_hash] = move
+                position.apply_move(move)
+        if self.iteration_hook is not None:
+            self.iteration_hook(iteration)
@@ -0,0 +1,147 @@
+"""
+Test cases for the search extensions of CustomPlayer that are not covered by
+the project test suite in agent_test.py.
+"""
+import random
+import unittest
+
+import isolation
+import game_agent
+from sample_players import improved_score, null_score
+
+
+def random_game(player_1, player_2, num_moves, seed, width=7, height=7):
+    """ Return a board after the given number of random moves. """
+    rng = random.Random(seed)
+    game = isolation.Board(player_1, player_2, width, height)
+    for _ in range(num_moves):
+        moves = game.get_legal_moves()
+        if not moves:
+            break
+        game.apply_move(rng.choice(moves))
+    return game
+
+
+def make_player(**kwargs):
+    """ Return a fixed-depth alpha-beta agent that never times out. """
+    kwargs.setdefault("score_fn", improved_score)
+    kwargs.setdefault("method", 'alphabeta')
+    player = game_agent.CustomPlayer(iterative=False, **kwargs)
+    player.time_left = lambda: float("inf")
+    return player
+
+
+class ExtensionTest(unittest.TestCase):
+
+    def test_full_extension_equals_deeper_search(self):
+        """ Extending every leaf is the same as searching deeper """
+        player = make_player(score_fn=null_score, extension_mobility=8)
+        for seed in range(10):
+            game = random_game(player, "opponent", 20, seed)
+            player.extension_budget = 2
+            extended_value, _ = player.alphabeta(game, 2)
+            player.extension_budget = 0
+            self.assertEqual(extended_value, player.alphabeta(game, 4)[0])
+
+    def test_quiet_positions_are_not_extended(self):
+        """ Leaves where both sides have many moves are scored statically """
+        player = make_player(extension_mobility=0)
+        game = isolation.Board(player, "opponent")
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        player.extension_budget = 4
+        extended = player.alphabeta(game, 3)
+        player.extension_budget = 0
+        self.assertEqual(extended, player.alphabeta(game, 3))
+
+
+class PruningTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+        def counting_score(game, player):
+            self.calls += 1
+            return improved_score(game, player)
+
+        self.player = make_player(score_fn=counting_score)
+
+    def search(self, game, depth, **options):
+        """ Return the result and number of evaluations of a search. """
+        for name, value in options.items():
+            setattr(self.player, name, value)
+        self.calls = 0
+        result = self.player.alphabeta(game, depth)
+        return result, self.calls
+
+    def test_disabled_options_match_plain_search(self):
+        """ LMR without reducible moves or an infinite margin changes nothing """
+        for seed in range(5):
+            game = random_game(self.player, "opponent", 10, seed)
+            plain = self.search(game, 4)
+            self.assertEqual(self.search(game, 4, late_move_reduction=True,
+                                         lmr_full_depth_moves=8), plain)
+            result, _ = self.search(game, 4, late_move_reduction=False,
+                                    futility_margin=float("inf"))
+            self.assertEqual(result, plain[0])
+            self.player.futility_margin = None
+
+    def test_reductions_and_pruning_save_evaluations(self):
+        """ Each option evaluates fewer leaves and still returns a legal move """
+        saved = {"late_move_reduction": 0, "futility_margin": 0}
+        for seed in range(5):
+            game = random_game(self.player, "opponent", 4, seed)
+            _, plain_calls = self.search(game, 5)
+            for name, value in [("late_move_reduction", True), ("futility_margin", 0.)]:
+                (_, move), calls = self.search(game, 5, **{name: value})
+                self.assertIn(move, game.get_legal_moves())
+                saved[name] += plain_calls - calls
+                self.search(game, 5, late_move_reduction=False, futility_margin=None)
+        self.assertGreater(saved["late_move_reduction"], 0)
+        self.assertGreater(saved["futility_margin"], 0)
+
+
+class PrincipalVariationTest(unittest.TestCase):
+
+    def test_pv_is_a_legal_line(self):
+        """ The PV starts with the returned move and is a sequence of legal moves """
+        for method in ('minimax', 'alphabeta'):
+            player = make_player(method=method)
+            for seed in range(5):
+                game = random_game(player, "opponent", 6, seed)
+                _, move = getattr(player, method)(game, 4)
+                pv = player.pv_table[0]
+                self.assertEqual(pv[0], move)
+                self.assertTrue(1 <= len(pv) <= 4)
+                for pv_move in pv:
+                    self.assertIn(pv_move, game.get_legal_moves())
+                    game = game.forecast_move(pv_move)
+
+    def test_iterations_are_reported_and_seed_ordering(self):
+        """ get_move reports every iteration and reorders with the last PV """
+        reported = []
+        player = game_agent.CustomPlayer(score_fn=improved_score, method='alphabeta',
+                                         iteration_hook=reported.append)
+        game = random_game(player, "opponent", 6, 0)
+        calls = [0]
+
+        def time_left():
+            calls[0] += 1
+            return 1000. if calls[0] < 5000 else 0.
+
+        move = player.get_move(game, game.get_legal_moves(), time_left)
+        self.assertEqual(reported, player.iterations)
+        self.assertEqual([it.depth for it in reported], list(range(1, len(reported) + 1)))
+        self.assertGreater(len(reported), 2)
+        self.assertEqual(move, reported[-1].pv[0])
+        self.assertEqual(player.pv_order[game.position_hash], reported[-1].pv[0])
+
+        # PV ordering never changes the value of a full-window search
+        player.time_left = lambda: float("inf")
+        ordered_value, _ = player.alphabeta(game, 4)
+        player.pv_order = {}
+        self.assertEqual(ordered_value, player.alphabeta(game, 4)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
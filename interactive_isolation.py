@@ -4,6 +4,7 @@ Created on Mar 7, 2017
 @author: richard
 '''
 import random
+import sys
 
 from isolation import Board
 from sample_players import HumanPlayer
@@ -11,9 +12,19 @@ from sample_players import improved_score
 from game_agent import CustomPlayer
 
 
+def print_iteration(iteration):
+    """Print the score and principal variation of a search iteration"""
+    print("  depth %2d  score %6s  pv %s" %
+          (iteration.depth, iteration.score, " ".join(str(m) for m in iteration.pv)))
+
+
 if __name__ == '__main__':
+    # Run with -v to see the computer's search (score and principal variation
+    # per iteration)
+    hook = print_iteration if '-v' in sys.argv[1:] else None
     human = HumanPlayer()
-    computer = CustomPlayer(score_fn=improved_score,method='alphabeta')
+    computer = CustomPlayer(score_fn=improved_score,method='alphabeta',
+                            iteration_hook=hook)
     # Randomize who goes first
     if (random.randint(0,1)):
         print("You are player 'O'")
@@ -13,7 +13,43 @@ import io
 from .isolation import Board
 
 
-def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
+def write_game(ofile, winner, move_history, termination="", board=None, width=7, height=7):
+    """
+    Write a printable representation of a game of isolation to a text
+    file-like object, one board after every half-move.
+
+    Parameters
+    ----------
+    ofile : file-like object
+        The text stream to write to (e.g., an open file or `io.StringIO`).
+
+    winner, move_history, termination
+        See `game_as_text()`.
+
+    board : isolation.Board (optional)
+        The position the game started from; it is copied, not modified.
+        Default is a new, empty board.
+
+    width, height : int (optional)
+        The board dimensions of the new board when no board is given.
+    """
+    board = Board(1, 2, width, height) if board is None else board.copy()
+    write = ofile.write
+
+    for i, move in enumerate(move_history):
+        for player, fmt in enumerate(("%d. (%d,%d)\r\n", "%d. ... (%d, %d)\r\n")[:len(move)]):
+            curr_move = move[player]
+            write(fmt % ((i,) + tuple(curr_move or (-1, -1))))
+            # an illegal move (e.g., (-1, -1)) ended the game and is not applied
+            if curr_move in board.get_legal_moves():
+                board.apply_move(curr_move)
+            board.write_board(ofile)
+
+    write(termination + "\r\n")
+    write("Winner: " + str(winner) + "\r\n")
+
+
+def game_as_text(winner, move_history, termination="", board=None, width=7, height=7):
     """
     Generate a printable representation for a game of isolation.
 
@@ -35,34 +71,19 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         Valid reasons for termination include "" (none), "timeout", and
         "illegal move".
 
-    board : isolation.Board
+    board : isolation.Board (optional)
         An instance of `isolation.Board` encoding the game state (e.g., player
-        locations and blocked cells) for a game of isolation.
+        locations and blocked cells) the game started from; it is copied, not
+        modified.  Default is a new, empty board.
+
+    width, height : int (optional)
+        The board dimensions of the new board when no board is given.
 
     Returns
     ----------
     str
         A string representation of a game of isolation.
     """
-
     ans = io.StringIO()
-
-    for i, move in enumerate(move_history):
-        p1_move = move[0]
-        ans.write("%d." % i + " (%d,%d)\r\n" % p1_move)
-        if p1_move != Board.NOT_MOVED:
-            board.apply_move(p1_move)
-        ans.write(board.print_board())
-
-        if len(move) > 1:
-            p2_move = move[1]
-            ans.write("%d. ..." % i + " (%d, %d)\r\n" % p2_move)
-            if p2_move != Board.NOT_MOVED:
-                board.apply_move(p2_move)
-            ans.write(board.print_board())
-
-    ans.write(termination + "\r\n")
-
-    ans.write("Winner: " + str(winner) + "\r\n")
-
+    write_game(ans, winner, move_history, termination, board, width, height)
     return ans.getvalue()
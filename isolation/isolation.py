@@ -8,14 +8,153 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
+import time
 import timeit
 
-from copy import deepcopy
-from copy import copy
+from collections import namedtuple
+from itertools import compress
+
 from sample_players import HumanPlayer
 
 TIME_LIMIT_MILLIS = 200
 HUMAN_TIME_LIMIT_MILLIS = 300000 # five minutes
+WALL_CAP_FACTOR = 4  # wall-clock allowance per turn in cpu_time mode, in time limits
+
+MoveTiming = namedtuple("MoveTiming", ["player", "ply", "wall", "cpu", "remaining", "depth"])
+
+_GEOMETRIES = {}
+_TEMPLATES = {}
+_BLANK_MASK = bytes([1] + [0] * 255)  # translates blank cells to 1, others to 0
+_CELL_SYMBOLS = b" " + b"-" * 255  # translates blank cells to ' ', others to '-'
+
+DIRECTIONS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1))
+
+
+def cell_index(move, height):
+    """
+    Return the index of a (row, col) cell in the flat board state. Cells are
+    stored column by column, so that scanning the state lists the cells in
+    the same order as Board.get_blank_spaces() always has.
+    """
+    return move[1] * height + move[0]
+
+
+def cell_coordinates(width, height):
+    """
+    Return the (shared) list mapping a flat cell index to its (row, col)
+    coordinate pair.
+    """
+    return _geometry(width, height)[0]
+
+
+def knight_move_table(width, height):
+    """
+    Return the knight-move neighbour table for a board size, building it on
+    first use. The table is shared by every board of the same size.
+
+    Returns
+    ----------
+    list<tuple<(int, (int, int))>>
+        For each cell index, the index and the coordinate pair of each cell
+        one knight move away that lies on the board.
+    """
+    return _geometry(width, height)[1]
+
+
+def zobrist_keys(width, height):
+    """
+    Return the Zobrist hashing keys for a board size, building them on first
+    use. The keys are generated from a fixed seed, so hashes are identical in
+    every process.
+
+    Returns
+    ----------
+    (list<int>, list<int>, list<int>, int)
+        The keys for a blocked cell, for player 1 and for player 2 standing
+        on a cell (indexed by cell index), and the key toggled on every ply.
+    """
+    return _geometry(width, height)[2]
+
+
+def _geometry(width, height):
+    """
+    Return the coordinate list, knight-move table and Zobrist keys for a
+    board size, building them on first use.
+    """
+    geometry = _GEOMETRIES.get((width, height))
+    if geometry is None:
+        coords = [(r, c) for c in range(width) for r in range(height)]
+        table = [tuple((cell_index((r + dr, c + dc), height), (r + dr, c + dc))
+                       for dr, dc in DIRECTIONS
+                       if 0 <= r + dr < height and 0 <= c + dc < width)
+                 for r, c in coords]
+        rng = random.Random("zobrist-%dx%d" % (width, height))
+        num_cells = width * height
+        keys = ([rng.getrandbits(64) for _ in range(num_cells)],
+                [rng.getrandbits(64) for _ in range(num_cells)],
+                [rng.getrandbits(64) for _ in range(num_cells)],
+                rng.getrandbits(64))
+        geometry = _GEOMETRIES[(width, height)] = (coords, table, keys)
+    return geometry
+
+
+def render_template(width, height):
+    """
+    Return the (shared) text template of the string representation of a
+    board size, building it on first use.
+
+    Returns
+    ----------
+    (bytes, list<slice>, list<int>)
+        The representation of an empty board, the slice of the template
+        holding each row of cells (one character every four), and the offset
+        in the template of each cell (indexed by cell index).
+    """
+    template = _TEMPLATES.get((width, height))
+    if template is None:
+        label_width = len(str(height - 1))
+        labels = ''.join('{:<4}'.format(j) for j in range(width)).rstrip()
+        text = ' ' * (label_width + 3) + labels + '\n\r'
+        rows = []
+        offsets = [0] * (width * height)
+        for i in range(height):
+            text += str(i).ljust(label_width) + ' | '
+            rows.append(slice(len(text), len(text) + 4 * width, 4))
+            for j in range(width):
+                offsets[cell_index((i, j), height)] = len(text) + 4 * j
+            text += '  | ' * width + '\n\r'
+        template = _TEMPLATES[(width, height)] = (text.encode('ascii'), rows, offsets)
+    return template
+
+
+class NodeCounter(object):
+    """
+    Node accounting for searches on a `Board` (see `Board.count_nodes()`).
+
+    Every forecast_move() on a counted board increments `total`, adds the
+    position hash of the new node to `positions` and marks the cell moved to,
+    so `unique` is the number of distinct positions a search generated and
+    `cells` the number of distinct cells it moved to.
+    """
+
+    __slots__ = ('total', 'positions', 'visited_cells')
+
+    def __init__(self, num_cells):
+        self.total = 0
+        self.positions = set()
+        self.visited_cells = bytearray(num_cells)
+
+    @property
+    def unique(self):
+        """ The number of distinct positions generated. """
+        return len(self.positions)
+
+    @property
+    def cells(self):
+        """ The number of distinct cells moved to. """
+        return self.visited_cells.count(1)
 
 
 class Board(object):
@@ -23,6 +162,12 @@ class Board(object):
     Implement a model for the game Isolation assuming each player moves like
     a knight in chess.
 
+    The game state is stored compactly: the cells are a flat `bytearray`
+    (0 for blank, 1 or 2 for a cell blocked by player 1 or 2) and the player
+    locations are cell indices (None before a player has moved). Coordinate
+    lists, neighbour tables and hashing keys are shared by all boards of the
+    same size, so copying a board copies a single buffer.
+
     Parameters
     ----------
     player_1 : object
@@ -42,6 +187,12 @@ class Board(object):
     BLANK = 0
     NOT_MOVED = None
 
+    __slots__ = ('width', 'height', 'move_count',
+                 '__player_1__', '__player_2__',
+                 '__active_player__', '__inactive_player__',
+                 '__cells__', '__p1_location__', '__p2_location__',
+                 '__position_hash__', '__geometry__', '__node_counter__')
+
     def __init__(self, player_1, player_2, width=7, height=7):
         self.width = width
         self.height = height
@@ -50,9 +201,24 @@ class Board(object):
         self.__player_2__ = player_2
         self.__active_player__ = player_1
         self.__inactive_player__ = player_2
-        self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
-        self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
-        self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__cells__ = bytearray(width * height)
+        self.__p1_location__ = Board.NOT_MOVED
+        self.__p2_location__ = Board.NOT_MOVED
+        self.__position_hash__ = 0
+        self.__geometry__ = _geometry(width, height)
+        self.__node_counter__ = None
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.__cells__.__sizeof__()
+
+    @property
+    def position_hash(self):
+        """
+        A 64-bit Zobrist hash of the current game state (blocked cells,
+        player locations and player to move), updated incrementally by
+        apply_move().
+        """
+        return self.__position_hash__
 
     @property
     def active_player(self):
@@ -94,13 +260,20 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        new_board = object.__new__(self.__class__)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
         new_board.__active_player__ = self.__active_player__
         new_board.__inactive_player__ = self.__inactive_player__
-        new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__cells__ = self.__cells__[:]
+        new_board.__p1_location__ = self.__p1_location__
+        new_board.__p2_location__ = self.__p2_location__
+        new_board.__position_hash__ = self.__position_hash__
+        new_board.__geometry__ = self.__geometry__
+        new_board.__node_counter__ = self.__node_counter__
         return new_board
 
     def forecast_move(self, move):
@@ -121,8 +294,29 @@ class Board(object):
         """
         new_board = self.copy()
         new_board.apply_move(move)
+        counter = self.__node_counter__
+        if counter is not None:
+            counter.total += 1
+            counter.positions.add(new_board.__position_hash__)
+            counter.visited_cells[cell_index(move, self.height)] = 1
         return new_board
 
+    @property
+    def node_counter(self):
+        """ The `NodeCounter` attached by count_nodes() (None if not counting). """
+        return self.__node_counter__
+
+    def count_nodes(self, counter=None):
+        """
+        Count the nodes generated by forecast_move() on this board and on every
+        board derived from it (copies and forecasts) in a `NodeCounter`, which
+        is created if not given, and return the counter.
+        """
+        if counter is None:
+            counter = NodeCounter(self.width * self.height)
+        self.__node_counter__ = counter
+        return counter
+
     def move_is_legal(self, move):
         """
         Test whether a move is legal in the current game state.
@@ -141,14 +335,13 @@ class Board(object):
         row, col = move
         return 0 <= row < self.height and \
                0 <= col < self.width and \
-               self.__board_state__[row][col] == Board.BLANK
+               self.__cells__[col * self.height + row] == Board.BLANK
 
     def get_blank_spaces(self):
         """
         Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-            if self.__board_state__[i][j] == Board.BLANK]
+        return list(compress(self.__geometry__[0], self.__cells__.translate(_BLANK_MASK)))
 
     def get_player_location(self, player):
         """
@@ -164,7 +357,10 @@ class Board(object):
         (int, int)
             The coordinate pair (row, column) of the input player.
         """
-        return self.__last_player_move__[player]
+        idx = self.__location_index__(player)
+        if idx is Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self.__geometry__[0][idx]
 
     def get_legal_moves(self, player=None):
         """
@@ -183,8 +379,8 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves__(self.__last_player_move__[player])
+            player = self.__active_player__
+        return self.__get_moves__(self.__location_index__(player))
 
     def apply_move(self, move):
         """
@@ -201,8 +397,19 @@ class Board(object):
         None
         """
         row, col = move
-        self.__last_player_move__[self.active_player] = move
-        self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
+        idx = col * self.height + row
+        blocked, p1_keys, p2_keys, ply_key = self.__geometry__[2]
+        if self.move_count & 1:
+            last_idx, self.__p2_location__ = self.__p2_location__, idx
+            player_keys, symbol = p2_keys, 2
+        else:
+            last_idx, self.__p1_location__ = self.__p1_location__, idx
+            player_keys, symbol = p1_keys, 1
+        position_hash = self.__position_hash__ ^ blocked[idx] ^ player_keys[idx] ^ ply_key
+        if last_idx is not Board.NOT_MOVED:
+            position_hash ^= player_keys[last_idx]
+        self.__position_hash__ = position_hash
+        self.__cells__[idx] = symbol
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
@@ -248,58 +455,71 @@ class Board(object):
 
         return 0.
 
-    def __get_moves__(self, move):
+    def __location_index__(self, player):
+        """
+        Return the cell index of a player (None if the player has not moved).
+        """
+        if player == self.__player_1__:
+            return self.__p1_location__
+        if player == self.__player_2__:
+            return self.__p2_location__
+        raise RuntimeError("`player` must be an object registered as a player in the current game.")
+
+    def __get_moves__(self, idx):
         """
         Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        knight in chess) from a cell index.
         """
 
-        if move == Board.NOT_MOVED:
+        if idx is Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
-
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
-
-        return valid_moves
+        cells = self.__cells__
+        return [move for i, move in self.__geometry__[1][idx] if not cells[i]]
 
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
         return self.to_string()
 
+    def __header__(self):
+        """
+        Generate the column number header of the string representations,
+        aligned with the cells for the dimensions of the board.
+        """
+        labels = ''.join('{:<4}'.format(j) for j in range(self.width)).rstrip()
+        return ' ' * (len(str(self.height - 1)) + 3) + labels + '\n\r'
+
+    def __render__(self):
+        """
+        Return the string representation of the current game state as ASCII
+        bytes, filled into the precomputed template of the board size.
+        """
+        template, rows, offsets = render_template(self.width, self.height)
+        out = bytearray(template)
+        # cells are stored column by column, so row i is every height-th cell
+        symbols = self.__cells__.translate(_CELL_SYMBOLS)
+        height = self.height
+        for i, row in enumerate(rows):
+            out[row] = symbols[i::height]
+        if self.__p1_location__ is not Board.NOT_MOVED:
+            out[offsets[self.__p1_location__]] = ord('1')
+        if self.__p2_location__ is not Board.NOT_MOVED:
+            out[offsets[self.__p2_location__]] = ord('2')
+        return out
+
     def to_string(self):
         """Generate a string representation of the current game state, marking
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
+        return self.__render__().decode('ascii')
 
-        p1_loc = self.__last_player_move__[self.__player_1__]
-        p2_loc = self.__last_player_move__[self.__player_2__]
-
-        out = '    0   1   2   3   4   5   6\n\r'
-
-        for i in range(self.height):
-            out += str(i)
-            out += ' | '
-
-            for j in range(self.width):
-
-                if not self.__board_state__[i][j]:
-                    out += ' '
-                elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
-                    out += '1'
-                elif p2_loc and i == p2_loc[0] and j == p2_loc[1]:
-                    out += '2'
-                else:
-                    out += '-'
-
-                out += ' | '
-            out += '\n\r'
-
-        return out
+    def write_board(self, ofile):
+        """
+        Write the string representation of the current game state (see
+        `to_string()`) to a text file-like object.
+        """
+        ofile.write(self.__render__().decode('ascii'))
 
     def to_string_with_options(self, move_map):
         """Generate a string representation of the current game state, marking
@@ -307,18 +527,17 @@ class Board(object):
         blocked, and which remain open.
         """
 
-        p1_loc = self.__last_player_move__[self.__player_1__]
-        p2_loc = self.__last_player_move__[self.__player_2__]
-        
-        #out = ''
-        out = '    0   1   2   3   4   5   6\n\r'
+        p1_loc = self.get_player_location(self.__player_1__)
+        p2_loc = self.get_player_location(self.__player_2__)
+
+        out = self.__header__()
         for i in range(self.height):
-            out += str(i)
+            out += str(i).ljust(len(str(self.height - 1)))
             out += ' | '
             for j in range(self.width):
                 if (i,j) in move_map:
                     out += str(move_map[(i,j)])
-                elif not self.__board_state__[i][j]:
+                elif not self.__cells__[j * self.height + i]:
                     out += ' '
                 elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
                     out += 'O'
@@ -332,7 +551,8 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, cpu_time=False, wall_cap=None, timings=None,
+             clock=None):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -343,6 +563,31 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        cpu_time : bool (optional)
+            Charge each turn the CPU time of the playing thread instead of
+            the wall time, so that time spent waiting for a core while other
+            processes run is not counted against the player.
+
+        wall_cap : numeric (optional)
+            With cpu_time, the maximum number of wall-clock milliseconds to
+            allow before timeout during each turn, so a player cannot stall
+            (e.g., sleep or block) indefinitely - default is
+            WALL_CAP_FACTOR * time_limit.
+
+        timings : list (optional)
+            If given, a `MoveTiming` is appended for every turn: the player,
+            the ply, the wall and cpu milliseconds spent, the milliseconds
+            left on the clock when the move was returned (negative for an
+            overrun) and the search depth the player reports (the depth of
+            the last entry in its `iterations`, if it keeps one). The
+            difference between wall and cpu time is how much the turn was
+            inflated by scheduling.
+
+        clock : callable (optional)
+            A function returning the current time in milliseconds used in
+            place of the wall clock, e.g., a deterministic
+            `timing.VirtualClock`.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -352,7 +597,10 @@ class Board(object):
         """
         move_history = []
 
-        curr_time_millis = lambda: 1000 * timeit.default_timer()
+        curr_time_millis = clock or (lambda: 1000 * timeit.default_timer())
+        curr_cpu_millis = lambda: 1000 * time.thread_time()
+        if wall_cap is None:
+            wall_cap = WALL_CAP_FACTOR * time_limit
 
         while True:
 
@@ -361,14 +609,25 @@ class Board(object):
             game_copy = self.copy()
 
             move_start = curr_time_millis()
+            cpu_start = curr_cpu_millis()
             if type(self.active_player) is HumanPlayer:
                 time_left = lambda : HUMAN_TIME_LIMIT_MILLIS - (curr_time_millis() - move_start)
+            elif cpu_time:
+                time_left = lambda : min(time_limit - (curr_cpu_millis() - cpu_start),
+                                         wall_cap - (curr_time_millis() - move_start))
             else: 
                 time_left = lambda : time_limit - (curr_time_millis() - move_start)                
                 
             curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
             move_end = time_left()
 
+            if timings is not None:
+                iterations = getattr(self.active_player, "iterations", None)
+                timings.append(MoveTiming(self.active_player, self.move_count,
+                                          curr_time_millis() - move_start,
+                                          curr_cpu_millis() - cpu_start, move_end,
+                                          iterations[-1].depth if iterations else 0))
+
             # print move_end
 
             if curr_move is None:
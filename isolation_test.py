@@ -0,0 +1,177 @@
+"""
+Test cases for the isolation.Board game engine.
+"""
+import random
+import time
+import unittest
+
+import isolation
+import game_agent
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def random_game(width, height, seed):
+    """ Return a board after a random number of random moves. """
+    rng = random.Random(seed)
+    game = isolation.Board("p1", "p2", width, height)
+    for _ in range(rng.randint(0, width * height // 2)):
+        moves = game.get_legal_moves()
+        if not moves:
+            break
+        game.apply_move(rng.choice(moves))
+    return game
+
+
+def scan_blank_spaces(game):
+    """ Brute-force list of the blank cells in column-major order. """
+    return [(i, j) for j in range(game.width) for i in range(game.height)
+            if game.move_is_legal((i, j))]
+
+
+class BoardTest(unittest.TestCase):
+
+    def test_legal_moves_match_brute_force(self):
+        """ Table lookups give the same moves as testing every direction """
+        for width, height in [(7, 7), (5, 8), (9, 9), (11, 11), (15, 15), (13, 9)]:
+            for seed in range(20):
+                game = random_game(width, height, seed)
+                for player in ("p1", "p2"):
+                    loc = game.get_player_location(player)
+                    if loc is None:
+                        continue
+                    expected = [(loc[0] + dr, loc[1] + dc) for dr, dc in DIRECTIONS
+                                if game.move_is_legal((loc[0] + dr, loc[1] + dc))]
+                    self.assertEqual(game.get_legal_moves(player), expected)
+
+    def test_blank_spaces_match_scan(self):
+        """ The maintained blank cells match a scan of the grid """
+        for seed in range(20):
+            game = random_game(6, 8, seed)
+            self.assertEqual(game.get_blank_spaces(), scan_blank_spaces(game))
+            self.assertEqual(game.copy().get_blank_spaces(), scan_blank_spaces(game))
+
+    def test_copy_is_independent(self):
+        """ Moves applied to a copy do not change the original board """
+        game = random_game(7, 7, 3)
+        before = (game.to_string(), game.position_hash, game.get_legal_moves())
+        child = game.copy()
+        self.assertFalse(hasattr(game, "__dict__"))
+        for _ in range(3):
+            moves = child.get_legal_moves()
+            if moves:
+                child.apply_move(moves[0])
+        self.assertEqual((game.to_string(), game.position_hash,
+                          game.get_legal_moves()), before)
+
+    def test_node_counter(self):
+        """ Counted boards share their counter with every derived board """
+        game = isolation.Board("p1", "p2", 9, 9)
+        game.apply_move((6, 3))
+        game.apply_move((0, 8))
+        counter = game.count_nodes()
+        moves = game.get_legal_moves()
+        for _ in range(2):
+            nodes = [game.copy().forecast_move(move) for move in moves]
+        nodes[0].forecast_move(nodes[0].get_legal_moves()[0])
+        self.assertIs(nodes[0].node_counter, counter)
+        self.assertEqual(counter.total, 2 * len(moves) + 1)
+        self.assertEqual(counter.unique, len(moves) + 1)
+        self.assertEqual(counter.cells, len(moves) + 1)
+        self.assertIsNone(isolation.Board("p1", "p2").node_counter)
+
+
+class LargeBoardTest(unittest.TestCase):
+
+    def test_rendering_follows_dimensions(self):
+        """ Rendered boards have one header label and one row per line """
+        for width, height in [(7, 7), (12, 11), (15, 15)]:
+            game = isolation.Board("p1", "p2", width, height)
+            game.apply_move((height - 1, width - 1))
+            lines = game.to_string().split('\n\r')[:-1]
+            self.assertEqual(lines[0].split(), [str(j) for j in range(width)])
+            self.assertEqual(len(lines), height + 1)
+            self.assertEqual(len({len(line) for line in lines[1:]}), 1)
+            self.assertEqual(lines[-1].split('|')[-2].strip(), '1')
+            # every column label sits above its column
+            for j in range(width):
+                self.assertEqual(lines[0].index(str(j), 4 * j),
+                                 lines[1].index('|', 4 * j) + 2)
+
+    def test_game_as_text(self):
+        """ Games are replayed on a fresh board of their own dimensions """
+        history = [[(0, 0), (4, 8)], [(2, 1), (-1, -1)]]
+        first = isolation.game_as_text("p1", history, "illegal move", width=9, height=5)
+        self.assertEqual(isolation.game_as_text("p1", history, "illegal move",
+                                                width=9, height=5), first)
+        game = isolation.Board(1, 2, 9, 5)
+        for move in [(0, 0), (4, 8), (2, 1)]:
+            game.apply_move(move)
+        # the final (-1, -1) is not applied: the last board is the final position
+        self.assertTrue(first.endswith("(-1, -1)\r\n" + game.to_string() + "illegal move\r\n"
+                                       "Winner: p1\r\n"))
+
+    def test_hashes_beyond_64_cells(self):
+        """ Position hashes distinguish positions on boards over 64 cells """
+        game = random_game(15, 15, 0)
+        moves = game.get_legal_moves()
+        hashes = {game.forecast_move(m).position_hash for m in moves}
+        self.assertEqual(len(hashes), len(moves))
+
+    def test_search_plays_large_boards(self):
+        """ Alpha-beta agents with the custom heuristic finish a 15x15 game """
+        player_1 = game_agent.CustomPlayer(search_depth=2, iterative=False,
+                                           method='alphabeta')
+        player_2 = game_agent.CustomPlayer(search_depth=1, iterative=False,
+                                           method='alphabeta')
+        game = isolation.Board(player_1, player_2, 15, 15)
+        game.apply_move((0, 0))
+        game.apply_move((14, 14))
+        winner, history, termination = game.play(time_limit=float("inf"))
+        self.assertIn(winner, (player_1, player_2))
+        self.assertEqual(termination, "illegal move")
+        self.assertGreater(len(history), 10)
+
+
+class SleepingPlayer:
+    """ Player that sleeps (using no CPU time) before its first legal move. """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def get_move(self, game, legal_moves, time_left):
+        time.sleep(self.seconds)
+        return legal_moves[0] if legal_moves else (-1, -1)
+
+
+class TimeControlTest(unittest.TestCase):
+
+    def play(self, seconds, **kwargs):
+        player = SleepingPlayer(seconds)
+        game = isolation.Board(player, SleepingPlayer(0))
+        return player, game.play(**kwargs)
+
+    def test_wall_time_counts_waiting(self):
+        """ With wall time, waiting for the CPU loses on time """
+        player, (winner, _, termination) = self.play(0.03, time_limit=20)
+        self.assertNotEqual(winner, player)
+        self.assertEqual(termination, "timeout")
+
+    def test_cpu_time_ignores_waiting(self):
+        """ With CPU time, waiting is only charged against the wall cap """
+        timings = []
+        player, (winner, _, termination) = self.play(0.03, time_limit=20, cpu_time=True,
+                                                     timings=timings)
+        self.assertEqual(termination, "illegal move")
+        own = [t.wall - t.cpu for t in timings if t.player == player]
+        self.assertTrue(own and min(own) >= 25)
+
+        player, (winner, _, termination) = self.play(0.03, time_limit=20, cpu_time=True,
+                                                     wall_cap=25)
+        self.assertNotEqual(winner, player)
+        self.assertEqual(termination, "timeout")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,327 @@
+'''
+Tournament formats for large agent populations.
+
+`tournament_mp` plays every test agent against the same gauntlet of seven
+opponents, which measures each agent but never plays the candidates against
+each other, and costs the same number of games for every candidate however
+weak.  The formats here pair the candidates directly and feed every result to
+a rating model (see `ratings.py`):
+
+    - round robin: every pair of agents meets once (n (n - 1) / 2 pairings),
+      scheduled in rounds by the circle method so that each agent plays at
+      most once per round;
+    - Swiss: a fixed number of rounds (about log2(n) is enough to find the
+      strongest), in which agents with the same score are paired together and
+      never twice against the same opponent (n / 2 pairings per round);
+    - knockout: a seeded single-elimination bracket, either on its own
+      (seeded in the order of the agents) or among the top k agents of the
+      ratings of a round robin or Swiss event, to settle the strongest among
+      close candidates.
+
+The results of every format, including the knockout after an event, feed the
+reported ratings.
+
+A pairing is one or more "fair" matches (`tournament.play_match`, two games
+from the same opening of the shared `OpeningBook` with the players swapping
+seats).  Every pairing of a round is a task of the warm process pool of
+`tournament_mp`, and agents are sent as specs (see `agents.py`), so sweeps of
+thousands of parameterizations only pickle a few bytes per task.
+
+usage: league.py [-f <format>] [-a <agents file>] [-m <matches>] [-r <rounds>] [-k <top k>] [-R <rating model>] [-p <pool size>] [-s <seed>] [-c] [-o <output file>]
+'''
+import datetime
+import getopt
+import random
+import sys
+
+from math import ceil, log2
+
+from agents import OPPONENT_SPECS, REGISTRY, STUDENT_SWEEP, build_agent, expand, load_specs
+from ratings import (INITIAL_RATING, Result, bradley_terry, elo_ratings, format_ratings,
+                     ranking, records)
+from tournament import play_match
+from tournament_mp import NUM_MATCHES as GAUNTLET_MATCHES, make_pool, opening_book
+
+FORMATS = ("round_robin", "swiss", "knockout")
+RATING_MODELS = {"bt": bradley_terry, "elo": elo_ratings}
+NUM_MATCHES = 1  # number of matches (of two games) per pairing
+
+
+def round_robin_schedule(num_agents):
+    """
+    Return the rounds of a round robin between agents 0 to n - 1 by the
+    circle method: every pair meets exactly once, and every agent plays at
+    most once per round (one agent sits out each round when n is odd).
+
+    Returns
+    ----------
+    list<list<(int, int)>>
+        The pairings of every round.
+    """
+    slots = list(range(num_agents)) + ([None] if num_agents % 2 else [])
+    half = len(slots) // 2
+    rounds = []
+    for _ in range(len(slots) - 1):
+        rounds.append([(a, b) for a, b in zip(slots[:half], reversed(slots[half:]))
+                       if a is not None and b is not None])
+        # keep the first slot, rotate the others
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return rounds
+
+
+def swiss_pairings(order, played=(), byes=()):
+    """
+    Return the pairings of a Swiss round, and the agent with a bye (None for
+    an even number of agents).
+
+    Parameters
+    ----------
+    order : list<str>
+        The agent names by standing, best first.
+
+    played : set<frozenset<str>>
+        The pairs of agents that have already met; each agent is paired with
+        the next agent down the order that it has not met, and a rematch
+        left at the bottom is undone by swapping partners with a pair above
+        it where possible.
+
+    byes : set<str>
+        The agents that have already had a bye; the bye goes to the lowest
+        agent without one.
+    """
+    unpaired = list(order)
+    bye = None
+    if len(unpaired) % 2:
+        bye = next((name for name in reversed(unpaired) if name not in byes), unpaired[-1])
+        unpaired.remove(bye)
+    pairs = []
+    while unpaired:
+        agent = unpaired.pop(0)
+        idx = next((idx for idx, other in enumerate(unpaired)
+                    if frozenset((agent, other)) not in played), 0)
+        pairs.append((agent, unpaired.pop(idx)))
+    for idx in range(len(pairs) - 1, -1, -1):
+        if frozenset(pairs[idx]) not in played:
+            continue
+        a, b = pairs[idx]
+        for other in range(idx - 1, -1, -1):
+            c, d = pairs[other]
+            swapped = next((swap for swap in (((c, a), (d, b)), ((c, b), (d, a)))
+                            if not any(frozenset(pair) in played for pair in swap)), None)
+            if swapped is not None:
+                pairs[other], pairs[idx] = swapped
+                break
+    return pairs, bye
+
+
+def bracket_order(size):
+    """
+    Return the seeds (0 is the best) of a knockout bracket of a power of two
+    size in bracket order: neighbours meet in the first round, and the top
+    seeds can only meet in the late rounds (seeds 0 and 1 in the final).
+    """
+    order = [0]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, 2 * len(order) - 1 - s)]
+    return order
+
+
+def play_pairing(spec_1, spec_2, num_matches=NUM_MATCHES, seed=0, cpu_time=False):
+    """
+    Pool task: play the matches of a pairing between two agent specs from the
+    openings of the book of a seed, and return the `ratings.Result`.
+    """
+    agent_1, agent_2 = build_agent(spec_1), build_agent(spec_2)
+    book = opening_book(seed)
+    score = games = 0
+    for match_idx in range(num_matches):
+        random.seed("%s-%d" % (book.seed, match_idx))
+        score_1, score_2 = play_match(agent_1.player, agent_2.player,
+                                      book.position(match_idx), cpu_time)
+        score += score_1
+        games += score_1 + score_2
+    return Result(agent_1.name, agent_2.name, score, games)
+
+
+def play_pairings(pool, pairs, num_matches=NUM_MATCHES, seed=0, cpu_time=False):
+    """ Return the results of pairings of specs, played on a process pool. """
+    return pool.starmap(play_pairing, [(spec_1, spec_2, num_matches, seed, cpu_time)
+                                       for spec_1, spec_2 in pairs])
+
+
+def round_robin(pool, specs, num_matches=NUM_MATCHES, seed=0, cpu_time=False):
+    """ Play a round robin between agent specs and return the results. """
+    return play_pairings(pool, [(specs[a], specs[b])
+                                for pairs in round_robin_schedule(len(specs))
+                                for a, b in pairs],
+                         num_matches, seed, cpu_time)
+
+
+def swiss(pool, specs, rounds, num_matches=NUM_MATCHES, seed=0, cpu_time=False):
+    """
+    Play a Swiss event between agent specs and return the results.
+
+    Agents are ordered by points, then by the Bradley-Terry rating of the
+    results so far, then by their order in the specs; a bye scores the points
+    of a won pairing but is not a result.
+    """
+    by_name = {spec["name"]: spec for spec in specs}
+    initial = {name: idx for idx, name in enumerate(by_name)}
+    points = dict.fromkeys(by_name, 0.)
+    played, byes, results = set(), set(), []
+    for _ in range(rounds):
+        ratings = bradley_terry(results) if results else {}
+        order = sorted(by_name, key=lambda name: (-points[name],
+                                                  -ratings.get(name, INITIAL_RATING),
+                                                  initial[name]))
+        pairs, bye = swiss_pairings(order, played, byes)
+        if bye is not None:
+            byes.add(bye)
+            points[bye] += 2 * num_matches
+        for result in play_pairings(pool, [(by_name[a], by_name[b]) for a, b in pairs],
+                                    num_matches, seed, cpu_time):
+            points[result.agent_1] += result.score_1
+            points[result.agent_2] += result.games - result.score_1
+            played.add(frozenset((result.agent_1, result.agent_2)))
+            results.append(result)
+    return results
+
+
+def knockout(pool, specs, num_matches=NUM_MATCHES, seed=0, cpu_time=False):
+    """
+    Play a single-elimination bracket between agent specs, seeded in their
+    order (best first); missing seeds of the bracket are byes, and a tied
+    pairing goes to the higher seed.
+
+    Returns
+    ----------
+    (list<ratings.Result>, str)
+        The results, and the name of the winner.
+    """
+    size = 1 << max(0, len(specs) - 1).bit_length()
+    entrants = [seed_idx if seed_idx < len(specs) else None for seed_idx in bracket_order(size)]
+    results = []
+    while len(entrants) > 1:
+        pairs = [(a, b) for a, b in zip(entrants[::2], entrants[1::2])
+                 if a is not None and b is not None]
+        outcomes = dict(zip(pairs, play_pairings(pool, [(specs[a], specs[b]) for a, b in pairs],
+                                                 num_matches, seed, cpu_time)))
+        results.extend(outcomes[pair] for pair in pairs)
+        winners = []
+        for a, b in zip(entrants[::2], entrants[1::2]):
+            if a is None or b is None:
+                winners.append(b if a is None else a)
+                continue
+            result = outcomes[(a, b)]
+            won = result.score_1 > result.games - result.score_1
+            tied = 2 * result.score_1 == result.games
+            winners.append(a if won or (tied and a < b) else b)
+        entrants = winners
+    return results, specs[entrants[0]]["name"]
+
+
+def main(argv):
+
+    USAGE = """usage: league.py [-f <format>] [-a <agents file>] [-m <matches>] [-r <rounds>] [-k <top k>] [-R <rating model>] [-p <pool size>] [-s <seed>] [-c] [-o <output file>]
+            -f format: optional format (round_robin, swiss or knockout) - default is swiss
+            -a agents file: optional JSON file of the specs (and sweeps) of the agents - default is the registry and the weight sweep
+            -m matches: optional number of matches (of two games) per pairing - default is 1
+            -r rounds: optional number of Swiss rounds - default is log2 of the number of agents, plus 2
+            -k top k: optional size of a knockout among the top rated agents after a round robin or swiss event (or among the first agents with -f knockout) - default is 0 (no knockout after an event, every agent with -f knockout)
+            -R rating model: optional rating model (bt for Bradley-Terry or elo) - default is bt
+            -p pool size: optional pool size - default is the number of CPUs
+            -s seed: optional seed for the shared opening positions - default is 0
+            -c cpu time: charge moves CPU time instead of wall time (with a wall-time cap)
+            -o output file: optional file the report is appended to"""
+
+    event = "swiss"
+    agentsfilename = None
+    num_matches = NUM_MATCHES
+    rounds = None
+    top_k = 0
+    model = "bt"
+    pool_size = None
+    seed = 0
+    cpu_time = False
+    outputfilename = None
+    try:
+        opts, args = getopt.getopt(argv, "hf:a:m:r:k:R:p:s:co:",
+                                   ["format=", "agents=", "matches=", "rounds=", "topk=", "rating=",
+                                    "poolsize=", "seed=", "cputime", "ofile="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-f", "--format"):
+            event = arg
+        elif opt in ("-a", "--agents"):
+            agentsfilename = arg
+        elif opt in ("-m", "--matches"):
+            num_matches = int(arg)
+        elif opt in ("-r", "--rounds"):
+            rounds = int(arg)
+        elif opt in ("-k", "--topk"):
+            top_k = int(arg)
+        elif opt in ("-R", "--rating"):
+            model = arg
+        elif opt in ("-p", "--poolsize"):
+            pool_size = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-c", "--cputime"):
+            cpu_time = True
+        elif opt in ("-o", "--ofile"):
+            outputfilename = arg
+    if event not in FORMATS or model not in RATING_MODELS:
+        print(USAGE)
+        sys.exit(2)
+
+    if agentsfilename:
+        specs = load_specs(agentsfilename)
+    else:
+        specs = list(REGISTRY.values()) + expand(STUDENT_SWEEP)
+    if rounds is None:
+        rounds = int(ceil(log2(max(2, len(specs))))) + 2
+
+    # the book is built before the workers are forked (see tournament_mp)
+    opening_book(seed)
+    report = ["Starting %s league with %d agents and %d games per pairing at %s" % (
+        event, len(specs), 2 * num_matches, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))]
+    with make_pool(pool_size) as pool:
+        results = []
+        if event == "round_robin":
+            results = round_robin(pool, specs, num_matches, seed, cpu_time)
+        elif event == "swiss":
+            results = swiss(pool, specs, rounds, num_matches, seed, cpu_time)
+
+        bracket = []
+        if event == "knockout" or top_k:
+            seeds = specs[:top_k or len(specs)]
+            if results:
+                by_name = {spec["name"]: spec for spec in specs}
+                seeds = [by_name[name] for name in ranking(RATING_MODELS[model](results))[:top_k]]
+            bracket, champion = knockout(pool, seeds, num_matches, seed, cpu_time)
+            results = results + bracket
+
+    gauntlet_games = len(specs) * len(OPPONENT_SPECS) * 4 * GAUNTLET_MATCHES
+    report.append("%d pairings, %d games (the tournament_mp gauntlet would play %d)" % (
+        len(results), sum(result.games for result in results), gauntlet_games))
+    if bracket:
+        report.append("Knockout of %d agents:" % len(seeds))
+        report.extend("    %s %g - %g %s" % (r.agent_1, r.score_1, r.games - r.score_1, r.agent_2)
+                      for r in bracket)
+        report.append("Winner: %s" % champion)
+    report.append(format_ratings(RATING_MODELS[model](results), records(results)))
+
+    print("\n".join(report))
+    if outputfilename:
+        with open(outputfilename, mode='a') as ofile:
+            ofile.write("\n".join(report) + "\n")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+"""
+Test cases for the tournament formats.
+"""
+import contextlib
+import io
+import itertools
+import json
+import os
+import tempfile
+import unittest
+
+from multiprocessing import Pool
+
+import league
+from ratings import records
+
+SPECS = [{"name": "Random", "player": "sample_players:RandomPlayer"},
+         {"name": "AB1", "method": "alphabeta", "search_depth": 1, "iterative": False,
+          "score_fn": "sample_players:improved_score"},
+         {"name": "AB2", "method": "alphabeta", "search_depth": 2, "iterative": False,
+          "score_fn": "sample_players:improved_score"},
+         {"name": "MM1", "method": "minimax", "search_depth": 1, "iterative": False,
+          "score_fn": "sample_players:open_move_score"},
+         {"name": "Random 2", "player": "sample_players:RandomPlayer"}]
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_round_robin_schedule(self):
+        """ Every pair meets once, and nobody plays twice in a round """
+        for num_agents in (2, 5, 8):
+            rounds = league.round_robin_schedule(num_agents)
+            pairs = [frozenset(pair) for pairs in rounds for pair in pairs]
+            self.assertEqual(sorted(map(sorted, pairs)),
+                             sorted(map(sorted, itertools.combinations(range(num_agents), 2))))
+            for pairs in rounds:
+                agents = [agent for pair in pairs for agent in pair]
+                self.assertEqual(len(agents), len(set(agents)))
+
+    def test_swiss_pairings(self):
+        """ Swiss rounds avoid rematches and give the bye to a new agent """
+        pairs, bye = league.swiss_pairings(["a", "b", "c", "d", "e"],
+                                           {frozenset("ab")}, {"e"})
+        self.assertEqual((pairs, bye), ([("a", "c"), ("b", "e")], "d"))
+        # the rematch left at the bottom is swapped away
+        pairs, bye = league.swiss_pairings(["a", "b", "c", "d"],
+                                           {frozenset("ab"), frozenset("ac"), frozenset("cd")})
+        self.assertEqual((pairs, bye), ([("a", "d"), ("b", "c")], None))
+
+    def test_bracket_order(self):
+        """ Seeds 1 and 2 can only meet in the final """
+        self.assertEqual(league.bracket_order(8), [0, 7, 3, 4, 1, 6, 2, 5])
+        self.assertEqual(league.bracket_order(1), [0])
+
+
+class LeagueTest(unittest.TestCase):
+
+    def test_events(self):
+        """ Swiss, round robin and knockout events play on a process pool """
+        with Pool(processes=1) as pool:
+            results = league.swiss(pool, SPECS, 3)
+            self.assertEqual(len(results), 3 * 2)
+            self.assertEqual(len({frozenset(r[:2]) for r in results}), len(results))
+            self.assertEqual(sum(games for _, games in records(results).values()), 6 * 2 * 2)
+
+            self.assertEqual(len(league.round_robin(pool, SPECS[:4])), 6)
+
+            results, winner = league.knockout(pool, SPECS[:3])
+            # seed 0 has a bye in the first round
+            self.assertEqual([r.agent_2 for r in results[:1]], ["AB2"])
+            self.assertEqual(len(results), 2)
+            self.assertIn(winner, [spec["name"] for spec in SPECS[:3]])
+
+    def test_knockout_feeds_the_ratings(self):
+        """ A knockout on its own is rated like any other format """
+        handle, filename = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w") as ofile:
+            json.dump(SPECS[:3], ofile)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                league.main(["-a", filename, "-f", "knockout", "-p", "1"])
+        finally:
+            os.remove(filename)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith("2 pairings, 4 games"))
+        self.assertTrue(any(line.startswith("Winner: ") for line in lines))
+        # every agent of the bracket is rated, with its knockout games
+        self.assertEqual(sorted(line.split()[1] for line in lines[-3:]),
+                         ["AB1", "AB2", "Random"])
+
+
+if __name__ == '__main__':
+    unittest.main()
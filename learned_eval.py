@@ -0,0 +1,379 @@
+'''
+Learned evaluation functions trained from self-play records.
+
+The pipeline has three stages:
+
+    1. `generate_records` plays self-play games between two `CustomPlayer`
+       agents across a process pool, starting from the seeded positions of an
+       `OpeningBook`, and returns one (features, outcome) record for every
+       position in which a player had to move, in game order with the index
+       of its game (so data can be split by game, not by position).
+    2. `fit_linear` or `fit_mlp` fits a small linear model or a one hidden
+       layer perceptron to the records with NumPy.
+    3. The fitted `LinearEvaluationFunction` / `MLPEvaluationFunction` has an
+       `eval_func(game, player)` method that can be passed to `CustomPlayer`
+       as `score_fn`.  Inference is plain Python (no NumPy per leaf) and the
+       weights can be saved to and loaded from a JSON file.
+
+`benchmark_score_fns` measures the cost per leaf evaluation of any score
+function against `improved_score`, so a learned evaluator is only used where
+its accuracy pays for the lost search depth.
+
+usage: learned_eval.py [-g <games>] [-p <pool size>] [-m linear|mlp] [-o <outputfile>]
+'''
+import getopt
+import json
+import logging
+import random
+import sys
+import timeit
+
+from math import tanh
+from multiprocessing import Pool
+
+import numpy as np
+
+from isolation import Board
+from features import FEATURE_NAMES, FeatureBoard, extract_features
+from game_agent import CustomPlayer, custom_score
+from openings import OpeningBook
+from sample_players import improved_score
+
+logging.basicConfig(level=logging.ERROR)
+
+SELF_PLAY_TIME_LIMIT = 50  # number of milliseconds per move in self-play
+
+
+def play_self_play_game(opening, score_fn=custom_score,
+                        time_limit=SELF_PLAY_TIME_LIMIT):
+    """
+    Play one game between two iterative deepening alpha-beta agents from an
+    opening and return the training records of the game.
+
+    Returns
+    ----------
+    list<(list<float>, float)>
+        For every position in which a player moved, the features from the
+        point of view of the player to move and the outcome of the game for
+        that player (1. for a win, -1. for a loss).
+    """
+    player_1 = CustomPlayer(score_fn=score_fn, method='alphabeta', iterative=True)
+    player_2 = CustomPlayer(score_fn=score_fn, method='alphabeta', iterative=True)
+    game = Board(player_1, player_2)
+    for move in opening:
+        game.apply_move(move)
+    replay = FeatureBoard.from_board(game)
+    winner, move_history, _ = game.play(time_limit=time_limit)
+
+    positions = []
+    for move in (m for turn in move_history for m in turn):
+        if not replay.move_is_legal(move):
+            break
+        positions.append((extract_features(replay, replay.active_player),
+                          replay.active_player))
+        replay.apply_move(move)
+
+    return [(feats, 1. if player == winner else -1.)
+            for feats, player in positions]
+
+
+def _self_play_worker(args):
+    """ Pool worker: seed the generator and play one self-play game. """
+    opening, seed, score_fn, time_limit = args
+    random.seed(seed)
+    return play_self_play_game(opening, score_fn, time_limit)
+
+
+def generate_records(num_games, pool_size=3, seed=0, score_fn=custom_score,
+                     time_limit=SELF_PLAY_TIME_LIMIT):
+    """
+    Play self-play games across a process pool.  Game `i` starts from
+    position `i` of an `OpeningBook` with the given seed.
+
+    Returns
+    ----------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        The feature matrix (one row per position, in game order), the
+        outcome vector and the game index of every row.
+    """
+    book = OpeningBook(seed=seed)
+    tasks = [(book.position(i), "%s-%d" % (seed, i), score_fn, time_limit)
+             for i in range(num_games)]
+    features, outcomes, games = [], [], []
+    with Pool(processes=pool_size) as pool:
+        for game_idx, records in enumerate(pool.imap(_self_play_worker, tasks)):
+            for feats, outcome in records:
+                features.append(feats)
+                outcomes.append(outcome)
+                games.append(game_idx)
+    return (np.array(features, dtype=float).reshape(-1, len(FEATURE_NAMES)),
+            np.array(outcomes, dtype=float), np.array(games, dtype=int))
+
+
+def _standardize(X):
+    """ Return the column means and (non-zero) standard deviations of X. """
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.
+    return mean, scale
+
+
+class LinearEvaluationFunction:
+    """ Linear evaluation function over the features of `features.py`
+
+    The standardization of the training data is folded into the weights, so
+    inference is a single dot product.
+
+    Parameters
+    ----------
+    weights : [] - one weight per feature in `FEATURE_NAMES`
+
+    bias : float
+    """
+
+    def __init__(self, weights, bias=0.):
+        self.weights = [float(w) for w in weights]
+        self.bias = float(bias)
+
+    def predict(self, feats):
+        """ Return the model output for a feature vector. """
+        return self.bias + sum(w * f for w, f in zip(self.weights, feats))
+
+    def eval_func(self, game, player):
+        """Calculate the heuristic value of a game state from the point of view
+        of the given player using the learned weights.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        player : object
+            A player instance in the current game.
+
+        Returns
+        -------
+        float
+            The heuristic value of the current game state to the specified player.
+        """
+        if game.is_loser(player):
+            return float("-inf")
+
+        if game.is_winner(player):
+            return float("inf")
+
+        return float(self.predict(extract_features(game, player)))
+
+    def to_dict(self):
+        """ Return a JSON-serializable description of the model. """
+        return {"model": "linear", "weights": self.weights, "bias": self.bias}
+
+
+class MLPEvaluationFunction(LinearEvaluationFunction):
+    """ Evaluation function with one hidden layer of tanh units
+
+    Parameters
+    ----------
+    hidden_weights : [[]] - one row of feature weights per hidden unit
+
+    hidden_bias : [] - one bias per hidden unit
+
+    weights : [] - one output weight per hidden unit
+
+    bias : float
+    """
+
+    def __init__(self, hidden_weights, hidden_bias, weights, bias=0.):
+        super().__init__(weights, bias)
+        self.hidden_weights = [[float(w) for w in row] for row in hidden_weights]
+        self.hidden_bias = [float(b) for b in hidden_bias]
+
+    def predict(self, feats):
+        """ Return the model output for a feature vector. """
+        hidden = [tanh(b + sum(w * f for w, f in zip(row, feats)))
+                  for row, b in zip(self.hidden_weights, self.hidden_bias)]
+        return super().predict(hidden)
+
+    def to_dict(self):
+        """ Return a JSON-serializable description of the model. """
+        return {"model": "mlp", "hidden_weights": self.hidden_weights,
+                "hidden_bias": self.hidden_bias, "weights": self.weights,
+                "bias": self.bias}
+
+
+def fit_linear(X, y, l2=1e-3):
+    """
+    Fit a ridge regression of the outcomes on the standardized features.
+
+    Returns
+    ----------
+    LinearEvaluationFunction
+    """
+    mean, scale = _standardize(X)
+    Z = (X - mean) / scale
+    A = Z.T @ Z + l2 * len(Z) * np.eye(Z.shape[1])
+    w = np.linalg.solve(A, Z.T @ (y - y.mean()))
+    weights = w / scale
+    return LinearEvaluationFunction(weights, y.mean() - weights @ mean)
+
+
+def fit_mlp(X, y, hidden=8, epochs=2000, learning_rate=0.05, seed=0):
+    """
+    Fit a one hidden layer perceptron (tanh units, linear output) to the
+    outcomes by full-batch gradient descent on the squared error.
+
+    Returns
+    ----------
+    MLPEvaluationFunction
+    """
+    rng = np.random.RandomState(seed)
+    mean, scale = _standardize(X)
+    Z = (X - mean) / scale
+    W1 = rng.normal(scale=1. / np.sqrt(Z.shape[1]), size=(Z.shape[1], hidden))
+    b1 = np.zeros(hidden)
+    w2 = rng.normal(scale=1. / np.sqrt(hidden), size=hidden)
+    b2 = 0.
+
+    for _ in range(epochs):
+        H = np.tanh(Z @ W1 + b1)
+        err = H @ w2 + b2 - y
+        grad_h = np.outer(err, w2) * (1. - H ** 2)
+        w2 -= learning_rate * H.T @ err / len(y)
+        b2 -= learning_rate * err.mean()
+        W1 -= learning_rate * Z.T @ grad_h / len(y)
+        b1 -= learning_rate * grad_h.mean(axis=0)
+
+    # fold the standardization into the first layer
+    W1 = W1 / scale[:, None]
+    b1 = b1 - mean @ W1
+    return MLPEvaluationFunction(W1.T, b1, w2, b2)
+
+
+def sign_accuracy(evaluator, X, y):
+    """ Return the fraction of records whose outcome has the predicted sign. """
+    predictions = np.array([evaluator.predict(row) for row in X])
+    return float(np.mean(np.sign(predictions) == y))
+
+
+def save_evaluator(evaluator, filename):
+    """ Write the model description of an evaluator to a JSON file. """
+    with open(filename, mode='w') as ofile:
+        json.dump(evaluator.to_dict(), ofile, indent=2)
+
+
+def load_evaluator(filename):
+    """ Load an evaluator written by `save_evaluator`. """
+    with open(filename) as ifile:
+        spec = json.load(ifile)
+    model = spec.pop("model")
+    if model == "linear":
+        return LinearEvaluationFunction(**spec)
+    if model == "mlp":
+        return MLPEvaluationFunction(**spec)
+    raise ValueError("Unknown model type: %s" % model)
+
+
+def sample_positions(num_positions, seed=0, width=7, height=7):
+    """
+    Return positions reached by random play from the openings of an
+    `OpeningBook`; used to benchmark evaluation functions.
+    """
+    rng = random.Random(seed)
+    book = OpeningBook(seed=seed, width=width, height=height)
+    positions = []
+    while len(positions) < num_positions:
+        game = Board("player_1", "player_2", width, height)
+        for move in book.position(len(positions)):
+            game.apply_move(move)
+        for _ in range(rng.randint(0, width * height // 2)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        positions.append(game)
+    return positions
+
+
+def benchmark_score_fns(score_fns, positions, repeat=3):
+    """
+    Measure the cost of a leaf evaluation for each score function.
+
+    Parameters
+    ----------
+    score_fns : list<(str, callable)>
+        Named score functions with the signature `score_fn(game, player)`.
+
+    positions : list<isolation.Board>
+        The positions to evaluate (from the point of view of the player to
+        move).
+
+    Returns
+    ----------
+    list<(str, float, float)>
+        The name, the microseconds per call, and the cost relative to the
+        first score function.
+    """
+    results = []
+    for name, score_fn in score_fns:
+        best = min(timeit.repeat(
+            lambda: [score_fn(g, g.active_player) for g in positions],
+            number=1, repeat=repeat))
+        results.append((name, 1e6 * best / len(positions)))
+    baseline = results[0][1]
+    return [(name, usec, usec / baseline) for name, usec in results]
+
+
+def main(argv):
+
+    USAGE = """usage: learned_eval.py [-g <games>] [-p <pool size>] [-m linear|mlp] [-o <outputfile>]
+            -g games: optional number of self-play games - default is 100
+            -p pool size: optional pool size - default is 3
+            -m model: optional model type (linear or mlp) - default is linear
+            -o output file: optional model file name - default is learned_eval.json"""
+
+    num_games = 100
+    pool_size = 3
+    model = 'linear'
+    outputfilename = 'learned_eval.json'
+    try:
+        opts, args = getopt.getopt(argv, "hg:p:m:o:", ["games=", "poolsize=", "model=", "ofile="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-g", "--games"):
+            num_games = int(arg)
+        elif opt in ("-p", "--poolsize"):
+            pool_size = int(arg)
+        elif opt in ("-m", "--model"):
+            model = arg
+        elif opt in ("-o", "--ofile"):
+            outputfilename = arg
+
+    X, y, games = generate_records(num_games, pool_size)
+    # hold out the last 20% of the games (not of the positions)
+    train = games < int(0.8 * num_games)
+    fit = fit_mlp if model == 'mlp' else fit_linear
+    evaluator = fit(X[train], y[train])
+    save_evaluator(evaluator, outputfilename)
+
+    improved = LinearEvaluationFunction([1., -1.] + [0.] * (len(FEATURE_NAMES) - 2))
+    print("%d positions from %d games" % (len(y), num_games))
+    print("Held-out sign accuracy: improved %.3f, %s %.3f" %
+          (sign_accuracy(improved, X[~train], y[~train]), model,
+           sign_accuracy(evaluator, X[~train], y[~train])))
+
+    positions = sample_positions(1000)
+    for name, usec, ratio in benchmark_score_fns(
+            [("improved_score", improved_score), (model, evaluator.eval_func)],
+            positions):
+        print("{!s:<16}{:>10.2f} us/leaf {:>8.2f}x".format(name, usec, ratio))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,76 @@
+"""
+Test cases for the self-play feature extraction and the learned evaluation
+functions.
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import isolation
+import features
+import learned_eval
+from sample_players import improved_score
+
+
+class LearnedEvalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = isolation.Board("p1", "p2")
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+    def test_features(self):
+        """ Features match hand-computed values on a simple position """
+        feats = features.extract_features(self.game, "p1")
+        self.assertEqual(len(feats), len(features.FEATURE_NAMES))
+        self.assertEqual(feats[:2], [8., 2.])
+        self.assertEqual(feats[4], 47.)
+        self.assertEqual(feats[6], 0.)
+
+    def test_fit_linear_recovers_weights(self):
+        """ The linear fit recovers an exact linear relation """
+        rng = np.random.RandomState(0)
+        X = rng.normal(size=(200, len(features.FEATURE_NAMES)))
+        true_weights = np.arange(X.shape[1], dtype=float)
+        y = X @ true_weights + 3.
+        model = learned_eval.fit_linear(X, y, l2=0.)
+        np.testing.assert_allclose(model.weights, true_weights, atol=1e-6)
+        self.assertAlmostEqual(model.bias, 3.)
+
+    def test_evaluator_round_trip(self):
+        """ Saved evaluators load with the same predictions """
+        rng = np.random.RandomState(1)
+        X = rng.normal(size=(50, len(features.FEATURE_NAMES)))
+        y = np.sign(X[:, 0] - X[:, 1])
+        model = learned_eval.fit_mlp(X, y, hidden=4, epochs=50)
+        handle, filename = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        try:
+            learned_eval.save_evaluator(model, filename)
+            loaded = learned_eval.load_evaluator(filename)
+        finally:
+            os.remove(filename)
+        self.assertAlmostEqual(loaded.eval_func(self.game, "p1"),
+                               model.eval_func(self.game, "p1"))
+        self.assertIsInstance(loaded.eval_func(self.game, "p2"), float)
+
+    def test_generate_records(self):
+        """ Self-play records come in game order with +-1 outcomes """
+        # improved_score pickles by name even after agent_test reloads game_agent
+        X, y, games = learned_eval.generate_records(2, pool_size=1, score_fn=improved_score,
+                                                    time_limit=10)
+        self.assertEqual(X.shape, (len(y), len(features.FEATURE_NAMES)))
+        self.assertEqual(games.shape, y.shape)
+        self.assertEqual(sorted(set(games)), [0, 1])
+        self.assertTrue(np.all(np.diff(games) >= 0))
+        self.assertTrue(np.all(np.abs(y) == 1.))
+        # the players to move alternate, so their outcomes alternate too
+        for game_idx in (0, 1):
+            outcomes = y[games == game_idx]
+            self.assertTrue(np.all(outcomes[1:] == -outcomes[:-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Seeded generation of shared opening positions for tournament play.
+
+`tournament.play_match` used to draw the two opening moves with the global
+`random.choice`, so every candidate agent saw a different set of starting
+positions and the results could not be reproduced.  An `OpeningBook` is a
+precomputed, seeded list of balanced opening positions (the first move of
+each player) that every candidate agent plays in the same order.  Drawing the
+positions by match index gives the agents common random numbers, which
+removes the opening-position variance from comparisons between agents.
+
+Positions that are equivalent under a symmetry of the board (rotations and
+reflections) are only included once.
+"""
+
+import random
+
+from isolation import Board
+
+
+def board_symmetries(width, height):
+    """
+    Return the coordinate transforms that map a board of the given size onto
+    itself.  Square boards have the eight symmetries of the square, while
+    rectangular boards only have the four reflections through the center.
+
+    Returns
+    ----------
+    list<callable>
+        Functions mapping a (row, col) coordinate pair to its image.
+    """
+    h, w = height - 1, width - 1
+    transforms = [lambda r, c: (r, c),
+                  lambda r, c: (h - r, c),
+                  lambda r, c: (r, w - c),
+                  lambda r, c: (h - r, w - c)]
+    if width == height:
+        transforms += [lambda r, c: (c, r),
+                       lambda r, c: (w - c, r),
+                       lambda r, c: (c, h - r),
+                       lambda r, c: (w - c, h - r)]
+    return transforms
+
+
+def canonical_opening(opening, width=7, height=7):
+    """
+    Return the canonical representative of an opening under the board
+    symmetries, i.e., the lexicographically smallest image of the pair of
+    opening moves.
+    """
+    return min(tuple(t(*move) for move in opening)
+               for t in board_symmetries(width, height))
+
+
+def is_balanced(opening, width=7, height=7, max_imbalance=0):
+    """
+    Test whether both players have (nearly) the same number of legal moves
+    after the opening moves have been applied.
+    """
+    game = Board(1, 2, width, height)
+    for move in opening:
+        game.apply_move(move)
+    own_moves = len(game.get_legal_moves(1))
+    opp_moves = len(game.get_legal_moves(2))
+    return own_moves > 0 and abs(own_moves - opp_moves) <= max_imbalance
+
+
+def balanced_openings(width=7, height=7, max_imbalance=0):
+    """
+    Return the sorted list of canonical, balanced openings for a board size.
+    """
+    cells = [(r, c) for r in range(height) for c in range(width)]
+    openings = {canonical_opening((p1, p2), width, height)
+                for p1 in cells for p2 in cells if p1 != p2}
+    return sorted(o for o in openings
+                  if is_balanced(o, width, height, max_imbalance))
+
+
+class OpeningBook:
+    """
+    A seeded, shuffled list of balanced opening positions shared by every
+    agent in a tournament.
+
+    Parameters
+    ----------
+    seed : hashable (optional)
+        Seed for the shuffle; the same seed always produces the same book.
+
+    width : int (optional)
+        The number of columns of the board.
+
+    height : int (optional)
+        The number of rows of the board.
+
+    max_imbalance : int (optional)
+        The largest difference in the number of legal moves of the players
+        allowed after the opening moves.
+    """
+
+    def __init__(self, seed=0, width=7, height=7, max_imbalance=0):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.positions = balanced_openings(width, height, max_imbalance)
+        if not self.positions:
+            raise ValueError("No balanced openings exist for a %dx%d board." %
+                             (width, height))
+        random.Random(seed).shuffle(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def position(self, index):
+        """
+        Return the opening for a match index.  Indices wrap around, so any
+        non-negative integer is valid.
+
+        Returns
+        ----------
+        ((int, int), (int, int))
+            The first move of player 1 and the first move of player 2.
+        """
+        return self.positions[index % len(self.positions)]
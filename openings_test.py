@@ -0,0 +1,37 @@
+"""
+Test cases for the seeded opening book used by the tournament scripts.
+"""
+import unittest
+
+import isolation
+import openings
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def test_seed_is_reproducible(self):
+        """ The same seed always produces the same sequence of openings """
+        book_a = openings.OpeningBook(seed=7)
+        book_b = openings.OpeningBook(seed=7)
+        self.assertEqual([book_a.position(i) for i in range(len(book_a))],
+                         [book_b.position(i) for i in range(len(book_b))])
+        self.assertEqual(book_a.position(len(book_a)), book_a.position(0))
+
+    def test_openings_are_unique_up_to_symmetry(self):
+        """ No two openings in the book are symmetric images of each other """
+        book = openings.OpeningBook()
+        canonical = {openings.canonical_opening(p) for p in book.positions}
+        self.assertEqual(len(canonical), len(book))
+
+    def test_openings_are_balanced(self):
+        """ Both players have the same mobility after every opening """
+        for p1_move, p2_move in openings.OpeningBook(width=5, height=6).positions:
+            game = isolation.Board("p1", "p2", width=5, height=6)
+            game.apply_move(p1_move)
+            game.apply_move(p2_move)
+            self.assertEqual(len(game.get_legal_moves("p1")),
+                             len(game.get_legal_moves("p2")))
+
+
+if __name__ == '__main__':
+    unittest.main()
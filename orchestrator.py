@@ -0,0 +1,346 @@
+'''
+Asyncio orchestrator that plays many games at once between engine
+subprocesses (see `engine.py`).
+
+Every agent runs in its own engine processes, which are kept alive and reused
+from game to game, so warm caches persist across the tournament.  The
+orchestrator only keeps the authoritative `Board` of each game and exchanges
+one `position`/`go` round trip per move, so the per-move cost of the harness is
+a few pipe writes and reads:
+
+    - time control: each move is sent with `go movetime <time limit>`; the
+      move is a timeout if the engine reports (`info time`) more time than the
+      limit, or if it does not answer within the limit plus a grace period, in
+      which case the engine is killed and replaced.
+    - back-pressure: a semaphore bounds the number of games in flight (and so
+      the number of engine processes per agent), however many matches are
+      queued.
+    - results: every game produces a `GameResult`, with the time the harness
+      added on top of the agents' own time (`overhead`), so timeouts can be
+      attributed to the agents rather than the orchestrator.
+
+Matches are "fair" as in `tournament.play_match`: two games from the same
+opening with the players swapping seats.  With a games file, every game is
+written out for review (see `isolation.write_game`) as soon as it is over.
+
+usage: orchestrator.py [-m <number of matches>] [-c <concurrency>] [-t <time limit>] [-s <seed>] [-g <games file>]
+'''
+import asyncio
+import contextlib
+import getopt
+import logging
+import sys
+import timeit
+
+from collections import namedtuple
+
+from isolation import Board, write_game
+from engine import engine_command, encode_position, format_move, parse_move
+from engine import RESPONSE_GRACE_MILLIS, STARTUP_TIMEOUT
+from openings import OpeningBook
+from agents import DEFAULT_PLAYER, OPPONENT_SPECS, TEST_SPECS
+
+logging.basicConfig(level=logging.ERROR)
+
+NUM_MATCHES = 5  # number of matches against each opponent
+CONCURRENCY = 4  # number of games in flight
+TIME_LIMIT = 150  # number of milliseconds before timeout
+
+GameResult = namedtuple("GameResult", ["player_1", "player_2", "winner",
+                                       "termination", "moves", "overhead"])
+
+
+class AsyncEngine:
+    """
+    An engine subprocess driven through asyncio pipes.
+
+    Parameters
+    ----------
+    command : list<str>
+        The command line that starts the engine (see `engine.engine_command`).
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+
+    async def start(self):
+        """ Start the engine and wait for the protocol handshake. """
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE)
+        self.process.stdin.write(b"isolation\n")
+        await asyncio.wait_for(self.expect(b"isolationok"), STARTUP_TIMEOUT)
+
+    async def expect(self, prefix):
+        """ Return the lines up to and including the first one with prefix. """
+        lines = []
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise EOFError("Engine exited.")
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    async def go(self, game, time_limit):
+        """
+        Ask the engine for a move within time_limit milliseconds.
+
+        Returns
+        ----------
+        ((int, int), float, float)
+            The move, the time the engine reports it spent and the round trip
+            time, in milliseconds.
+        """
+        start = timeit.default_timer()
+        self.process.stdin.write(("position %s\ngo movetime %d\n" % (
+            encode_position(game), time_limit)).encode())
+        lines = await asyncio.wait_for(self.expect(b"bestmove"),
+                                       (time_limit + RESPONSE_GRACE_MILLIS) / 1000.)
+        round_trip = 1000. * (timeit.default_timer() - start)
+        reported = round_trip
+        for line in lines:
+            if line.startswith(b"info time "):
+                reported = float(line.split()[2])
+        return parse_move(lines[-1].split()[1].decode()), reported, round_trip
+
+    def kill(self):
+        """ Stop the engine process. """
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+    async def close(self):
+        """ Ask the engine to quit and wait for it to exit. """
+        if self.process is not None and self.process.returncode is None:
+            try:
+                self.process.stdin.write(b"quit\n")
+                await asyncio.wait_for(self.process.wait(), 1.)
+            except (OSError, asyncio.TimeoutError):
+                self.kill()
+                await self.process.wait()
+
+
+class Orchestrator:
+    """
+    Plays games between agents, each agent running in a pool of engine
+    subprocesses.
+
+    Parameters
+    ----------
+    agents : dict<str, list<str>>
+        The engine command line of each agent, by agent name.
+
+    concurrency : int
+        The maximum number of games played at the same time.
+
+    time_limit : int
+        The number of milliseconds allowed for each move.
+    """
+
+    def __init__(self, agents, concurrency=CONCURRENCY, time_limit=TIME_LIMIT):
+        self.agents = agents
+        self.time_limit = time_limit
+        self.concurrency = concurrency
+        self.idle = {name: [] for name in agents}
+        self.engines = []
+
+    async def acquire(self, name):
+        """ Return an idle engine for the agent, starting one if needed. """
+        if self.idle[name]:
+            return self.idle[name].pop()
+        engine = AsyncEngine(self.agents[name])
+        self.engines.append(engine)
+        try:
+            await engine.start()
+        except (asyncio.TimeoutError, EOFError, OSError):
+            engine.kill()
+            raise
+        return engine
+
+    def release(self, name, engine):
+        """ Return a (still running) engine to the idle pool of the agent. """
+        if engine.process.returncode is None:
+            self.idle[name].append(engine)
+
+    async def play_game(self, name_1, name_2, opening):
+        """
+        Play one game from an opening (a pair of first moves) and return its
+        `GameResult`.  The game ends the way `Board.play` ends games: the
+        player to move loses on an illegal move (including having none) or a
+        timeout.
+        """
+        engines = {}
+        game = Board(name_1, name_2)
+        for move in opening:
+            game.apply_move(move)
+        moves = [format_move(move) for move in opening]
+        overhead = 0.
+        try:
+            while True:
+                name = game.active_player
+                legal_moves = game.get_legal_moves()
+                termination = "illegal move"
+                try:
+                    if name not in engines:
+                        engines[name] = await self.acquire(name)
+                    move, reported, round_trip = await engines[name].go(game, self.time_limit)
+                except (asyncio.TimeoutError, EOFError, OSError) as err:
+                    logging.error("Engine %s failed: %s", name, err)
+                    if name in engines:
+                        engines.pop(name).kill()
+                    termination = "timeout"
+                    break
+                overhead += round_trip - reported
+                moves.append(format_move(move))
+                if reported > self.time_limit:
+                    termination = "timeout"
+                    break
+                if move not in legal_moves:
+                    break
+                game.apply_move(move)
+        finally:
+            for name, engine in engines.items():
+                self.release(name, engine)
+        return GameResult(name_1, name_2, game.inactive_player, termination,
+                          moves, overhead)
+
+    async def run(self, matches, on_result=None):
+        """
+        Play fair matches (two games from the same opening, swapping seats)
+        and return the results of every game in the order of the matches.
+
+        Parameters
+        ----------
+        matches : iterable<(str, str, ((int, int), (int, int)))>
+            The two agent names and the opening of each match.
+
+        on_result : callable (optional)
+            Called with every `GameResult` as soon as the game is over.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded_game(name_1, name_2, opening):
+            async with semaphore:
+                result = await self.play_game(name_1, name_2, opening)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        tasks = []
+        for name_1, name_2, opening in matches:
+            tasks.append(bounded_game(name_1, name_2, opening))
+            tasks.append(bounded_game(name_2, name_1, opening))
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            await self.close()
+
+    async def close(self):
+        """ Stop every engine process. """
+        await asyncio.gather(*[engine.close() for engine in self.engines])
+        self.engines = []
+        self.idle = {name: [] for name in self.agents}
+
+
+def tally(results):
+    """
+    Return the number of games won, lost by timeout and lost by illegal move
+    for every agent, and the mean harness overhead per move in milliseconds.
+    """
+    counts = {}
+    for result in results:
+        for name in (result.player_1, result.player_2):
+            counts.setdefault(name, {"wins": 0, "timeouts": 0, "invalid moves": 0})
+        loser = result.player_2 if result.winner == result.player_1 else result.player_1
+        counts[result.winner]["wins"] += 1
+        counts[loser]["timeouts" if result.termination == "timeout" else "invalid moves"] += 1
+    num_moves = sum(len(result.moves) - 2 for result in results)
+    overhead = sum(result.overhead for result in results) / max(1, num_moves)
+    return counts, overhead
+
+
+def write_result(ofile, result):
+    """ Write the moves and boards of a finished game to a text file. """
+    moves = [parse_move(token) for token in result.moves]
+    history = [moves[idx:idx + 2] for idx in range(0, len(moves), 2)]
+    ofile.write("%s vs. %s\r\n" % (result.player_1, result.player_2))
+    write_game(ofile, result.winner, history, result.termination)
+
+
+def play_tournament(agents, matches, concurrency=CONCURRENCY, time_limit=TIME_LIMIT,
+                    on_result=None):
+    """ Run `Orchestrator.run()` to completion and return the results. """
+    orchestrator = Orchestrator(agents, concurrency, time_limit)
+    return asyncio.run(orchestrator.run(matches, on_result))
+
+
+def main(argv):
+
+    USAGE = """usage: orchestrator.py [-m <number of matches>] [-c <concurrency>] [-t <time limit>] [-s <seed>] [-g <games file>]
+            -m number of matches: optional number of matches against each opponent (each match has 2 games) - default is 5
+            -c concurrency: optional number of games played at the same time - default is 4
+            -t time limit: optional number of milliseconds per move - default is 150
+            -s seed: optional seed for the shared opening positions - default is 0
+            -g games file: optional file to write every game to"""
+
+    num_matches = NUM_MATCHES
+    concurrency = CONCURRENCY
+    time_limit = TIME_LIMIT
+    seed = 0
+    gamesfilename = None
+    try:
+        opts, args = getopt.getopt(argv, "hm:c:t:s:g:",
+                                   ["matches=", "concurrency=", "timelimit=", "seed=", "games="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-m", "--matches"):
+            num_matches = int(arg)
+        elif opt in ("-c", "--concurrency"):
+            concurrency = int(arg)
+        elif opt in ("-t", "--timelimit"):
+            time_limit = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-g", "--games"):
+            gamesfilename = arg
+
+    # engines build their agents from the specs of the standard tournament
+    agents = {spec["name"]: engine_command(spec.get("player", DEFAULT_PLAYER),
+                                           {key: value for key, value in spec.items()
+                                            if key not in ("name", "player")})
+              for spec in OPPONENT_SPECS + TEST_SPECS}
+    opponents = [spec["name"] for spec in OPPONENT_SPECS]
+
+    book = OpeningBook(seed=seed)
+    matches = [(name, opponent, book.position(match_idx))
+               for name in ("ID_Improved", "Student")
+               for opponent in opponents
+               for match_idx in range(num_matches)]
+    start = timeit.default_timer()
+    with contextlib.ExitStack() as stack:
+        on_result = None
+        if gamesfilename:
+            gamesfile = stack.enter_context(open(gamesfilename, mode='w'))
+            on_result = lambda result: write_result(gamesfile, result)
+        results = play_tournament(agents, matches, concurrency, time_limit, on_result)
+    counts, overhead = tally(results)
+
+    print("\nResults ({} games in {:.1f}s, {:.2f} ms harness overhead per move):".format(
+        len(results), timeit.default_timer() - start, overhead))
+    print("----------")
+    for name in ("ID_Improved", "Student"):
+        games = 2 * num_matches * len(opponents)
+        print("{!s:<15}{:>10.2f}%  ({} timeouts, {} invalid moves)".format(
+            name, 100. * counts[name]["wins"] / games,
+            counts[name]["timeouts"], counts[name]["invalid moves"]))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
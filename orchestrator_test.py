@@ -0,0 +1,45 @@
+"""
+Test cases for the asyncio match orchestrator.
+"""
+import io
+import sys
+import unittest
+
+from engine import engine_command
+from orchestrator import play_tournament, tally, write_result
+
+
+class OrchestratorTest(unittest.TestCase):
+
+    def test_tournament(self):
+        """ Concurrent games produce one result per game, tallied by agent """
+        agents = {"A": engine_command("sample_players:RandomPlayer"),
+                  "B": engine_command("sample_players:RandomPlayer")}
+        matches = [("A", "B", ((0, 0), (6, 6))), ("B", "A", ((3, 3), (1, 2)))]
+        games = io.StringIO()
+        results = play_tournament(agents, matches, concurrency=2, time_limit=1000,
+                                  on_result=lambda result: write_result(games, result))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(games.getvalue().count("Winner: "), 4)
+        self.assertEqual([(r.player_1, r.player_2) for r in results],
+                         [("A", "B"), ("B", "A"), ("B", "A"), ("A", "B")])
+        for result in results:
+            self.assertIn(result.winner, ("A", "B"))
+            self.assertEqual(result.termination, "illegal move")
+            self.assertEqual(result.moves[-1], "none")
+        counts, overhead = tally(results)
+        self.assertEqual(counts["A"]["wins"] + counts["B"]["wins"], 4)
+        self.assertGreaterEqual(overhead, 0.)
+
+    def test_broken_engine(self):
+        """ An engine that dies loses its games without stopping the others """
+        agents = {"A": engine_command("sample_players:RandomPlayer"),
+                  "Broken": [sys.executable, "-c", "pass"]}
+        results = play_tournament(agents, [("A", "Broken", ((0, 0), (6, 6)))],
+                                  concurrency=2, time_limit=1000)
+        self.assertEqual([r.winner for r in results], ["A", "A"])
+        self.assertEqual([r.termination for r in results], ["timeout", "timeout"])
+
+
+if __name__ == '__main__':
+    unittest.main()
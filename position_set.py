@@ -0,0 +1,278 @@
+'''
+Position sets shared between processes without copies.
+
+Analysis jobs that send `Board` objects to `Pool` workers pickle every board
+into every task, and each worker ends up holding its own copy of the whole
+set.  A `PositionSet` instead stores the positions of one board size as
+fixed-size columns in a single buffer:
+
+    header      magic, width, height, number of positions
+    hashes      uint64 position hash of every position
+    values      float64 label of every position (e.g., a game outcome)
+    p1, p2      int16 cell index of each player (-1 before its first move)
+    moves       uint16 move count
+    cells       width * height bytes of cell state per position
+
+The buffer is either a `multiprocessing.shared_memory` block (`create()`) or
+a memory-mapped file (`write_positions()` then `PositionSet(path=...)`).  A
+set pickles as the name of its block or the path of its file, so a task
+carries a few bytes and every worker maps the same pages.  The columns are
+typed memoryviews into the buffer, and a position is only decoded into a
+`Board` when it is read:
+
+    positions = PositionSet.create(games, outcomes)
+    with Pool() as pool:
+        pool.map(analyze, [(positions, start, start + 1000) for start in ...])
+    positions.unlink()
+
+where `analyze` reads `positions[idx]` (a new `Board`) or `positions.value(idx)`.
+
+usage: position_set.py [-s <board size>] [-n <positions>] [-p <pool size>] [-o <output file>]
+'''
+import getopt
+import mmap
+import os
+import struct
+import sys
+import timeit
+
+from multiprocessing import Pool, shared_memory
+
+from isolation import Board
+
+_HEADER = struct.Struct("<8sHHIQ")  # 24 bytes, so the 64-bit columns are aligned
+_MAGIC = b"ISOLPS01"
+_NOT_MOVED = -1
+
+
+def encoded_size(width, height, count):
+    """ Return the number of bytes of the encoding of a position set. """
+    return _HEADER.size + count * (8 + 8 + 2 + 2 + 2 + width * height)
+
+
+def encode_positions(buffer, games, values=None):
+    """
+    Encode positions (boards of one size) and their values (default 0.) into
+    a writable buffer of at least `encoded_size()` bytes.
+    """
+    width, height = games[0].width, games[0].height
+    count = len(games)
+    values = [0.] * count if values is None else values
+    num_cells = width * height
+    view = memoryview(buffer)
+    _HEADER.pack_into(view, 0, _MAGIC, width, height, 0, count)
+    columns = _columns(view, width, height, count)
+    for idx, game in enumerate(games):
+        if game.width != width or game.height != height:
+            raise ValueError("All positions of a set must have the same board size.")
+        columns["hashes"][idx] = game.position_hash
+        columns["values"][idx] = values[idx]
+        for column, player in (("p1", game.__player_1__), ("p2", game.__player_2__)):
+            idx_loc = game.__location_index__(player)
+            columns[column][idx] = _NOT_MOVED if idx_loc is Board.NOT_MOVED else idx_loc
+        columns["moves"][idx] = game.move_count
+        columns["cells"][idx * num_cells:(idx + 1) * num_cells] = game.__cells__
+    for column in columns.values():
+        column.release()
+    view.release()
+
+
+def write_positions(path, games, values=None):
+    """ Write positions and their values to a position set file. """
+    width, height = games[0].width, games[0].height
+    buffer = bytearray(encoded_size(width, height, len(games)))
+    encode_positions(buffer, games, values)
+    with open(path, "wb") as ofile:
+        ofile.write(buffer)
+
+
+def _columns(view, width, height, count):
+    """ Return typed memoryviews of the columns of an encoded position set. """
+    columns = {}
+    offset = _HEADER.size
+    for name, fmt, size in (("hashes", "Q", 8), ("values", "d", 8), ("p1", "h", 2),
+                            ("p2", "h", 2), ("moves", "H", 2)):
+        columns[name] = view[offset:offset + size * count].cast(fmt)
+        offset += size * count
+    columns["cells"] = view[offset:offset + width * height * count]
+    return columns
+
+
+class PositionSet:
+    """
+    Read-only positions of one board size in shared memory or in a
+    memory-mapped file.
+
+    Parameters
+    ----------
+    path : str (optional)
+        A file written by `write_positions()`.
+
+    name : str (optional)
+        The name of a shared memory block filled by `create()`.
+    """
+
+    def __init__(self, path=None, name=None):
+        if (path is None) == (name is None):
+            raise ValueError("A position set needs either a path or a shared memory name.")
+        self.path = path
+        self.name = name
+        self.shm = None
+        if path is not None:
+            with open(path, "rb") as ifile:
+                self.buffer = mmap.mmap(ifile.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.buffer = self.shm.buf
+        self.view = memoryview(self.buffer).toreadonly()
+        magic, self.width, self.height, _, count = _HEADER.unpack_from(self.view)
+        if magic != _MAGIC:
+            raise ValueError("%s is not a position set." % (path or name))
+        self.columns = _columns(self.view, self.width, self.height, count)
+        self.num_cells = self.width * self.height
+
+    @classmethod
+    def create(cls, games, values=None):
+        """
+        Return a new position set in a shared memory block; the creator must
+        `unlink()` it once every process is done with it.
+        """
+        size = encoded_size(games[0].width, games[0].height, len(games))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        encode_positions(shm.buf, games, values)
+        positions = cls(name=shm.name)
+        shm.close()
+        return positions
+
+    def __getstate__(self):
+        return {"path": self.path, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["name"])
+
+    def __len__(self):
+        return len(self.columns["hashes"])
+
+    def __getitem__(self, idx):
+        return self.board(idx)
+
+    def __iter__(self):
+        return (self.board(idx) for idx in range(len(self)))
+
+    def position_hash(self, idx):
+        """ Return the position hash of a position without decoding it. """
+        return self.columns["hashes"][idx]
+
+    def value(self, idx):
+        """ Return the value stored with a position. """
+        return self.columns["values"][idx]
+
+    def cells(self, idx):
+        """
+        Return a read-only view (no copy) of the cell state of a position,
+        column by column as in `isolation.isolation.cell_index()`.
+        """
+        return self.columns["cells"][idx * self.num_cells:(idx + 1) * self.num_cells]
+
+    def board(self, idx, player_1="player_1", player_2="player_2"):
+        """ Decode a position into a new `Board` between two players. """
+        if not -len(self) <= idx < len(self):
+            raise IndexError("position index out of range")
+        idx %= len(self)
+        columns = self.columns
+        game = Board(player_1, player_2, self.width, self.height)
+        game.__cells__[:] = self.cells(idx)
+        for slot, column in (("__p1_location__", "p1"), ("__p2_location__", "p2")):
+            location = columns[column][idx]
+            setattr(game, slot, Board.NOT_MOVED if location == _NOT_MOVED else location)
+        game.move_count = columns["moves"][idx]
+        if game.move_count % 2:
+            game.__active_player__, game.__inactive_player__ = player_2, player_1
+        game.__position_hash__ = columns["hashes"][idx]
+        return game
+
+    def close(self):
+        """ Release the mapping of the set in this process. """
+        for column in self.columns.values():
+            column.release()
+        self.view.release()
+        if self.shm is not None:
+            self.shm.close()
+        else:
+            self.buffer.close()
+
+    def unlink(self):
+        """ Close the set and free its shared memory block (by its creator). """
+        self.close()
+        if self.shm is not None:
+            self.shm.unlink()
+
+
+def _mobility_worker(args):
+    """ Pool worker: total legal moves of the player to move in a range. """
+    positions, start, stop = args
+    total = 0
+    for idx in range(start, stop):
+        total += len(positions[idx].get_legal_moves())
+    positions.close()
+    return total
+
+
+def main(argv):
+
+    USAGE = """usage: position_set.py [-s <board size>] [-n <positions>] [-p <pool size>] [-o <output file>]
+            -s board size: optional board size - default is 7
+            -n positions: optional number of random positions - default is 100000
+            -p pool size: optional number of worker processes - default is the number of CPUs
+            -o output file: optional file for the set (default is a shared memory block)"""
+
+    from benchmarks import random_positions
+
+    size = 7
+    num_positions = 100000
+    pool_size = None
+    outputfilename = None
+    try:
+        opts, args = getopt.getopt(argv, "hs:n:p:o:", ["size=", "positions=", "pool=", "ofile="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-s", "--size"):
+            size = int(arg)
+        elif opt in ("-n", "--positions"):
+            num_positions = int(arg)
+        elif opt in ("-p", "--pool"):
+            pool_size = int(arg)
+        elif opt in ("-o", "--ofile"):
+            outputfilename = arg
+
+    games = random_positions(size, num_positions)
+    if outputfilename:
+        write_positions(outputfilename, games)
+        positions = PositionSet(path=outputfilename)
+    else:
+        positions = PositionSet.create(games)
+    print("Encoded {} positions in {:.1f} MB".format(
+        len(positions), encoded_size(size, size, len(positions)) / 2. ** 20))
+
+    chunk = max(1, len(positions) // (4 * (pool_size or os.cpu_count() or 1)))
+    tasks = [(positions, start, min(start + chunk, len(positions)))
+             for start in range(0, len(positions), chunk)]
+    start = timeit.default_timer()
+    with Pool(processes=pool_size) as pool:
+        total = sum(pool.map(_mobility_worker, tasks))
+    print("Mean mobility {:.2f} over {} positions in {:.2f}s".format(
+        total / float(len(positions)), len(positions), timeit.default_timer() - start))
+    if outputfilename:
+        positions.close()
+    else:
+        positions.unlink()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+"""
+Test cases for the shared position sets.
+"""
+import os
+import pickle
+import tempfile
+import unittest
+
+from multiprocessing import Pool
+
+from benchmarks import random_positions
+from isolation import Board
+from position_set import PositionSet, write_positions
+
+
+def state(game):
+    return (game.to_string(), game.position_hash, game.move_count,
+            game.active_player, sorted(game.get_legal_moves()))
+
+
+def legal_moves_worker(args):
+    """ Pool worker: decode a range of positions from a pickled set. """
+    positions, start, stop = args
+    moves = [sorted(positions[idx].get_legal_moves()) for idx in range(start, stop)]
+    positions.close()
+    return moves
+
+
+class PositionSetTest(unittest.TestCase):
+
+    def setUp(self):
+        # random positions, and an empty board where nobody has moved yet
+        self.games = random_positions(6, 50, seed=1) + [Board("player_1", "player_2", 6, 6)]
+        self.values = [float(idx) for idx in range(len(self.games))]
+
+    def check(self, positions):
+        self.assertEqual(len(positions), len(self.games))
+        for idx, game in enumerate(self.games):
+            self.assertEqual(state(positions[idx]), state(game))
+            self.assertEqual(positions.value(idx), self.values[idx])
+            self.assertEqual(bytes(positions.cells(idx)), bytes(game.__cells__))
+        self.assertEqual(state(positions[-1]), state(self.games[-1]))
+        with self.assertRaises(IndexError):
+            positions[len(self.games)]
+
+    def test_shared_memory(self):
+        """ Positions decode from shared memory in this and other processes """
+        positions = PositionSet.create(self.games, self.values)
+        try:
+            self.check(positions)
+            copy = pickle.loads(pickle.dumps(positions))
+            self.check(copy)
+            copy.close()
+            self.assertLess(len(pickle.dumps(positions)), 200)
+            with Pool(processes=2) as pool:
+                moves = sum(pool.map(legal_moves_worker, [(positions, 0, 20),
+                                                          (positions, 20, len(positions))]), [])
+            self.assertEqual(moves, [sorted(game.get_legal_moves()) for game in self.games])
+        finally:
+            positions.unlink()
+
+    def test_memory_mapped_file(self):
+        """ Positions written to a file decode from its memory map """
+        handle, path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        try:
+            write_positions(path, self.games, self.values)
+            positions = PositionSet(path=path)
+            self.check(positions)
+            decoded = positions[3]
+            decoded.apply_move(decoded.get_legal_moves()[0])
+            self.assertEqual(state(positions[3]), state(self.games[3]))
+            positions.close()
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+'''
+Lightweight profiling of the search hot path.
+
+While `instrument(profile)` is active, the hot-path functions of `Board`
+(copy, forecast_move, apply_move, get_legal_moves) and `CustomPlayer`
+(get_move, minimax, alphabeta, and the score function and time_left timer
+each search polls) are wrapped with counters that record, for every call
+stack of instrumented functions, the number of calls and the inclusive time:
+
+    profile = Profile()
+    with instrument(profile):
+        player.get_move(game, game.get_legal_moves(), time_left)
+    print(profile.format_table())
+
+Recursive calls of a function (e.g., alphabeta calling alphabeta) are folded
+into one frame, so stacks stay short and times are not counted twice.  The
+report is either a table per function (calls, cumulative and self time) or
+"folded" stacks, one `frame;frame;frame <microseconds>` line per stack, which
+flamegraph.pl and speedscope read directly.
+
+Profiles only hold plain dictionaries, so a `tournament_mp` worker can
+profile its round and return the profile to the parent, which merges them
+with `Profile.merge()`.  Instrumentation patches the classes of the current
+process only, and each wrapped call costs about a microsecond, which is
+included in the times reported.
+
+usage: profiling.py [-s <board size>] [-n <positions>] [-d <depth>] [-f <folded output file>]
+'''
+import getopt
+import sys
+import timeit
+
+from contextlib import contextmanager
+from functools import wraps
+
+import game_agent
+
+from isolation import Board
+from features import FeatureBoard
+
+BOARD_METHODS = ("copy", "forecast_move", "apply_move", "get_legal_moves")
+PLAYER_METHODS = ("minimax", "alphabeta")
+
+clock = timeit.default_timer
+
+
+class Profile:
+    """
+    Call counts and times per call stack of instrumented functions.
+
+    Parameters
+    ----------
+    names : dict (optional)
+        Labels for players, used as the root frame of their searches
+        (default is the class name of the player).
+    """
+
+    def __init__(self, names=None):
+        self.names = names or {}
+        self.stats = {}  # stack tuple -> [calls, inclusive seconds, seconds in children]
+        self.stack = []
+
+    def __getstate__(self):
+        return {"names": {}, "stats": self.stats, "stack": []}
+
+    def wrap(self, name, fn):
+        """ Return fn wrapped to record its calls under the given frame name. """
+        stack = self.stack
+        stats = self.stats
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            recursive = bool(stack) and stack[-1] == name
+            if not recursive:
+                stack.append(name)
+            key = tuple(stack)
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                entry = stats.get(key)
+                if entry is None:
+                    entry = stats[key] = [0, 0., 0.]
+                entry[0] += 1
+                if not recursive:
+                    entry[1] += elapsed
+                    stack.pop()
+                    if stack:
+                        stats.setdefault(tuple(stack), [0, 0., 0.])[2] += elapsed
+        return wrapper
+
+    def merge(self, other):
+        """ Add the counts and times of another profile to this one. """
+        for key, (calls, total, children) in other.stats.items():
+            entry = self.stats.setdefault(key, [0, 0., 0.])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] += children
+        return self
+
+    def functions(self):
+        """
+        Return (name, calls, cumulative seconds, self seconds) for every
+        instrumented function, by decreasing self time.
+        """
+        totals = {}
+        for key, (calls, total, children) in self.stats.items():
+            entry = totals.setdefault(key[-1], [0, 0., 0.])
+            entry[0] += calls
+            if key[-1] not in key[:-1]:
+                entry[1] += total
+            entry[2] += total - children
+        return sorted(((name,) + tuple(entry) for name, entry in totals.items()),
+                      key=lambda row: -row[3])
+
+    def format_table(self):
+        """ Return the profile as a table with one line per function. """
+        rows = self.functions()
+        total = sum(row[3] for row in rows) or 1.
+        lines = ["{:<25}{:>12}{:>12}{:>12}{:>8}{:>10}".format(
+            "function", "calls", "cum ms", "self ms", "self %", "self us")]
+        for name, calls, cumulative, own in rows:
+            lines.append("{:<25}{:>12d}{:>12.1f}{:>12.1f}{:>8.1f}{:>10.2f}".format(
+                name, calls, 1e3 * cumulative, 1e3 * own, 100. * own / total,
+                1e6 * own / max(1, calls)))
+        return "\n".join(lines)
+
+    def folded(self):
+        """ Return the profile as folded stacks (self time in microseconds). """
+        return "\n".join("%s %d" % (";".join(key), round(1e6 * (total - children)))
+                         for key, (calls, total, children) in sorted(self.stats.items())
+                         if total > children)
+
+
+@contextmanager
+def instrument(profile):
+    """
+    Record the hot-path calls of `Board` and `CustomPlayer` (in this process)
+    in a profile for the duration of the context.
+    """
+    CustomPlayer = game_agent.CustomPlayer
+    originals = []
+
+    def patch(cls, name, replacement):
+        originals.append((cls, name, cls.__dict__[name]))
+        setattr(cls, name, replacement)
+
+    for cls in (Board, FeatureBoard):
+        for name in BOARD_METHODS:
+            if name in cls.__dict__:
+                patch(cls, name, profile.wrap(name, cls.__dict__[name]))
+    for name in PLAYER_METHODS:
+        patch(CustomPlayer, name, profile.wrap(name, CustomPlayer.__dict__[name]))
+
+    get_move = CustomPlayer.__dict__["get_move"]
+
+    def profiled_get_move(self, game, legal_moves, time_left):
+        score = self.score
+        self.score = profile.wrap("score", score)
+        label = profile.names.get(self, type(self).__name__)
+        try:
+            return profile.wrap(label, get_move)(self, game, legal_moves,
+                                                 profile.wrap("time_left", time_left))
+        finally:
+            self.score = score
+
+    patch(CustomPlayer, "get_move", profiled_get_move)
+    try:
+        yield profile
+    finally:
+        for cls, name, original in reversed(originals):
+            setattr(cls, name, original)
+
+
+def main(argv):
+
+    USAGE = """usage: profiling.py [-s <board size>] [-n <positions>] [-d <depth>] [-f <folded output file>]
+            -s board size: optional board size - default is 7
+            -n positions: optional number of positions to search - default is 20
+            -d depth: optional search depth - default is 4
+            -f folded output file: optional file for the folded stacks (flame graph input)"""
+
+    from benchmarks import random_positions
+    from sample_players import improved_score
+
+    size = 7
+    num_positions = 20
+    depth = 4
+    foldedfilename = None
+    try:
+        opts, args = getopt.getopt(argv, "hs:n:d:f:", ["size=", "positions=", "depth=", "folded="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-s", "--size"):
+            size = int(arg)
+        elif opt in ("-n", "--positions"):
+            num_positions = int(arg)
+        elif opt in ("-d", "--depth"):
+            depth = int(arg)
+        elif opt in ("-f", "--folded"):
+            foldedfilename = arg
+
+    player = game_agent.CustomPlayer(search_depth=depth, score_fn=improved_score,
+                                     iterative=False, method='alphabeta')
+    positions = [game for game in random_positions(size, num_positions, players=(player, "opponent"))
+                 if game.active_player == player]
+    profile = Profile({player: "get_move"})
+    with instrument(profile):
+        for game in positions:
+            player.get_move(game, game.get_legal_moves(), lambda: float("inf"))
+    print(profile.format_table())
+    if foldedfilename:
+        with open(foldedfilename, mode='w') as ofile:
+            ofile.write(profile.folded() + "\n")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,75 @@
+"""
+Test cases for the search profiling hooks.
+"""
+import pickle
+import unittest
+
+from multiprocessing import Pool
+
+import game_agent
+import isolation
+from profiling import Profile, instrument
+from sample_players import RandomPlayer, improved_score
+from tournament_mp import Agent, play_round
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.evaluations = 0
+
+        def counting_score(game, player):
+            self.evaluations += 1
+            return improved_score(game, player)
+
+        self.player = game_agent.CustomPlayer(search_depth=3, score_fn=counting_score,
+                                              iterative=False, method='alphabeta')
+        self.game = isolation.Board(self.player, "opponent")
+        self.game.apply_move((3, 3))
+        self.game.apply_move((0, 0))
+
+    def profile_search(self):
+        profile = Profile({self.player: "search"})
+        legal_moves = self.game.get_legal_moves()
+        with instrument(profile):
+            self.player.get_move(self.game, legal_moves, lambda: 1e9)
+        return profile
+
+    def test_counts_and_restores(self):
+        """ Calls are counted per function and the classes are restored """
+        copy = isolation.Board.copy
+        profile = self.profile_search()
+        self.assertIs(isolation.Board.copy, copy)
+        self.assertFalse(hasattr(self.player.score, "__wrapped__"))
+        calls = {row[0]: row[1] for row in profile.functions()}
+        self.assertEqual(calls["score"], self.evaluations)
+        self.assertEqual(calls["search"], 1)
+        self.assertGreater(calls["alphabeta"], calls["score"])
+        self.assertEqual(calls["forecast_move"], calls["alphabeta"] - 1)
+        for line in profile.folded().splitlines():
+            stack, micros = line.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("search"), line)
+            self.assertGreaterEqual(int(micros), 0)
+
+    def test_merge(self):
+        """ Profiles survive pickling and merge by adding counts """
+        profile = pickle.loads(pickle.dumps(self.profile_search()))
+        merged = Profile().merge(profile).merge(profile)
+        self.assertEqual([row[1] for row in merged.functions()],
+                         [2 * row[1] for row in profile.functions()])
+
+    def test_tournament_worker(self):
+        """ A tournament_mp worker returns the profile of its round """
+        agent = Agent(game_agent.CustomPlayer(search_depth=1, score_fn=improved_score,
+                                              iterative=False, method='alphabeta'), "agent")
+        with Pool(processes=1) as pool:
+            result = pool.apply_async(play_round, ([Agent(RandomPlayer(), "Random")],
+                                                   agent, 1, None, False, True))
+            name, _, _, profile = result.get()
+        roots = {key[0] for key in profile.stats}
+        self.assertIn("agent", roots)
+        self.assertIn("alphabeta", {row[0] for row in profile.functions()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Rating models for tournament results.
+
+A result is the outcome of a pairing between two agents: the number of games
+they played and the points scored by the first agent (one per win, so the
+second agent scored `games - score_1`).  Two models turn a list of results
+into one rating per agent on the Elo scale (400 points for 10:1 odds):
+
+    - `elo_ratings()` updates the ratings result by result, in order, as a
+      rating list would over a season;
+    - `bradley_terry()` fits the maximum likelihood strengths of the
+      Bradley-Terry model (P(a beats b) = p_a / (p_a + p_b)) to all results at
+      once by minorization-maximization (Hunter, 2004), so the ratings do not
+      depend on the order of the games.  Every agent also gets `prior` drawn
+      games against a virtual agent rated `INITIAL_RATING`, which keeps the
+      strengths of unbeaten (or winless) agents finite.
+
+Bradley-Terry uses the information of every game, including the games of
+the opponents of an agent, which is what lets Swiss and knockout events rank
+many agents from few games:
+
+    results = [Result("A", "B", 3, 4), Result("B", "C", 2, 4)]
+    print(format_ratings(bradley_terry(results), records(results)))
+"""
+
+from collections import defaultdict, namedtuple
+from math import log10
+
+INITIAL_RATING = 1500.  # rating of an agent without games
+ELO_K = 16.  # largest change of an Elo rating per game
+BT_ITERATIONS = 1000  # maximum number of Bradley-Terry iterations
+BT_TOLERANCE = 1e-9  # largest relative change of a strength at convergence
+BT_PRIOR = 1.  # virtual drawn games of every agent against an INITIAL_RATING agent
+
+Result = namedtuple("Result", ["agent_1", "agent_2", "score_1", "games"])
+Result.__doc__ = """
+Outcome of a pairing: the names of the two agents, the points scored by
+`agent_1` (`agent_2` scored `games - score_1`) and the number of games.
+"""
+
+
+def expected_score(rating_1, rating_2):
+    """ Return the expected score per game of an agent against another. """
+    return 1. / (1. + 10. ** ((rating_2 - rating_1) / 400.))
+
+
+def records(results):
+    """ Return the (points, games) of every agent in a list of results. """
+    totals = defaultdict(lambda: [0., 0])
+    for result in results:
+        totals[result.agent_1][0] += result.score_1
+        totals[result.agent_2][0] += result.games - result.score_1
+        totals[result.agent_1][1] += result.games
+        totals[result.agent_2][1] += result.games
+    return {name: tuple(total) for name, total in totals.items()}
+
+
+def elo_ratings(results, k=ELO_K, ratings=None):
+    """
+    Return the Elo ratings of the agents after the results, in order.
+
+    Parameters
+    ----------
+    k : float (optional)
+        The largest change of a rating per game.
+
+    ratings : dict (optional)
+        The ratings before the results - default is `INITIAL_RATING` for
+        every agent.
+    """
+    ratings = dict(ratings or {})
+    for result in results:
+        rating_1 = ratings.setdefault(result.agent_1, INITIAL_RATING)
+        rating_2 = ratings.setdefault(result.agent_2, INITIAL_RATING)
+        delta = k * (result.score_1 - result.games * expected_score(rating_1, rating_2))
+        ratings[result.agent_1] = rating_1 + delta
+        ratings[result.agent_2] = rating_2 - delta
+    return ratings
+
+
+def bradley_terry(results, prior=BT_PRIOR, iterations=BT_ITERATIONS, tolerance=BT_TOLERANCE):
+    """
+    Return the Bradley-Terry ratings (on the Elo scale) of the agents of a
+    list of results.
+
+    Parameters
+    ----------
+    prior : float (optional)
+        The number of virtual drawn games of every agent against an agent
+        rated `INITIAL_RATING`.  Without a prior, the ratings are centered on
+        `INITIAL_RATING`, and must be finite: every agent must have won and
+        lost a game (possibly indirectly, through the other agents).
+
+    iterations : int (optional)
+        The maximum number of iterations.
+
+    tolerance : float (optional)
+        Stop when no strength changes by more than this ratio.
+    """
+    # games between each pair, and points of each agent
+    games = defaultdict(lambda: defaultdict(float))
+    points = defaultdict(float)
+    for result in results:
+        games[result.agent_1][result.agent_2] += result.games
+        games[result.agent_2][result.agent_1] += result.games
+        points[result.agent_1] += result.score_1
+        points[result.agent_2] += result.games - result.score_1
+    names = sorted(games)
+    strengths = dict.fromkeys(names, 1.)
+    for _ in range(iterations):
+        updated = {}
+        for name in names:
+            strength = strengths[name]
+            denominator = prior / (strength + 1.) + sum(
+                count / (strength + strengths[other]) for other, count in games[name].items())
+            updated[name] = (points[name] + prior / 2.) / denominator
+        # the virtual agent (strength 1) anchors the scale, or else the mean
+        scale = 1.
+        if not prior:
+            scale = 10. ** (sum(log10(s) for s in updated.values()) / max(1, len(names)))
+        change = max([abs(updated[name] / scale / strengths[name] - 1.) for name in names] or [0.])
+        strengths = {name: updated[name] / scale for name in names}
+        if change < tolerance:
+            break
+    return {name: INITIAL_RATING + 400. * log10(strength) for name, strength in strengths.items()}
+
+
+def ranking(ratings):
+    """ Return the agent names from the highest to the lowest rating. """
+    return sorted(ratings, key=lambda name: (-ratings[name], name))
+
+
+def format_ratings(ratings, totals=None):
+    """
+    Return a text table of the agents by rating, with their points and games
+    if the totals of `records()` are given.
+    """
+    lines = []
+    width = max([len(str(name)) for name in ratings] + [5])
+    for rank, name in enumerate(ranking(ratings), 1):
+        line = "{:>4}  {:<{width}}  {:7.1f}".format(rank, name, ratings[name], width=width)
+        if totals is not None:
+            score, games = totals.get(name, (0., 0))
+            line += "  {:6.1f} / {:<4d} ({:5.1f}%)".format(
+                score, games, 100. * score / games if games else 0.)
+        lines.append(line)
+    return "\n".join(lines)
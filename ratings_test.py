@@ -0,0 +1,53 @@
+"""
+Test cases for the rating models.
+"""
+import random
+import unittest
+
+from ratings import (INITIAL_RATING, Result, bradley_terry, elo_ratings, expected_score,
+                     format_ratings, ranking, records)
+
+TRUE_RATINGS = {"A": 1800., "B": 1600., "C": 1500., "D": 1300.}
+
+
+def simulated_results(num_pairings, seed=0):
+    """ Return results of two-game pairings drawn from `TRUE_RATINGS`. """
+    rng = random.Random(seed)
+    results = []
+    for _ in range(num_pairings):
+        a, b = rng.sample(sorted(TRUE_RATINGS), 2)
+        p = expected_score(TRUE_RATINGS[a], TRUE_RATINGS[b])
+        results.append(Result(a, b, sum(rng.random() < p for _ in range(2)), 2))
+    return results
+
+
+class RatingsTest(unittest.TestCase):
+
+    def test_models_recover_the_order(self):
+        """ Both models rank simulated agents by their true strength """
+        results = simulated_results(400)
+        for ratings in (bradley_terry(results), elo_ratings(results)):
+            self.assertEqual(ranking(ratings), ["A", "B", "C", "D"])
+        ratings = bradley_terry(results, prior=0)
+        self.assertAlmostEqual(sum(ratings.values()) / 4, INITIAL_RATING)
+        self.assertAlmostEqual(ratings["A"] - ratings["D"], 500, delta=100)
+
+    def test_prior_keeps_ratings_finite(self):
+        """ An unbeaten agent gets a finite Bradley-Terry rating """
+        ratings = bradley_terry([Result("A", "B", 2, 2)])
+        self.assertGreater(ratings["A"], INITIAL_RATING)
+        self.assertAlmostEqual(ratings["A"] - INITIAL_RATING, INITIAL_RATING - ratings["B"],
+                               places=3)
+
+    def test_elo_and_records(self):
+        """ Elo moves points between the agents; records total every game """
+        results = [Result("A", "B", 2, 2), Result("B", "C", 1, 2)]
+        ratings = elo_ratings(results)
+        self.assertAlmostEqual(sum(ratings.values()), 3 * INITIAL_RATING)
+        self.assertAlmostEqual(ratings["A"], INITIAL_RATING + 16.)
+        self.assertEqual(records(results), {"A": (2., 2), "B": (1., 4), "C": (1., 2)})
+        self.assertEqual(format_ratings(ratings, records(results)).split("\n")[0].split()[1], "A")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+'''
+Parallel, deterministic runner for the test suite and the search regression
+corpus.
+
+The unit tests (every `*_test.py` module) are split into independent groups,
+one per `TestCase` class, which run on a pool of worker processes.  Next to
+them, a corpus of positions generated by seeded random play on boards of
+several sizes is checked for invariants that every change to the board or the
+search must preserve:
+
+    - the legal moves equal those found by brute force over all cells;
+    - copying a board, and replaying its moves on a new board, give the same
+      position hash and the same legal moves;
+    - minimax and alpha-beta agree on the value of a fixed-depth search;
+    - an iterative deepening search timed by a `timing.VirtualClock` returns
+      the same move and iterations when it is repeated, because the clock only
+      moves with the work done by the search and not with the host speed.
+
+The corpus is split into chunks that run on the same pool, so the full suite
+finishes in seconds on a multi-core machine.  The exit status is non-zero if a
+test or an invariant fails.
+
+usage: run_tests.py [-p <processes>] [-n <positions>] [-s <seed>] [-k <pattern>]
+'''
+import getopt
+import io
+import os
+import random
+import sys
+import timeit
+import unittest
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import improved_score
+from timing import VirtualClock
+
+CORPUS_SIZES = (5, 6, 7, 8, 9, 11)  # board sizes of the generated positions
+NUM_POSITIONS = 600  # default number of corpus positions
+CHUNK_SIZE = 25  # corpus positions per task
+SEARCH_DEPTH = 2  # depth of the minimax / alpha-beta agreement check
+VIRTUAL_TICK = 0.01  # virtual milliseconds per time_left() poll
+VIRTUAL_LIMIT = 20.  # virtual milliseconds per iterative deepening search
+
+TEST_PATTERN = "*_test.py"
+
+# knight moves, independent of the tables the board engine computes them from
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def test_groups(pattern=None, start_dir="."):
+    """
+    Return the ids of the discovered tests grouped by test case class, with
+    only the tests whose id contains pattern (all tests by default).
+    """
+    groups = {}
+
+    def collect(suite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                collect(test)
+            elif pattern is None or pattern in test.id():
+                groups.setdefault(test.id().rsplit(".", 1)[0], []).append(test.id())
+
+    collect(unittest.defaultTestLoader.discover(start_dir, pattern=TEST_PATTERN))
+    return [groups[name] for name in sorted(groups)]
+
+
+def run_group(test_ids):
+    """
+    Run a group of tests in this process and return (the number of tests
+    run, failure descriptions, the text report).
+    """
+    stream = io.StringIO()
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = unittest.TextTestRunner(stream=stream, verbosity=0).run(suite)
+    failures = ["%s\n%s" % (test.id(), trace) for test, trace in result.failures + result.errors]
+    return result.testsRun, failures, stream.getvalue()
+
+
+def corpus(num_positions, seed=0, sizes=CORPUS_SIZES):
+    """
+    Return the corpus as (width, height, moves) triples: the moves of seeded
+    random games on the board sizes, stopped at a random ply.  Positions only
+    depend on the seed, so every process can rebuild them from the moves.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for idx in range(num_positions):
+        size = sizes[idx % len(sizes)]
+        game = Board("player_1", "player_2", size, size)
+        moves = []
+        for _ in range(rng.randint(2, size * size // 2)):
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            moves.append(rng.choice(legal_moves))
+            game.apply_move(moves[-1])
+        positions.append((size, size, moves))
+    return positions
+
+
+def replay(width, height, moves, players=("player_1", "player_2")):
+    """ Return a new board after playing a sequence of moves. """
+    game = Board(players[0], players[1], width, height)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def deepening_search(game, player):
+    """ Return the move and iterations of a search timed by a virtual clock. """
+    time_left = VirtualClock(VIRTUAL_TICK).timer(VIRTUAL_LIMIT)
+    move = player.get_move(game, game.get_legal_moves(), time_left)
+    return move, list(player.iterations)
+
+
+def check_position(width, height, moves):
+    """ Return the descriptions of the invariants a corpus position breaks. """
+    errors = []
+    label = "%dx%d %s" % (width, height, moves)
+    game = replay(width, height, moves)
+    legal_moves = sorted(game.get_legal_moves())
+
+    # brute force: every knight move that lands on a blank cell of the board
+    location = game.get_player_location(game.active_player)
+    if location is not None:
+        expected = sorted((location[0] + dr, location[1] + dc)
+                          for dr, dc in DIRECTIONS
+                          if game.move_is_legal((location[0] + dr, location[1] + dc)))
+        if legal_moves != expected:
+            errors.append("%s: legal moves %s, expected %s" % (label, legal_moves, expected))
+
+    for other in (game.copy(), replay(width, height, moves)):
+        if other.position_hash != game.position_hash or \
+                sorted(other.get_legal_moves()) != legal_moves:
+            errors.append("%s: copy or replay differs from the original" % label)
+    if not legal_moves:
+        return errors
+
+    players = [CustomPlayer(search_depth=SEARCH_DEPTH, score_fn=improved_score,
+                            iterative=False, method=method)
+               for method in ("minimax", "alphabeta")]
+    values = []
+    for player in players:
+        player.time_left = lambda: float("inf")
+        values.append(getattr(player, player.method)(
+            replay(width, height, moves, (player, "opponent")), SEARCH_DEPTH)[0])
+    if values[0] != values[1]:
+        errors.append("%s: minimax %s != alphabeta %s" % (label, values[0], values[1]))
+
+    results = []
+    for _ in range(2):
+        player = CustomPlayer(score_fn=improved_score, iterative=True, method="alphabeta")
+        results.append(deepening_search(replay(width, height, moves, (player, "opponent")), player))
+    if results[0] != results[1]:
+        errors.append("%s: repeated virtual clock searches differ" % label)
+    return errors
+
+
+def check_positions(positions):
+    """ Return (the number of positions checked, failure descriptions). """
+    errors = []
+    for width, height, moves in positions:
+        errors.extend(check_position(width, height, moves))
+    return len(positions), errors
+
+
+def run(processes=None, num_positions=NUM_POSITIONS, seed=0, pattern=None):
+    """
+    Run the test groups and the corpus checks on a pool of processes, print
+    a report and return True if everything passed.
+    """
+    start = timeit.default_timer()
+    groups = test_groups(pattern)
+    positions = corpus(num_positions, seed) if num_positions else []
+    chunks = [positions[idx:idx + CHUNK_SIZE] for idx in range(0, len(positions), CHUNK_SIZE)]
+
+    # the workers are not daemonic, so tests can start pools of their own
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # start the corpus chunks first, they are the longest independent tasks
+        corpus_results = [pool.submit(check_positions, chunk) for chunk in chunks]
+        test_results = [pool.submit(run_group, group) for group in groups]
+        num_tests = 0
+        failures = []
+        for result in test_results:
+            count, group_failures, _ = result.result()
+            num_tests += count
+            failures.extend(group_failures)
+        num_checked = 0
+        for result in corpus_results:
+            count, errors = result.result()
+            num_checked += count
+            failures.extend(errors)
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    print("Ran {} tests in {} groups and checked {} corpus positions in {:.1f}s: {}".format(
+        num_tests, len(groups), num_checked, timeit.default_timer() - start,
+        "FAILED ({} failures)".format(len(failures)) if failures else "OK"))
+    return not failures
+
+
+def main(argv):
+
+    USAGE = """usage: run_tests.py [-p <processes>] [-n <positions>] [-s <seed>] [-k <pattern>]
+            -p processes: optional number of worker processes - default is the number of CPUs
+            -n positions: optional number of corpus positions to check - default is 600 (0 to skip)
+            -s seed: optional seed of the generated corpus - default is 0
+            -k pattern: optional substring of the ids of the tests to run"""
+
+    processes = os.cpu_count()
+    num_positions = NUM_POSITIONS
+    seed = 0
+    pattern = None
+    try:
+        opts, args = getopt.getopt(argv, "hp:n:s:k:", ["processes=", "positions=", "seed=", "pattern="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-p", "--processes"):
+            processes = int(arg)
+        elif opt in ("-n", "--positions"):
+            num_positions = int(arg)
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-k", "--pattern"):
+            pattern = arg
+
+    sys.exit(0 if run(processes, num_positions, seed, pattern) else 1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
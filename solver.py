@@ -0,0 +1,358 @@
+'''
+Exact solver and memory-mapped tablebase for small and late-game positions.
+
+Once few blank cells are left (or on boards up to 5x5), the game tree can be
+searched to the end.  `Solver` does a memoized depth-first (negamax) search
+that returns the exact game-theoretic value of a position for the player to
+move, together with the distance to the end of the game:
+
+    value > 0: the player to move wins in `value` plies
+    value <= 0: the player to move loses in `-value` plies (0: no legal move)
+
+Positions are keyed canonically so that equivalent positions share an entry:
+
+    - only blank cells that either player can still reach by a sequence of
+      knight moves matter, so all other cells are treated as blocked;
+    - the position is stored relative to the player to move;
+    - the key is the smallest encoding over the symmetries of the board.
+
+A key packs the mask of relevant blank cells and the cell indices of the two
+players into one integer, which fits 64 bits on boards up to 7x7.  A
+`Tablebase` writes the solved positions as sorted 64-bit keys with parallel
+8-bit values, and memory-maps the file so that lookups are a binary search
+over shared pages (every process using the same file shares one copy).
+`CustomPlayer(tablebase=...)` probes it at the leaves of its search for exact
+scores.
+
+usage: solver.py [-s <board size>] [-k <max empty cells>] [-n <positions>] [-o <output file>]
+'''
+import getopt
+import mmap
+import random
+import struct
+import sys
+
+from bisect import bisect_left
+
+from isolation import Board
+from isolation.isolation import cell_index, knight_move_table
+from openings import board_symmetries
+
+TABLEBASE_WIN = 1e6  # score of a solved win, less one per ply to the end
+MAX_EMPTY = 12  # default maximum number of relevant blank cells to solve
+NUM_POSITIONS = 200  # default number of sampled positions to solve
+
+_HEADER = struct.Struct("<8sHHHHQ")
+_MAGIC = b"ISOLTB01"
+_SYMMETRIES = {}
+
+
+def location_bits(width, height):
+    """ Return the number of bits used for a cell index in a position key. """
+    return max(1, (width * height - 1).bit_length())
+
+
+def symmetry_tables(width, height):
+    """
+    Return the (shared) cell index permutations for the symmetries of a board
+    size.
+    """
+    tables = _SYMMETRIES.get((width, height))
+    if tables is None:
+        cells = [(idx % height, idx // height) for idx in range(width * height)]
+        tables = _SYMMETRIES[(width, height)] = [
+            [cell_index(t(*cell), height) for cell in cells]
+            for t in board_symmetries(width, height)]
+    return tables
+
+
+def relevant_cells(mask, own, other, table, limit=None):
+    """
+    Return the mask of blank cells (bits of mask) reachable by knight moves
+    from either player's cell, or None if there are more than limit of them.
+    """
+    seen = 0
+    count = 0
+    frontier = [own, other]
+    while frontier:
+        for n, _ in table[frontier.pop()]:
+            bit = 1 << n
+            if mask & bit and not seen & bit:
+                seen |= bit
+                count += 1
+                if limit is not None and count > limit:
+                    return None
+                frontier.append(n)
+    return seen
+
+
+def canonical_key(mask, own, other, width, height):
+    """
+    Return the canonical key of a position given the mask of relevant blank
+    cells and the cell indices of the player to move and its opponent.
+    """
+    bits = location_bits(width, height)
+    cells = [idx for idx in range(width * height) if mask >> idx & 1]
+    best = None
+    for perm in symmetry_tables(width, height):
+        image = 0
+        for idx in cells:
+            image |= 1 << perm[idx]
+        key = (((image << bits) | perm[own]) << bits) | perm[other]
+        if best is None or key < best:
+            best = key
+    return best
+
+
+def position_of(game, limit=None):
+    """
+    Return the (relevant blank mask, mover cell, opponent cell) of a game
+    state, or None before both players have moved or if more than limit
+    blank cells are relevant.
+    """
+    own = game.__location_index__(game.active_player)
+    other = game.__location_index__(game.inactive_player)
+    if own is Board.NOT_MOVED or other is Board.NOT_MOVED:
+        return None
+    cells = game.__cells__
+    mask = 0
+    for idx in range(len(cells)):
+        if not cells[idx]:
+            mask |= 1 << idx
+    mask = relevant_cells(mask, own, other, game.__geometry__[1], limit)
+    if mask is None:
+        return None
+    return mask, own, other
+
+
+def exact_score(value, own_move):
+    """
+    Return the search score of a solved value; own_move tells whether the
+    value is from the point of view of the searching player.
+    """
+    score = TABLEBASE_WIN - value if value > 0 else -(TABLEBASE_WIN + value)
+    return score if own_move else -score
+
+
+class Solver:
+    """
+    Memoized negamax solver for one board size.
+
+    Parameters
+    ----------
+    width, height : int
+        The board size.
+    """
+
+    def __init__(self, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.table = {}  # canonical key -> value for the player to move
+        self.moves = knight_move_table(width, height)
+
+    def solve_position(self, mask, own, other):
+        """
+        Return the value for the player to move of a position given as the
+        mask of relevant blank cells and the two player cells.
+        """
+        key = canonical_key(mask, own, other, self.width, self.height)
+        value = self.table.get(key)
+        if value is not None:
+            return value
+        best_win = None
+        longest_loss = None
+        for n, _ in self.moves[own]:
+            bit = 1 << n
+            if not mask & bit:
+                continue
+            child_mask = relevant_cells(mask & ~bit, other, n, self.moves)
+            child = self.solve_position(child_mask, other, n)
+            if child <= 0:
+                if best_win is None or 1 - child < best_win:
+                    best_win = 1 - child
+            elif longest_loss is None or child + 1 > longest_loss:
+                longest_loss = child + 1
+        if best_win is not None:
+            value = best_win
+        elif longest_loss is not None:
+            value = -longest_loss
+        else:
+            value = 0
+        self.table[key] = value
+        return value
+
+    def solve(self, game):
+        """
+        Return the value of a game state for the player to move (None before
+        both players have moved).
+        """
+        position = position_of(game)
+        if position is None:
+            return None
+        return self.solve_position(*position)
+
+    def best_move(self, game):
+        """
+        Return the move with the best solved value for the player to move
+        (the fastest win, or the slowest loss), or (-1, -1) without moves.
+        """
+        def preference(move):
+            child = self.solve(game.forecast_move(move))
+            return (0, 1 - child) if child <= 0 else (1, -(child + 1))
+
+        return min(game.get_legal_moves(), key=preference, default=(-1, -1))
+
+
+def sample_positions(width, height, max_empty, num_positions, seed=0):
+    """
+    Return positions with at most max_empty relevant blank cells, reached by
+    random play from random openings (every opening, if whole games fit).
+    """
+    if width * height - 2 <= max_empty:
+        cells = [(r, c) for r in range(height) for c in range(width)]
+        positions = []
+        for p1 in cells:
+            for p2 in cells:
+                if p1 != p2:
+                    game = Board("p1", "p2", width, height)
+                    game.apply_move(p1)
+                    game.apply_move(p2)
+                    positions.append(game)
+        return positions
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        game = Board("p1", "p2", width, height)
+        while True:
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+            if game.move_count >= 2 and position_of(game, max_empty) is not None:
+                positions.append(game)
+                break
+    return positions
+
+
+def write_tablebase(path, width, height, max_empty, table):
+    """ Write solved positions (canonical key -> value) to a tablebase file. """
+    keys = sorted(table)
+    with open(path, "wb") as ofile:
+        ofile.write(_HEADER.pack(_MAGIC, width, height, max_empty, 0, len(keys)))
+        ofile.write(struct.pack("<%dQ" % len(keys), *keys))
+        ofile.write(struct.pack("<%db" % len(keys), *[table[key] for key in keys]))
+
+
+def build_tablebase(path, width=7, height=7, max_empty=MAX_EMPTY,
+                    num_positions=NUM_POSITIONS, seed=0):
+    """
+    Solve sampled positions with at most max_empty relevant blank cells (and
+    everything reachable from them) and write the results to a tablebase.
+    Returns the number of positions stored.
+    """
+    if width * height + 2 * location_bits(width, height) > 64:
+        raise ValueError("Position keys of a %dx%d board do not fit 64 bits." % (width, height))
+    solver = Solver(width, height)
+    for game in sample_positions(width, height, max_empty, num_positions, seed):
+        solver.solve(game)
+    write_tablebase(path, width, height, max_empty, solver.table)
+    return len(solver.table)
+
+
+class Tablebase:
+    """
+    Read-only, memory-mapped tablebase of solved positions.
+
+    Parameters
+    ----------
+    path : str
+        A file written by `build_tablebase()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as ifile:
+            self.buffer = mmap.mmap(ifile.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.max_empty, _, count = \
+            _HEADER.unpack_from(self.buffer)
+        if magic != _MAGIC:
+            raise ValueError("%s is not a tablebase file." % path)
+        view = memoryview(self.buffer)
+        keys_end = _HEADER.size + 8 * count
+        self.keys = view[_HEADER.size:keys_end].cast("Q")
+        self.values = view[keys_end:keys_end + count].cast("b")
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, key):
+        """ Return the value stored for a canonical key, or None. """
+        idx = bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            return self.values[idx]
+        return None
+
+    def probe(self, game):
+        """
+        Return the solved value of a game state for the player to move, or
+        None if the position is not in the tablebase.
+        """
+        if game.width != self.width or game.height != self.height:
+            return None
+        position = position_of(game, self.max_empty)
+        if position is None:
+            return None
+        return self.lookup(canonical_key(position[0], position[1], position[2],
+                                         self.width, self.height))
+
+    def close(self):
+        """ Release the memory map. """
+        self.keys.release()
+        self.values.release()
+        self.buffer.close()
+
+
+def main(argv):
+
+    USAGE = """usage: solver.py [-s <board size>] [-k <max empty cells>] [-n <positions>] [-o <output file>]
+            -s board size: optional board size - default is 7
+            -k max empty cells: optional maximum number of relevant blank cells - default is 12
+            -n positions: optional number of sampled positions to solve - default is 200
+            -o output file: optional tablebase file name - default is tablebase_<size>x<size>.bin"""
+
+    size = 7
+    max_empty = MAX_EMPTY
+    num_positions = NUM_POSITIONS
+    outputfilename = None
+    try:
+        opts, args = getopt.getopt(argv, "hs:k:n:o:", ["size=", "empty=", "positions=", "ofile="])
+    except getopt.GetoptError as err:
+        print(err)
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ["-h", "--help"]:
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-s", "--size"):
+            size = int(arg)
+        elif opt in ("-k", "--empty"):
+            max_empty = int(arg)
+        elif opt in ("-n", "--positions"):
+            num_positions = int(arg)
+        elif opt in ("-o", "--ofile"):
+            outputfilename = arg
+
+    outputfilename = outputfilename or "tablebase_%dx%d.bin" % (size, size)
+    count = build_tablebase(outputfilename, size, size, max_empty, num_positions)
+    print("Wrote %d positions to %s" % (count, outputfilename))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
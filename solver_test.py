@@ -0,0 +1,107 @@
+"""
+Test cases for the exact solver and the tablebase.
+"""
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+import isolation
+from game_agent import CustomPlayer
+from solver import (Solver, Tablebase, TABLEBASE_WIN, build_tablebase,
+                    position_of, sample_positions, write_tablebase)
+
+
+def brute_force_value(game):
+    """ Plain negamax value of a position for the player to move. """
+    values = [brute_force_value(game.forecast_move(m)) for m in game.get_legal_moves()]
+    wins = [1 - v for v in values if v <= 0]
+    if wins:
+        return min(wins)
+    return -(max(values) + 1) if values else 0
+
+
+def random_position(width, height, num_moves, seed, players=("p1", "p2")):
+    """ Return a board after random moves, and the moves played. """
+    rng = random.Random(seed)
+    game = isolation.Board(players[0], players[1], width, height)
+    history = []
+    for _ in range(num_moves):
+        moves = game.get_legal_moves()
+        if not moves:
+            break
+        history.append(rng.choice(moves))
+        game.apply_move(history[-1])
+    return game, history
+
+
+class SolverTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        """ Memoized canonical values equal plain negamax values """
+        solver = Solver(4, 4)
+        for seed in range(30):
+            game, _ = random_position(4, 4, 2 + seed % 4, seed)
+            self.assertEqual(solver.solve(game), brute_force_value(game))
+
+    def test_symmetric_positions_share_entries(self):
+        """ Mirror images of a position have the same value and key """
+        solver = Solver(4, 4)
+        game, history = random_position(4, 4, 4, 1)
+        value = solver.solve(game)
+        size = len(solver.table)
+        mirror = isolation.Board("p1", "p2", 4, 4)
+        for r, c in history:
+            mirror.apply_move((c, 3 - r))
+        self.assertEqual(solver.solve(mirror), value)
+        self.assertEqual(len(solver.table), size)
+
+
+class TablebaseTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        """ Every solved position can be probed from the mapped file """
+        count = build_tablebase(self.path, 7, 7, max_empty=10, num_positions=20)
+        tablebase = Tablebase(self.path)
+        self.assertEqual(len(tablebase), count)
+        solver = Solver(7, 7)
+        for game in sample_positions(7, 7, 10, 20):
+            self.assertEqual(tablebase.probe(game), solver.solve(game))
+        self.assertIsNone(tablebase.probe(isolation.Board("p1", "p2")))
+        copy = pickle.loads(pickle.dumps(tablebase))
+        self.assertEqual(len(copy), count)
+        copy.close()
+        tablebase.close()
+
+    def test_search_probes_leaves(self):
+        """ An alpha-beta search with the tablebase scores leaves exactly """
+        player = CustomPlayer(search_depth=1, iterative=False, method='alphabeta')
+        player.time_left = lambda: float("inf")
+        positions = []
+        for seed in range(40):
+            game, _ = random_position(7, 7, 36, seed, (player, "opponent"))
+            if game.active_player == player and game.get_legal_moves() and \
+                    position_of(game, 10) is not None:
+                positions.append(game)
+        solver = Solver(7, 7)
+        values = [solver.solve(game) for game in positions]
+        write_tablebase(self.path, 7, 7, 10, solver.table)
+        player.tablebase = tablebase = Tablebase(self.path)
+        for game, value in zip(positions, values):
+            score, move = player.alphabeta(game, 1)
+            self.assertGreater(abs(score), TABLEBASE_WIN - 50)
+            self.assertEqual(score > 0, value > 0)
+        self.assertTrue(positions)
+        tablebase.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
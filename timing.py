@@ -0,0 +1,142 @@
+"""
+Timeout forensics for tournament games.
+
+`Board.play(timings=...)` records a `MoveTiming` for every move: who moved, at
+which ply, the wall and CPU milliseconds spent, the milliseconds left on the
+clock when the move was returned and the search depth reached.  The functions
+here aggregate those records per agent into latency percentiles, overrun
+margins and histograms, so that `TIMER_THRESHOLD` and the time limit can be
+tuned from data:
+
+    timings = []
+    play_match(player1, player2, timings=timings)
+    print(format_summary("Student", summarize(agent_timings(timings, player1))))
+
+An overrun is a move returned after the clock ran out (negative remaining
+time); the margin is the smallest time left on the clock over all moves.
+
+`VirtualClock` replaces the wall clock where results must not depend on the
+speed of the host (e.g., node-count regression tests): time only passes when
+the clock is read or advanced.
+"""
+
+from math import ceil
+
+HISTOGRAM_BUCKET_MILLIS = 10.  # width of the latency histogram buckets
+HISTOGRAM_WIDTH = 40  # characters of the longest histogram bar
+
+
+def agent_timings(timings, player):
+    """ Return the timings of the moves made by a player. """
+    return [timing for timing in timings if timing.player == player]
+
+
+def percentile(values, q):
+    """
+    Return the q-th percentile (0 < q <= 100) of a list of values by the
+    nearest-rank method (zero for an empty list).
+    """
+    if not values:
+        return 0.
+    ordered = sorted(values)
+    return ordered[max(0, int(ceil(q / 100. * len(ordered))) - 1)]
+
+
+def summarize(timings):
+    """
+    Return summary statistics for the timings of one agent.
+
+    Returns
+    ----------
+    dict
+        The number of moves, the p50/p99/max wall latency, the minimum time
+        left at return ("margin"), the number of overruns and the largest
+        overrun, the mean and minimum search depth, and the mean and maximum
+        wall-time inflation (wall minus CPU time), all times in milliseconds.
+    """
+    wall = [timing.wall for timing in timings]
+    remaining = [timing.remaining for timing in timings]
+    depths = [timing.depth for timing in timings]
+    inflation = [timing.wall - timing.cpu for timing in timings]
+    num_moves = len(timings)
+    return {"moves": num_moves,
+            "p50": percentile(wall, 50),
+            "p99": percentile(wall, 99),
+            "max": max(wall, default=0.),
+            "margin": min(remaining, default=0.),
+            "overruns": sum(1 for r in remaining if r < 0),
+            "max_overrun": max([-r for r in remaining if r < 0], default=0.),
+            "mean_depth": sum(depths) / float(max(1, num_moves)),
+            "min_depth": min(depths, default=0),
+            "mean_inflation": sum(inflation) / max(1, num_moves),
+            "max_inflation": max(inflation, default=0.)}
+
+
+def overruns(timings):
+    """ Return the timings of the moves returned after the clock ran out. """
+    return [timing for timing in timings if timing.remaining < 0]
+
+
+def histogram(values, bucket=HISTOGRAM_BUCKET_MILLIS):
+    """
+    Return the counts of values in buckets of equal width, as a list of
+    (bucket lower bound, count) pairs from zero to the largest value.
+    """
+    if not values:
+        return []
+    counts = [0] * (int(max(values) // bucket) + 1)
+    for value in values:
+        counts[int(max(0., value) // bucket)] += 1
+    return [(idx * bucket, count) for idx, count in enumerate(counts)]
+
+
+def format_summary(name, stats):
+    """ Return a one line report of the summary statistics of an agent. """
+    return ("{!s:<25} {moves:>6d} moves  p50 {p50:6.1f}  p99 {p99:6.1f}  "
+            "max {max:6.1f} ms  margin {margin:6.1f} ms  overruns {overruns:d} "
+            "(max {max_overrun:.1f} ms)  depth {mean_depth:.1f} (min {min_depth:d})  "
+            "inflation {mean_inflation:.1f} (max {max_inflation:.1f}) ms"
+            ).format(name, **stats)
+
+
+def format_histogram(values, bucket=HISTOGRAM_BUCKET_MILLIS, width=HISTOGRAM_WIDTH):
+    """ Return a text histogram of latencies in milliseconds. """
+    counts = histogram(values, bucket)
+    scale = float(width) / max([count for _, count in counts], default=1)
+    return "\n".join("{:>7.0f} ms | {:<{}} {}".format(
+        low, "#" * int(ceil(count * scale)), width, count) for low, count in counts)
+
+
+class VirtualClock:
+    """
+    Deterministic clock in milliseconds. Every reading advances the clock by
+    `tick`, so a search that polls `time_left()` sees time pass in proportion
+    to the number of polls (i.e., to its work) rather than to the host speed.
+
+    Parameters
+    ----------
+    tick : float (optional)
+        The number of milliseconds each reading takes - default is 0, a
+        clock that only moves with `advance()`.
+
+    start : float (optional)
+        The initial time in milliseconds.
+    """
+
+    def __init__(self, tick=0., start=0.):
+        self.tick = tick
+        self.now = start
+
+    def __call__(self):
+        now = self.now
+        self.now += self.tick
+        return now
+
+    def advance(self, millis):
+        """ Move the clock forward by a number of milliseconds. """
+        self.now += millis
+
+    def timer(self, time_limit):
+        """ Return a `time_left` function for a turn starting now. """
+        start = self()
+        return lambda: time_limit - (self() - start)
@@ -0,0 +1,99 @@
+"""
+Test cases for the move timing forensics.
+"""
+import time
+import unittest
+import warnings
+
+from isolation import Board
+from isolation.isolation import MoveTiming
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer, improved_score
+from timing import (agent_timings, format_histogram, format_summary, histogram,
+                    overruns, percentile, summarize, VirtualClock)
+from tournament import play_match
+
+
+class TimingTest(unittest.TestCase):
+
+    def test_percentile(self):
+        """ Percentiles use the nearest rank """
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0.)
+
+    def test_summary_and_histogram(self):
+        """ Overruns, margins and buckets are computed from the records """
+        timings = [MoveTiming("a", 2, 5., 4., 95., 3),
+                   MoveTiming("a", 4, 25., 20., 75., 5),
+                   MoveTiming("a", 6, 104., 101., -4., 4),
+                   MoveTiming("b", 3, 1., 1., 99., 0)]
+        stats = summarize(agent_timings(timings, "a"))
+        self.assertEqual(stats["moves"], 3)
+        self.assertEqual(stats["max"], 104.)
+        self.assertEqual(stats["margin"], -4.)
+        self.assertEqual(stats["overruns"], 1)
+        self.assertEqual(stats["max_overrun"], 4.)
+        self.assertEqual(stats["mean_depth"], 4.)
+        self.assertEqual(overruns(timings), [timings[2]])
+        counts = histogram([t.wall for t in timings])
+        self.assertEqual(len(counts), 11)
+        self.assertEqual(sum(count for _, count in counts), 4)
+        self.assertEqual(counts[0], (0., 2))
+        self.assertIn("overruns 1", format_summary("a", stats))
+        self.assertEqual(len(format_histogram([t.wall for t in timings]).splitlines()), 11)
+
+    def test_play_match_records_moves(self):
+        """ Every move of a match is recorded with the depth searched """
+        player = CustomPlayer(search_depth=2, score_fn=improved_score,
+                              iterative=False, method='alphabeta')
+        opponent = RandomPlayer()
+        timings = []
+        play_match(player, opponent, ((0, 0), (6, 6)), timings=timings)
+        own = agent_timings(timings, player)
+        self.assertTrue(own)
+        self.assertEqual(len(own) + len(agent_timings(timings, opponent)), len(timings))
+        # only a move without legal moves (which ends a game) has no search
+        self.assertLessEqual(sum(1 for t in own if t.depth != 2), 2)
+        self.assertTrue(all(t.depth == 0 for t in agent_timings(timings, opponent)))
+
+    def test_timeout_warning_names_the_agent(self):
+        """ The timeout warning of a match names the agent that overran """
+
+        class SlowPlayer:
+            def get_move(self, game, legal_moves, time_left):
+                time.sleep(0.2)
+                return legal_moves[0] if legal_moves else (-1, -1)
+
+        player = SlowPlayer()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            play_match(player, RandomPlayer(), ((0, 0), (6, 6)))
+        message = str(caught[-1].message)
+        self.assertIn("%s (player1) at ply " % player, message)
+
+    def test_virtual_clock(self):
+        """ Games timed by a virtual clock are identical on every run """
+        clock = VirtualClock(tick=0.5)
+        time_left = clock.timer(10.)
+        self.assertEqual(time_left(), 9.5)
+        clock.advance(5.)
+        self.assertEqual(time_left(), 4.)
+
+        def play():
+            player = CustomPlayer(score_fn=improved_score, iterative=True, method='alphabeta')
+            game = Board(player, CustomPlayer(score_fn=improved_score, iterative=True))
+            game.apply_move((2, 3))
+            game.apply_move((4, 4))
+            timings = []
+            winner, history, _ = game.play(time_limit=40, timings=timings,
+                                           clock=VirtualClock(tick=0.01))
+            return history, [(t.ply, t.wall, t.depth) for t in timings]
+
+        self.assertEqual(play(), play())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,18 +23,14 @@ import itertools
 import random
 import warnings
 
-from collections import namedtuple
-
 from isolation import Board
-from sample_players import RandomPlayer
-from sample_players import null_score
-from sample_players import open_move_score
-from sample_players import improved_score
-from game_agent import CustomPlayer
-from game_agent import custom_score
+from agents import Agent, OPPONENT_SPECS, TEST_SPECS, build_agent
+from openings import OpeningBook
+from timing import agent_timings, summarize, format_summary, format_histogram
 
 NUM_MATCHES = 50  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+OPENING_SEED = 0  # seed for the shared opening positions
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
@@ -54,30 +50,44 @@ the performance of Iterative Deepening and the custom heuristic against the
 same opponents.
 """
 
-Agent = namedtuple("Agent", ["player", "name"])
-
-
-def play_match(player1, player2):
+def play_match(player1, player2, opening=None, cpu_time=False, timings=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If an opening (a pair of first moves, e.g. from `OpeningBook.position()`)
+    is given, both games start from it instead of from random moves.
+
+    With cpu_time, moves are charged the CPU time of the player rather than
+    wall time (see `Board.play()`), and per-move timings are appended to the
+    timings list if one is given.
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
     games = [Board(player1, player2), Board(player2, player1)]
 
-    # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+    # initialize both games with the opening (or a random move and response)
+    for idx in range(2):
+        if opening is None:
+            move = random.choice(games[0].get_legal_moves())
+        else:
+            move = opening[idx]
         games[0].apply_move(move)
         games[1].apply_move(move)
 
     # play both games and tally the results
+    overrun_moves = []
     for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        game_timings = []
+        winner, _, termination = game.play(time_limit=TIME_LIMIT, cpu_time=cpu_time,
+                                           timings=game_timings)
+        if timings is not None:
+            timings.extend(game_timings)
+        if termination == "timeout":
+            overrun_moves.append(game_timings[-1])
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -97,14 +107,26 @@ def play_match(player1, player2):
                 num_invalid_moves[player1] += 1
 
     if sum(num_timeouts.values()) != 0:
-        warnings.warn(TIMEOUT_WARNING)
+        warnings.warn(TIMEOUT_WARNING + " (" + ", ".join(
+            "%s (%s) at ply %d: %.1f ms over at depth %d" % (
+                t.player, "player1" if t.player is player1 else "player2",
+                t.ply, -t.remaining, t.depth)
+            for t in overrun_moves) + ")")
 
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def play_round(agents, num_matches, book=None, timings=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    If an `OpeningBook` is given, match `i` against every opponent plays
+    `book.position(2 * i)` with the agent under test moving first and
+    `book.position(2 * i + 1)` with the opponent moving first, and the global
+    random generator is reseeded from the book seed and position index, so
+    every agent faces the same positions and no game is played twice.
+
+    The `MoveTiming` of every move is appended to timings if a list is given.
     """
     agent_1 = agents[-1]
     wins = 0.
@@ -120,9 +142,14 @@ def play_round(agents, num_matches):
         #print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
 
         # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
+        for order, (p1, p2) in enumerate(itertools.permutations((agent_1.player, agent_2.player))):
+            for match_idx in range(num_matches):
+                opening = None
+                if book is not None:
+                    opening_idx = 2 * match_idx + order
+                    opening = book.position(opening_idx)
+                    random.seed("%s-%d" % (book.seed, opening_idx))
+                score_1, score_2 = play_match(p1, p2, opening, timings=timings)
                 counts[p1] += score_1
                 counts[p2] += score_2
                 total += score_1 + score_2
@@ -137,31 +164,12 @@ def play_round(agents, num_matches):
 
 def main():
 
-    HEURISTICS = [("Null", null_score),
-                  ("Open", open_move_score),
-                  ("Improved", improved_score)]
-    AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
-    MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
-
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
-    # search, or random selection.  The agent names encode the search method
-    # (MM=minimax, AB=alpha-beta) and the heuristic function (Null=null_score,
-    # Open=open_move_score, Improved=improved_score). For example, MM_Open is
-    # an agent using minimax search with the open moves heuristic.
-    mm_agents = [Agent(CustomPlayer(score_fn=h, **MM_ARGS),
-                       "MM_" + name) for name, h in HEURISTICS]
-    ab_agents = [Agent(CustomPlayer(score_fn=h, **AB_ARGS),
-                       "AB_" + name) for name, h in HEURISTICS]
-    random_agents = [Agent(RandomPlayer(), "Random")]
-
-    # ID_Improved agent is used for comparison to the performance of the
-    # submitted agent for calibration on the performance across different
-    # systems; i.e., the performance of the student agent is considered
-    # relative to the performance of the ID_Improved agent to account for
-    # faster or slower computers.
-    test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
+    # search, or random selection, and the agents under test (see `agents.py`)
+    opponents = [build_agent(spec) for spec in OPPONENT_SPECS]
+    test_agents = [build_agent(spec) for spec in TEST_SPECS]
+
+    book = OpeningBook(seed=OPENING_SEED)
 
     print(DESCRIPTION)
     for agentUT in test_agents:
@@ -170,13 +178,21 @@ def main():
         print("{:^25}".format("Evaluating: " + agentUT.name))
         print("*************************")
 
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        agents = opponents + [agentUT]
+        timings = []
+        win_ratio = play_round(agents, NUM_MATCHES, book, timings)
 
         print("\n\nResults:")
         print("----------")
         print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
 
+        print("\nMove timings:")
+        print("----------")
+        for agent in agents:
+            print(format_summary(agent.name, summarize(agent_timings(timings, agent.player))))
+        print("\n{} latency histogram:".format(agentUT.name))
+        print(format_histogram([t.wall for t in agent_timings(timings, agentUT.player)]))
+
 
 if __name__ == "__main__":
     main()
@@ -4,14 +4,18 @@ this is a multi-process version of tournament.py to take advantage of multi-core
 
 @author: richard
 '''
-from multiprocessing import Pool
-from collections import namedtuple
-import sys, getopt, os, logging, itertools, datetime
+import multiprocessing
+import sys, getopt, os, logging, itertools, datetime, random, contextlib, gc, time
 
 from tournament import play_match
 from isolation import Board
-from sample_players import RandomPlayer, null_score, open_move_score, improved_score
-from game_agent import CustomPlayer, ParameterizedEvaluationFunction
+from agents import Agent, OPPONENT_SPECS, REGISTRY, STUDENT_SWEEP, build_agent, expand, load_specs
+from openings import OpeningBook
+from timing import agent_timings, summarize, format_summary, percentile
+from profiling import Profile, instrument
+from isolation.isolation import knight_move_table
+from features import knight_distances
+from solver import symmetry_tables
 
 logging.basicConfig(level=logging.ERROR)
 
@@ -25,50 +29,185 @@ TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "increase this margin to avoid timeouts during  " + \
                   "tournament play."
 
-Agent = namedtuple("Agent", ["player", "name"])
+WARM_BOARD_SIZES = (7,)  # board sizes whose tables are built before the workers start
 
-def play_round(opponents, agent, num_matches):
+# state of a pool worker, set by init_worker()
+_WORKER = {"created": None, "first_game": None}
+
+# opening books by seed, inherited by forked workers
+_BOOKS = {}
+
+
+def opening_book(seed):
+    """ Return the (shared) `OpeningBook` of a seed, building it on first use. """
+    book = _BOOKS.get(seed)
+    if book is None:
+        book = _BOOKS[seed] = OpeningBook(seed=seed)
+    return book
+
+
+def preload(sizes=WARM_BOARD_SIZES):
+    """
+    Build the shared, lazily built tables of the board sizes in this process:
+    the coordinates, knight-move table and Zobrist keys of `isolation`, the
+    knight distances of `features` and the symmetries of `solver`.
+    """
+    for size in sizes:
+        knight_move_table(size, size)
+        symmetry_tables(size, size)
+        for idx in range(size * size):
+            knight_distances(size, size, idx)
+
+
+def init_worker(created, sizes=WARM_BOARD_SIZES):
+    """
+    Pool initializer: record when the pool was created (wall clock seconds,
+    for the time to first game) and make sure the tables are built.  Workers
+    forked from a preloaded parent inherit the tables, so this only builds
+    them in spawned workers.
+    """
+    preload(sizes)
+    _WORKER["created"] = created
+    _WORKER["first_game"] = None
+
+
+def make_pool(pool_size, warm=True, start_method=None):
+    """
+    Return a `Pool` of workers initialized by `init_worker()`.
+
+    With warm, the tables are built once in this process before the workers
+    are forked (where fork is available), and the objects of this process are
+    moved out of reach of the garbage collector (`gc.freeze()`), so the
+    workers share the pages instead of copying them when they collect.
+    """
+    if start_method is None and warm and "fork" in multiprocessing.get_all_start_methods():
+        start_method = "fork"
+    if warm:
+        preload()
+        gc.freeze()
+    context = multiprocessing.get_context(start_method)
+    return context.Pool(processes=pool_size, initializer=init_worker,
+                        initargs=(time.time(),))
+
+
+def _first_game_probe(_):
+    """
+    Pool task: play one short game and return the worker pid, and the
+    milliseconds from the creation of the pool to the start of its first game.
+    """
+    agents = [build_agent(REGISTRY["Random"]),
+              build_agent(dict(REGISTRY["AB_Improved"], search_depth=1))]
+    started = _WORKER["first_game"] or time.time()
+    _WORKER["first_game"] = started
+    play_match(agents[0].player, agents[1].player)
+    return os.getpid(), 1000. * (started - _WORKER["created"])
+
+
+def startup_times(pool_size, warm=True, start_method=None):
+    """
+    Return the milliseconds from the creation of a pool to the first game of
+    each of its workers.
+    """
+    with make_pool(pool_size, warm, start_method) as pool:
+        times = {}
+        for pid, millis in pool.map(_first_game_probe, range(4 * pool_size), chunksize=1):
+            times[pid] = min(millis, times.get(pid, millis))
+    gc.unfreeze()
+    return sorted(times.values())
+
+
+def play_round(opponents, agent, num_matches, book=None, cpu_time=False, profile=False):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    With an `OpeningBook` (or the seed of one, see `opening_book()`), match
+    `i` against every opponent plays `book.position(2 * i)` with the agent
+    moving first and `book.position(2 * i + 1)` with the opponent moving
+    first, and reseeds the random generator from the position index, so every
+    worker plays each candidate from the same positions and no game is played
+    twice.
+
+    The agent and the opponents are either `Agent`s or agent specs (see
+    `agents.py`), which the worker builds locally, so a task only pickles the
+    small specs.
+
+    With cpu_time, moves are charged CPU time instead of wall time. Returns
+    the agent name, its win ratio, and the summary of its move timings (see
+    `timing.summarize()`), which includes the time its moves spent waiting
+    for a core (wall-time inflation), and with profile, a `profiling.Profile`
+    of the searches in the round (None otherwise).
     """
+    if book is not None and not isinstance(book, OpeningBook):
+        book = opening_book(book)
     wins = 0.
     total = 0.
+    timings = []
+    agent = build_agent(agent)
+    opponents = [build_agent(opponent) for opponent in opponents]
 
     print("Playing matches against: ", agent.name)
     #print("----------")
 
     #return agent.name, 33.123456
-    for opponent in opponents:
+    round_profile = None
+    with contextlib.ExitStack() as stack:
+        if profile:
+            names = dict([(opponent.player, opponent.name) for opponent in opponents] +
+                         [(agent.player, "agent")])
+            round_profile = stack.enter_context(instrument(Profile(names)))
+
+        for opponent in opponents:
 
-        counts = {agent.player: 0., opponent.player: 0.}
+            counts = {agent.player: 0., opponent.player: 0.}
 
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent.player, opponent.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
+            # Each player takes a turn going first
+            for order, (p1, p2) in enumerate(itertools.permutations((agent.player, opponent.player))):
+                for match_idx in range(num_matches):
+                    if _WORKER["first_game"] is None:
+                        _WORKER["first_game"] = time.time()
+                    opening = None
+                    if book is not None:
+                        opening_idx = 2 * match_idx + order
+                        opening = book.position(opening_idx)
+                        random.seed("%s-%d" % (book.seed, opening_idx))
+                    score_1, score_2 = play_match(p1, p2, opening, cpu_time, timings)
+                    counts[p1] += score_1
+                    counts[p2] += score_2
+                    total += score_1 + score_2
 
-        wins += counts[agent.player]
+            wins += counts[agent.player]
 
-    return agent.name, (100. * wins / total)
+    return (agent.name, (100. * wins / total), summarize(agent_timings(timings, agent.player)),
+            round_profile)
 
 
 def main(argv):
 
-    USAGE = """usage: tournament_mp.py [-m <number of matches>] [-p <pool size>] [-o <outputfile>]
-            -m number of matches: optional number of matches (each match has 4 games) - default is 5
-            -p pool size: optional pool size - default is 3
-            -o output file: optional output file name - default is results.txt"""
+    USAGE = """usage: tournament_mp.py [-m <number of matches>] [-p <pool size>] [-o <outputfile>] [-s <seed>] [-e <cache size>] [-c] [-P <profile file>] [-a <agents file>] [-W]
+            -m number of matches: optional number of matches (each match has 4 games: two openings, each played from both seats) - default is 5
+            -p pool size: optional pool size - default is 3, or the number of cores with -c
+            -o output file: optional output file name - default is results.txt
+            -s seed: optional seed for the shared opening positions - default is 0
+            -e cache size: optional evaluation cache size per test agent - default is 0 (no cache)
+            -c cpu time: charge moves CPU time instead of wall time (with a wall-time cap)
+            -P profile file: optional file for the folded search profile of all workers (flame graph input)
+            -a agents file: optional JSON file of the specs (and sweeps) of the agents under test - default is the weight sweep
+            -W startup: only measure the time from pool creation to the first game of each worker, cold and warm"""
     
     # Assumes 2 x dual-core CPUs able to run 3 processes relatively
-    # uninterrupted (interruptions cause get_move to timeout)
-    pool_size = 3 
+    # uninterrupted (interruptions cause get_move to timeout), unless moves
+    # are charged CPU time, which is not affected by the interruptions
+    pool_size = None
     outputfilename = 'results.txt'
     num_matches = NUM_MATCHES
+    seed = 0
+    cache_size = 0
+    cpu_time = False
+    profilefilename = None
+    agentsfilename = None
+    startup = False
     try:
-        opts, args = getopt.getopt(argv,"hm:p:o:",["matches=", "poolsize=","ofile="])
+        opts, args = getopt.getopt(argv,"hm:p:o:s:e:cP:a:W",["matches=", "poolsize=","ofile=","seed=","cachesize=","cputime","profile=","agents=","startup"])
     except getopt.GetoptError as err:
         print(err)
         print(USAGE)
@@ -83,69 +222,77 @@ def main(argv):
             pool_size = int(arg)
         elif opt in ("-o", "--ofile"):
             outputfilename = arg
+        elif opt in ("-s", "--seed"):
+            seed = int(arg)
+        elif opt in ("-e", "--cachesize"):
+            cache_size = int(arg)
+        elif opt in ("-c", "--cputime"):
+            cpu_time = True
+        elif opt in ("-P", "--profile"):
+            profilefilename = arg
+        elif opt in ("-a", "--agents"):
+            agentsfilename = arg
+        elif opt in ("-W", "--startup"):
+            startup = True
+    if pool_size is None:
+        pool_size = os.cpu_count() if cpu_time else 3
+
+    if startup:
+        # cold: spawned workers import the modules and build the tables;
+        # warm: forked workers inherit both from this process
+        for label, warm, start_method in (("cold (spawn)", False, "spawn"),
+                                          ("warm (fork, preloaded)", True, None)):
+            times = startup_times(pool_size, warm, start_method)
+            print("{:<25} time to first game: p50 {:6.1f} ms  max {:6.1f} ms  ({} workers)".format(
+                label, percentile(times, 50), max(times), len(times)))
+        return
+
+
+    # Opponents and agents under test are sent to the workers as specs (see
+    # `agents.py`); the ID_Improved agent calibrates the results across
+    # systems, and the students sweep the weights of the parameterized
+    # evaluation function unless the sweep is read from a file
+    all_opponents = OPPONENT_SPECS
+    test_specs = load_specs(agentsfilename) if agentsfilename else expand(STUDENT_SWEEP)
+    # Each worker process gets its own (empty) copy of an evaluation cache
+    if cache_size:
+        test_specs = [dict(spec, cache=cache_size) for spec in test_specs]
+    test_agents = [REGISTRY["ID_Improved"]] + test_specs
+
+    # Every candidate plays the same seeded opening positions
+    # (built before the workers are forked, so the tasks only carry the seed)
+    book = opening_book(seed)
 
-    
-    HEURISTICS = [("Null", null_score),
-                  ("Open", open_move_score),
-                  ("Improved", improved_score)]
-    AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
-    MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
-
-    # Create a collection of CPU agents using fixed-depth minimax or alpha beta
-    # search, or random selection.  The agent names encode the search method
-    # (MM=minimax, AB=alpha-beta) and the heuristic function (Null=null_score,
-    # Open=open_move_score, Improved=improved_score). For example, MM_Open is
-    # an agent using minimax search with the open moves heuristic.
-    mm_opponents = [Agent(CustomPlayer(score_fn=h, **MM_ARGS),
-                       "MM_" + name) for name, h in HEURISTICS]
-    ab_opponents = [Agent(CustomPlayer(score_fn=h, **AB_ARGS),
-                       "AB_" + name) for name, h in HEURISTICS]
-    random_opponents = [Agent(RandomPlayer(), "Random")]
-    all_opponents = random_opponents + mm_opponents + ab_opponents
-    
-    test_agents = []
-    # ID_Improved agent is used for comparison to the performance of the
-    # submitted agent for calibration on the performance across different
-    # systems; i.e., the performance of the student agent is considered
-    # relative to the performance of the ID_Improved agent to account for
-    # faster or slower computers.
-    test_agents.append(Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"))
-    
-    # Create all the parameterized evaluation function objects
-    # Then create all the test agents using those eval functions
-    params = [(a,b,c,d,e,f) for a in range(1,3) 
-                            for b in range(0,3) 
-                            for c in range(-1,2) 
-                            for d in range(1,3) 
-                            for e in range(0,3) 
-                            for f in range(0,1)]
-    #params = [(0,0,0,0,0,0)]
-    #params = [(1, 2, -1, 1, 2, 0)]
-    
-    for param in params:
-        eval_obj = ParameterizedEvaluationFunction(param)
-        test_agents.append(Agent(CustomPlayer(score_fn=eval_obj.eval_func, **CUSTOM_ARGS), "Student " + str(param)))
-    
     # Put the start time in the output file
     with open(outputfilename, mode='a') as ofile:
         ofile.write('*******************************************************************************************\n')
-        ofile.write('Starting Isolation tournament with %d test agents, %d games per round, and %d sub-processes\n' % 
+        ofile.write('Starting Isolation tournament with %d test agents, %d games against each opponent, and %d sub-processes\n' % 
                (len(test_agents), num_matches*4, pool_size))
+        ofile.write('Opening seed %d (%d balanced opening positions)\n' % (seed, len(book)))
+        ofile.write('Time control: %s\n' % ('cpu time' if cpu_time else 'wall time'))
         ofile.write('Tournament started at %s\n' % (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
 
     # Run the tournament!
-    with Pool(processes=pool_size) as pool:
+    profile = Profile()
+    with make_pool(pool_size) as pool:
         results = []
         for agentUT in test_agents:
-            results.append(pool.apply_async(play_round, args=(all_opponents, agentUT, num_matches)))
+            results.append(pool.apply_async(play_round, args=(all_opponents, agentUT, num_matches, seed, cpu_time,
+                                                              profilefilename is not None)))
 
         # Write the output... flush each time as it takes a long time to run
         with open(outputfilename, mode='a') as ofile:
             for result in results:
-                agent, res = result.get()
+                agent, res, stats, round_profile = result.get()
                 ofile.write('%s got %2.2f\n' % (agent, res))
+                ofile.write('    %s\n' % format_summary('move timings', stats))
                 ofile.flush()
+                if round_profile is not None:
+                    profile.merge(round_profile)
+            if profilefilename is not None:
+                ofile.write('Search profile (all workers):\n%s\n' % profile.format_table())
+                with open(profilefilename, mode='w') as pfile:
+                    pfile.write(profile.folded() + '\n')
             ofile.write('Tournament complete at: %s\n' % (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
             ofile.write('*******************************************************************************************\n\n')
 
@@ -0,0 +1,30 @@
+"""
+Test cases for the worker startup of the multiprocessing tournament.
+"""
+import unittest
+
+import tournament_mp
+import features
+import solver
+from isolation.isolation import _GEOMETRIES
+
+
+class WorkerStartupTest(unittest.TestCase):
+
+    def test_preload_builds_tables(self):
+        """ Preloading builds the geometry of the warm board sizes """
+        tournament_mp.preload((6,))
+        self.assertIn((6, 6), _GEOMETRIES)
+        self.assertIn((6, 6), solver._SYMMETRIES)
+        self.assertEqual(len(features._KNIGHT_DISTANCES[(6, 6)]), 36)
+        self.assertIs(tournament_mp.opening_book(3), tournament_mp.opening_book(3))
+
+    def test_startup_times(self):
+        """ Every worker of a warm pool reports its time to first game """
+        times = tournament_mp.startup_times(2)
+        self.assertTrue(1 <= len(times) <= 2)
+        self.assertTrue(all(t >= 0 for t in times))
+
+
+if __name__ == '__main__':
+    unittest.main()